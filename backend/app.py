@@ -1,36 +1,56 @@
-from flask import Flask, request, jsonify
+import time
+
+# Measured from the first line so the debug startup report covers all imports
+_startup_started = time.perf_counter()
+
+from flask import Flask, Blueprint, Response, request, jsonify, current_app, send_file
 from flask_cors import CORS
 from config import Config
 from utils.pdf_processor import PDFProcessor
-from utils.gemini_service import GeminiService
+from utils.gemini_service import GeminiService, grading_metrics
 from utils.db_connection import db, db_connection
+from utils.response_cache import cached_response, response_cache
+from utils.async_pipeline import AsyncEvaluationPipeline
+from utils.lazy_import import import_timings
+from utils.admission import admission_controller, AdmissionRejected
+from utils import export
+from utils.write_behind import evaluation_writer
+from utils import profiling
 from models.teacher import Teacher
 from models.student import Student
 from models.evaluation import Evaluation
+from models.analytics import Analytics
+from models.regrade_job import RegradeJob
+from models.evaluation_archive import EvaluationArchive
+from models.deletion_task import DeletionTask
+from utils.regrade import RegradeRunner
+from utils.scheduler import PeriodicJob
+from utils.cascade_delete import CascadeDeleter
 from bson import ObjectId
 import os
+import json
+from datetime import datetime
+import queue
+import threading
 import logging
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = Flask(__name__)
-
-# Configure CORS for both development and production
-cors_origins = [
-    'http://localhost:3000',  # Local development
-    'http://localhost:5000',
-    os.getenv('FRONTEND_URL', 'http://localhost:3000')  # Production Vercel URL
-]
-CORS(app, origins=cors_origins)
-
-# Configuration
-app.config['UPLOAD_FOLDER'] = Config.UPLOAD_FOLDER
-app.config['MAX_CONTENT_LENGTH'] = Config.MAX_FILE_SIZE
+api = Blueprint('api', __name__)
 
 # Initialize services
 pdf_processor = PDFProcessor()
 gemini_service = GeminiService(Config.GEMINI_API_KEY)
+async_pipeline = AsyncEvaluationPipeline(gemini_service)
+regrade_runner = RegradeRunner(gemini_service)
+analytics_job = PeriodicJob('analytics_refresh', Config.ANALYTICS_REFRESH_INTERVAL, Analytics.refresh)
+regrade_resume_job = PeriodicJob('regrade_resume', Config.REGRADE_LEASE_SECONDS, regrade_runner.resume_abandoned,
+                                 lease_seconds=60)
+archive_job = PeriodicJob('evaluation_archive', Config.ARCHIVE_INTERVAL if Config.ARCHIVE_AFTER_DAYS > 0 else 0,
+                          EvaluationArchive.archive_expired)
+cascade_deleter = CascadeDeleter()
+orphan_sweep_job = PeriodicJob('orphan_sweep', Config.ORPHAN_SWEEP_INTERVAL, cascade_deleter.sweep)
 
 # Helper function to serialize MongoDB documents
 def serialize_doc(doc):
@@ -41,12 +61,13 @@ def serialize_doc(doc):
         return [serialize_doc(item) for item in doc]
     if isinstance(doc, dict):
         doc = doc.copy()
-        if '_id' in doc:
-            doc['_id'] = str(doc['_id'])
+        for key, value in doc.items():
+            if isinstance(value, ObjectId):
+                doc[key] = str(value)
         return doc
     return doc
 
-@app.route('/', methods=['GET'])
+@api.route('/', methods=['GET'])
 def root():
     """Root endpoint - API info"""
     return jsonify({
@@ -55,7 +76,7 @@ def root():
         'health_check': '/api/health'
     })
 
-@app.route('/api/health', methods=['GET'])
+@api.route('/api/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
     try:
@@ -65,15 +86,26 @@ def health_check():
     except Exception as e:
         db_status = f'disconnected: {str(e)}'
     
-    return jsonify({
+    health = {
         'status': 'healthy',
         'message': 'AI Examiner API is running',
-        'database': db_status
-    })
+        'database': db_status,
+        'response_cache': response_cache.stats(),
+        'admission': admission_controller.stats(),
+        'write_behind': evaluation_writer.stats()
+    }
+    if Config.GEMINI_BACKEND == 'stub':
+        health['gemini_backend'] = 'stub (random grades, load testing only)'
+    if Config.DEBUG:
+        health['startup'] = {
+            'startup_ms': current_app.config.get('STARTUP_MS'),
+            'lazy_import_ms': import_timings()
+        }
+    return jsonify(health)
 
 # ==================== TEACHER ROUTES ====================
 
-@app.route('/api/teachers', methods=['POST'])
+@api.route('/api/teachers', methods=['POST'])
 def create_teacher():
     """Create a new teacher"""
     try:
@@ -99,7 +131,7 @@ def create_teacher():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/teachers/<teacher_id>', methods=['GET'])
+@api.route('/api/teachers/<teacher_id>', methods=['GET'])
 def get_teacher(teacher_id):
     """Get teacher by ID"""
     try:
@@ -114,7 +146,8 @@ def get_teacher(teacher_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/teachers', methods=['GET'])
+@api.route('/api/teachers', methods=['GET'])
+@cached_response('teachers')
 def get_all_teachers():
     """Get all teachers"""
     try:
@@ -129,7 +162,7 @@ def get_all_teachers():
 
 # ==================== STUDENT ROUTES ====================
 
-@app.route('/api/students', methods=['POST'])
+@api.route('/api/students', methods=['POST'])
 def create_student():
     """Create a new student"""
     try:
@@ -156,7 +189,7 @@ def create_student():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/students/<student_id>', methods=['GET'])
+@api.route('/api/students/<student_id>', methods=['GET'])
 def get_student(student_id):
     """Get student by ID"""
     try:
@@ -171,7 +204,8 @@ def get_student(student_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/students', methods=['GET'])
+@api.route('/api/students', methods=['GET'])
+@cached_response('students')
 def get_all_students():
     """Get all students"""
     try:
@@ -184,7 +218,8 @@ def get_all_students():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/students/<student_id>/statistics', methods=['GET'])
+@api.route('/api/students/<student_id>/statistics', methods=['GET'])
+@cached_response('evaluations')
 def get_student_statistics(student_id):
     """Get statistics for a student"""
     try:
@@ -206,29 +241,64 @@ def get_student_statistics(student_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/teachers/<teacher_id>', methods=['DELETE'])
+def _start_cascade_delete(kind, target_id):
+    """Queue background removal of a deleted teacher's or student's evaluations"""
+    task = DeletionTask.create(kind, target_id, Config.CASCADE_DELETE_MODE)
+    cascade_deleter.start(task['_id'])
+    return task
+
+@api.route('/api/teachers/<teacher_id>', methods=['DELETE'])
 def delete_teacher(teacher_id):
-    """Delete a teacher"""
+    """Delete a teacher; their evaluations are cleaned up in the background"""
     try:
-        Teacher.delete(teacher_id)
-        return jsonify({'success': True, 'message': 'Teacher deleted successfully'})
+        result = Teacher.delete(teacher_id)
+        if not result.matched_count:
+            return jsonify({'error': 'Teacher not found'}), 404
+        task = _start_cascade_delete('teacher', teacher_id)
+        return jsonify({
+            'success': True,
+            'message': 'Teacher deleted successfully',
+            'deletion_task_id': str(task['_id'])
+        }), 202
     except Exception as e:
         logger.error(f"Error deleting teacher: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/students/<student_id>', methods=['DELETE'])
+@api.route('/api/students/<student_id>', methods=['DELETE'])
 def delete_student(student_id):
-    """Delete a student"""
+    """Delete a student; their evaluations are cleaned up in the background"""
     try:
-        Student.delete(student_id)
-        return jsonify({'success': True, 'message': 'Student deleted successfully'})
+        result = Student.delete(student_id)
+        if not result.matched_count:
+            return jsonify({'error': 'Student not found'}), 404
+        task = _start_cascade_delete('student', student_id)
+        return jsonify({
+            'success': True,
+            'message': 'Student deleted successfully',
+            'deletion_task_id': str(task['_id'])
+        }), 202
     except Exception as e:
         logger.error(f"Error deleting student: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+@api.route('/api/deletion-tasks/<task_id>', methods=['GET'])
+def get_deletion_task(task_id):
+    """Get cascade delete progress"""
+    try:
+        task = DeletionTask.find_by_id(task_id)
+        if not task:
+            return jsonify({'error': 'Deletion task not found'}), 404
+        
+        return jsonify({
+            'success': True,
+            'task': serialize_doc(task)
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 # ==================== EVALUATION ROUTES ====================
 
-@app.route('/api/upload-model-answer', methods=['POST'])
+@api.route('/api/upload-model-answer', methods=['POST'])
 def upload_model_answer():
     """Handle model answer upload"""
     try:
@@ -244,7 +314,7 @@ def upload_model_answer():
             return jsonify({'error': 'Invalid file type. Only PDF allowed.'}), 400
         
         # Save file
-        file_path = pdf_processor.save_uploaded_file(file, app.config['UPLOAD_FOLDER'])
+        file_path = pdf_processor.save_uploaded_file(file, current_app.config['UPLOAD_FOLDER'])
         
         # Extract text
         text = pdf_processor.extract_text_from_pdf(file_path)
@@ -261,109 +331,311 @@ def upload_model_answer():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/evaluate-answer', methods=['POST'])
+def _parse_evaluation_request():
+    """Validate an evaluate-answer form; returns (params, error response)"""
+    if 'student_file' not in request.files:
+        return None, (jsonify({'error': 'No student file provided'}), 400)
+    
+    student_file = request.files['student_file']
+    model_answer = request.form.get('model_answer')
+    max_marks = request.form.get('max_marks')
+    
+    if not model_answer or not max_marks:
+        return None, (jsonify({'error': 'Model answer and max marks are required'}), 400)
+    
+    if not Config.allowed_file(student_file.filename):
+        return None, (jsonify({'error': 'Invalid file type'}), 400)
+    
+    # Convert max_marks to integer
+    try:
+        max_marks = int(max_marks)
+    except ValueError:
+        return None, (jsonify({'error': 'Invalid max marks value'}), 400)
+    
+    return {
+        'student_file': student_file,
+        'model_answer': model_answer,
+        'max_marks': max_marks,
+        'question': request.form.get('question', ''),
+        'teacher_id': request.form.get('teacher_id'),
+        'student_id': request.form.get('student_id')
+    }, None
+
+def _run_evaluation(params, student_file_path, emit=None):
+    """Extract, grade and store one student script.
+    
+    emit(event, data) is called at each pipeline stage when given, so the
+    streaming route can report progress.
+    """
+    emit = emit or (lambda event, data: None)
+    teacher_id = params['teacher_id']
+    student_id = params['student_id']
+    
+    # Fetch teacher and student info for storing in evaluation
+    teacher_name = 'Unknown'
+    student_name = 'Unknown'
+    student_rollno = 'N/A'
+    
+    if teacher_id:
+        teacher = Teacher.find_by_id(teacher_id)
+        if teacher:
+            teacher_name = teacher.get('name', 'Unknown')
+    
+    if student_id:
+        student = Student.find_by_id(student_id)
+        if student:
+            student_name = student.get('name', 'Unknown')
+            student_rollno = student.get('roll_number', 'N/A')
+    
+    def on_page(page, total):
+        emit('page_ocr', {'page': page, 'total': total})
+    
+    # Try text extraction first (instant)
+    logger.info("Attempting text extraction...")
+    try:
+        student_text = pdf_processor.extract_text_from_pdf(student_file_path)
+        if len(student_text.strip()) < 100:
+            # Not enough text extracted, fall back to OCR
+            logger.info(f"Insufficient text from extraction, using {Config.OCR_STRATEGY} OCR...")
+            student_text = pdf_processor.extract_text_from_scanned_pdf(student_file_path, gemini_service, progress=on_page)
+    except Exception as extract_error:
+        logger.warning(f"Text extraction failed: {str(extract_error)}, using {Config.OCR_STRATEGY} OCR...")
+        student_text = pdf_processor.extract_text_from_scanned_pdf(student_file_path, gemini_service, progress=on_page)
+    emit('text_extracted', {'characters': len(student_text)})
+    
+    # Evaluate using Gemini
+    evaluation_result = gemini_service.evaluate_answer(
+        student_text, 
+        params['model_answer'], 
+        params['max_marks'],
+        params['question'],
+        on_event=emit
+    )
+    
+    # Store evaluation in database
+    evaluation_doc = Evaluation.create(
+        teacher_id=teacher_id,
+        student_id=student_id,
+        question=params['question'],
+        model_answer=params['model_answer'],
+        student_answer=params['student_file'].filename,
+        extracted_text=student_text,
+        max_marks=params['max_marks'],
+        evaluation_result=evaluation_result,
+        teacher_name=teacher_name,
+        student_name=student_name,
+        student_rollno=student_rollno
+    )
+    
+    # Add extracted text to response
+    evaluation_result['extracted_text'] = student_text
+    evaluation_result['evaluation_id'] = str(evaluation_doc['_id'])
+    emit('stored', {'evaluation_id': evaluation_result['evaluation_id']})
+    
+    return evaluation_result
+
+@api.route('/api/evaluate-answer', methods=['POST'])
 def evaluate_answer():
     """Evaluate student answer against model answer and store in database"""
     try:
-        # Validate inputs
-        if 'student_file' not in request.files:
-            return jsonify({'error': 'No student file provided'}), 400
+        params, error = _parse_evaluation_request()
+        if error:
+            return error
+        
+        cost_mb = admission_controller.estimate_cost_mb(request.content_length)
+        with admission_controller.admit(params['teacher_id'], cost_mb):
+            # Save student file
+            student_file_path = pdf_processor.save_uploaded_file(
+                params['student_file'], 
+                current_app.config['UPLOAD_FOLDER']
+            )
+            
+            try:
+                evaluation_result = _run_evaluation(params, student_file_path)
+            finally:
+                # Clean up
+                os.remove(student_file_path)
+        
+        return jsonify({
+            'success': True,
+            'evaluation': evaluation_result
+        })
         
-        student_file = request.files['student_file']
+    except AdmissionRejected as e:
+        return _admission_rejected(e)
+    except Exception as e:
+        logger.error(f"Evaluation error: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+def _admission_rejected(error):
+    """503 response telling the client when to retry"""
+    response = jsonify({'error': str(error), 'retry_after': error.retry_after})
+    response.status_code = 503
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response
+
+def _sse(event, data):
+    """Format one server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+@api.route('/api/evaluate-answer/stream', methods=['POST'])
+@profiling.profiles_own_work
+def evaluate_answer_stream():
+    """Evaluate a student answer, streaming progress as server-sent events.
+    
+    Events: uploaded, page_ocr, text_extracted, grading_started, token,
+    escalated, stored, result, error.
+    """
+    params, error = _parse_evaluation_request()
+    if error:
+        return error
+    
+    # Admission is decided before the stream starts so overload is still a plain 503
+    try:
+        ticket = admission_controller.acquire(
+            params['teacher_id'],
+            admission_controller.estimate_cost_mb(request.content_length)
+        )
+    except AdmissionRejected as e:
+        return _admission_rejected(e)
+    
+    try:
+        student_file_path = pdf_processor.save_uploaded_file(
+            params['student_file'],
+            current_app.config['UPLOAD_FOLDER']
+        )
+    except Exception:
+        admission_controller.release(ticket)
+        raise
+    events = queue.Queue()
+    profile = profiling.request_profile()
+    
+    def emit(event, data):
+        events.put((event, data))
+    
+    def worker():
+        try:
+            with profiling.profile_work(profile):
+                result = _run_evaluation(params, student_file_path, emit)
+            emit('result', {'success': True, 'evaluation': result})
+        except Exception as e:
+            logger.error(f"Evaluation error: {str(e)}")
+            emit('error', {'error': str(e)})
+        finally:
+            if os.path.exists(student_file_path):
+                os.remove(student_file_path)
+            admission_controller.release(ticket)
+            events.put(None)
+    
+    # Started before the response so the ticket and upload are released even if
+    # the client disconnects before the stream is consumed
+    emit('uploaded', {'filename': params['student_file'].filename})
+    threading.Thread(target=worker, daemon=True).start()
+    
+    def generate():
+        while True:
+            try:
+                item = events.get(timeout=Config.SSE_HEARTBEAT_SECONDS)
+            except queue.Empty:
+                # Comment line keeps proxies and the browser from timing out
+                yield ": keep-alive\n\n"
+                continue
+            if item is None:
+                break
+            yield _sse(*item)
+    
+    return Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+@api.route('/api/evaluate-batch', methods=['POST'])
+@profiling.profiles_own_work
+async def evaluate_batch():
+    """Evaluate many student scripts concurrently through the async pipeline"""
+    try:
+        student_files = request.files.getlist('student_files')
+        student_ids = request.form.getlist('student_ids')
         model_answer = request.form.get('model_answer')
         max_marks = request.form.get('max_marks')
         question = request.form.get('question', '')
         teacher_id = request.form.get('teacher_id')
-        student_id = request.form.get('student_id')
+        
+        if not student_files:
+            return jsonify({'error': 'No student files provided'}), 400
         
         if not model_answer or not max_marks:
             return jsonify({'error': 'Model answer and max marks are required'}), 400
         
-        if not Config.allowed_file(student_file.filename):
+        if any(not Config.allowed_file(f.filename) for f in student_files):
             return jsonify({'error': 'Invalid file type'}), 400
         
-        # Convert max_marks to integer
         try:
             max_marks = int(max_marks)
         except ValueError:
             return jsonify({'error': 'Invalid max marks value'}), 400
         
-        # Fetch teacher and student info for storing in evaluation
-        teacher_name = 'Unknown'
-        student_name = 'Unknown'
-        student_rollno = 'N/A'
-        
+        teacher = {'teacher_id': teacher_id, 'teacher_name': 'Unknown'}
         if teacher_id:
-            teacher = Teacher.find_by_id(teacher_id)
-            if teacher:
-                teacher_name = teacher.get('name', 'Unknown')
-        
-        if student_id:
-            student = Student.find_by_id(student_id)
-            if student:
-                student_name = student.get('name', 'Unknown')
-                student_rollno = student.get('roll_number', 'N/A')
-        
-        # Save student file
-        student_file_path = pdf_processor.save_uploaded_file(
-            student_file, 
-            app.config['UPLOAD_FOLDER']
-        )
-        
-        # Try text extraction first (instant)
-        logger.info("Attempting text extraction...")
-        try:
-            student_text = pdf_processor.extract_text_from_pdf(student_file_path)
-            if len(student_text.strip()) < 100:
-                # Not enough text extracted, use Gemini vision
-                logger.info("Insufficient text from extraction, using Gemini vision API...")
-                images = pdf_processor.convert_pdf_to_images(student_file_path, max_pages=5)
-                student_text = pdf_processor.extract_text_from_images_via_gemini(images, gemini_service)
-        except Exception as extract_error:
-            logger.warning(f"Text extraction failed: {str(extract_error)}, using Gemini vision...")
-            images = pdf_processor.convert_pdf_to_images(student_file_path, max_pages=5)
-            student_text = pdf_processor.extract_text_from_images_via_gemini(images, gemini_service)
-        
-        # Evaluate using Gemini
-        evaluation_result = gemini_service.evaluate_answer(
-            student_text, 
-            model_answer, 
-            max_marks,
-            question
-        )
-        
-        # Store evaluation in database
-        evaluation_doc = Evaluation.create(
-            teacher_id=teacher_id,
-            student_id=student_id,
-            question=question,
-            model_answer=model_answer,
-            student_answer=student_file.filename,
-            extracted_text=student_text,
-            max_marks=max_marks,
-            evaluation_result=evaluation_result,
-            teacher_name=teacher_name,
-            student_name=student_name,
-            student_rollno=student_rollno
-        )
-        
-        # Add extracted text to response
-        evaluation_result['extracted_text'] = student_text
-        evaluation_result['evaluation_id'] = str(evaluation_doc['_id'])
-        
-        # Clean up
-        os.remove(student_file_path)
-        
-        return jsonify({
+            teacher_doc = Teacher.find_by_id(teacher_id)
+            if teacher_doc:
+                teacher['teacher_name'] = teacher_doc.get('name', 'Unknown')
+        
+        # A batch occupies one slot; its memory estimate covers the whole upload
+        cost_mb = admission_controller.estimate_cost_mb(request.content_length)
+        with admission_controller.admit(teacher_id, cost_mb):
+            scripts = []
+            for idx, student_file in enumerate(student_files):
+                student_id = student_ids[idx] if idx < len(student_ids) else None
+                script = {
+                    'filename': student_file.filename,
+                    'student_id': student_id,
+                    'student_name': 'Unknown',
+                    'student_rollno': 'N/A'
+                }
+                if student_id:
+                    student = Student.find_by_id(student_id)
+                    if student:
+                        script['student_name'] = student.get('name', 'Unknown')
+                        script['student_rollno'] = student.get('roll_number', 'N/A')
+                script['file_path'] = pdf_processor.save_uploaded_file(
+                    student_file,
+                    current_app.config['UPLOAD_FOLDER']
+                )
+                scripts.append(script)
+            
+            # Runs on asgiref's event loop thread, not the request thread
+            with profiling.profile_work(profiling.request_profile()) as profile:
+                try:
+                    results = await async_pipeline.evaluate_batch(scripts, model_answer, max_marks, question, teacher)
+                finally:
+                    await async_pipeline.close_loop_clients()
+        
+        response = jsonify({
             'success': True,
-            'evaluation': evaluation_result
+            'results': results,
+            'count': len(results)
         })
+        if profile.get('id'):
+            response.headers['X-Profile-Id'] = profile['id']
+        return response
         
+    except AdmissionRejected as e:
+        return _admission_rejected(e)
     except Exception as e:
-        logger.error(f"Evaluation error: {str(e)}")
+        logger.error(f"Batch evaluation error: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/evaluations', methods=['GET'])
+@api.route('/api/grading/metrics', methods=['GET'])
+def get_grading_metrics():
+    """Per-tier latency, token and escalation metrics for cascade grading"""
+    return jsonify({
+        'success': True,
+        'cascade_enabled': Config.CASCADE_GRADING,
+        'metrics': grading_metrics.snapshot()
+    })
+
+@api.route('/api/evaluations', methods=['GET'])
 def get_all_evaluations():
     """Get all evaluations"""
     try:
@@ -376,7 +648,55 @@ def get_all_evaluations():
         logger.error(f"Error fetching evaluations: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/evaluations/<evaluation_id>', methods=['GET'])
+@api.route('/api/evaluations/export', methods=['GET'])
+def export_evaluations():
+    """Stream evaluations as CSV or XLSX, filtered by teacher, class and date range"""
+    try:
+        export_format = request.args.get('format', 'csv').lower()
+        if export_format not in ('csv', 'xlsx'):
+            return jsonify({'error': 'Invalid format. Use csv or xlsx.'}), 400
+        
+        try:
+            date_from = request.args.get('from')
+            date_to = request.args.get('to')
+            date_from = datetime.fromisoformat(date_from) if date_from else None
+            date_to = datetime.fromisoformat(date_to) if date_to else None
+        except ValueError:
+            return jsonify({'error': 'Invalid date. Use YYYY-MM-DD.'}), 400
+        
+        class_name = request.args.get('class')
+        student_ids = Student.find_ids_by_class(class_name) if class_name else None
+        
+        query = Evaluation.build_filter_query(
+            teacher_id=request.args.get('teacher_id'),
+            student_ids=student_ids,
+            date_from=date_from,
+            date_to=date_to
+        )
+        cursor = Evaluation.export_cursor(query, export.EXPORT_FIELDS)
+        
+        if export_format == 'csv':
+            chunks = export.stream_csv(cursor)
+            mimetype = 'text/csv'
+        else:
+            chunks = export.stream_xlsx(cursor)
+            mimetype = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+        
+        filename = f"evaluations_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.{export_format}"
+        if request.args.get('gzip', 'false').lower() == 'true':
+            chunks = export.gzip_stream(chunks)
+            mimetype = 'application/gzip'
+            filename += '.gz'
+        
+        return Response(chunks, mimetype=mimetype, headers={
+            'Content-Disposition': f'attachment; filename="{filename}"',
+            'X-Accel-Buffering': 'no'
+        })
+    except Exception as e:
+        logger.error(f"Error exporting evaluations: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@api.route('/api/evaluations/<evaluation_id>', methods=['GET'])
 def get_evaluation(evaluation_id):
     """Get evaluation by ID"""
     try:
@@ -391,7 +711,7 @@ def get_evaluation(evaluation_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/evaluations/student/<student_id>', methods=['GET'])
+@api.route('/api/evaluations/student/<student_id>', methods=['GET'])
 def get_student_evaluations(student_id):
     """Get all evaluations for a student"""
     try:
@@ -406,7 +726,7 @@ def get_student_evaluations(student_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/evaluations/teacher/<teacher_id>', methods=['GET'])
+@api.route('/api/evaluations/teacher/<teacher_id>', methods=['GET'])
 def get_teacher_evaluations(teacher_id):
     """Get all evaluations by a teacher"""
     try:
@@ -421,7 +741,8 @@ def get_teacher_evaluations(teacher_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/evaluations/recent', methods=['GET'])
+@api.route('/api/evaluations/recent', methods=['GET'])
+@cached_response('evaluations')
 def get_recent_evaluations():
     """Get recent evaluations"""
     try:
@@ -436,7 +757,7 @@ def get_recent_evaluations():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/evaluations/<evaluation_id>', methods=['DELETE'])
+@api.route('/api/evaluations/<evaluation_id>', methods=['DELETE'])
 def delete_evaluation(evaluation_id):
     """Delete an evaluation"""
     try:
@@ -452,7 +773,148 @@ def delete_evaluation(evaluation_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/ocr-only', methods=['POST'])
+# ==================== RE-GRADE ROUTES ====================
+
+@api.route('/api/regrade-jobs', methods=['POST'])
+def create_regrade_job():
+    """Start a background re-grade of stored evaluations"""
+    try:
+        data = request.json or {}
+        
+        try:
+            date_from = datetime.fromisoformat(data['from']) if data.get('from') else None
+            date_to = datetime.fromisoformat(data['to']) if data.get('to') else None
+        except ValueError:
+            return jsonify({'error': 'Invalid date. Use YYYY-MM-DD.'}), 400
+        
+        filters = {
+            'question': data.get('question'),
+            'teacher_id': data.get('teacher_id'),
+            'date_from': date_from,
+            'date_to': date_to
+        }
+        if not any(filters.values()):
+            return jsonify({'error': 'At least one of question, teacher_id, from or to is required'}), 400
+        
+        job = RegradeJob.create(filters, data.get('model_answer'))
+        regrade_runner.start(job['_id'])
+        
+        return jsonify({
+            'success': True,
+            'job': serialize_doc(RegradeJob.find_by_id(job['_id']))
+        }), 202
+    except Exception as e:
+        logger.error(f"Error creating re-grade job: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@api.route('/api/regrade-jobs', methods=['GET'])
+def get_regrade_jobs():
+    """List recent re-grade jobs"""
+    try:
+        jobs = RegradeJob.get_all()
+        return jsonify({
+            'success': True,
+            'jobs': serialize_doc(jobs),
+            'count': len(jobs)
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@api.route('/api/regrade-jobs/<job_id>', methods=['GET'])
+def get_regrade_job(job_id):
+    """Get re-grade job progress"""
+    try:
+        job = RegradeJob.find_by_id(job_id)
+        if not job:
+            return jsonify({'error': 'Re-grade job not found'}), 404
+        
+        return jsonify({
+            'success': True,
+            'job': serialize_doc(job)
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@api.route('/api/regrade-jobs/<job_id>/resume', methods=['POST'])
+def resume_regrade_job(job_id):
+    """Retry a failed re-grade job; evaluations it already re-graded are skipped"""
+    try:
+        job = RegradeJob.find_by_id(job_id)
+        if not job:
+            return jsonify({'error': 'Re-grade job not found'}), 404
+        if not regrade_runner.start(job['_id']):
+            return jsonify({'error': f"Re-grade job is {job['status']} and cannot be resumed"}), 409
+        
+        return jsonify({
+            'success': True,
+            'job': serialize_doc(RegradeJob.find_by_id(job['_id']))
+        }), 202
+    except Exception as e:
+        logger.error(f"Error resuming re-grade job: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+# ==================== ANALYTICS ROUTES ====================
+
+ANALYTICS_DIMENSIONS = {'classes': 'class', 'teachers': 'teacher', 'questions': 'question'}
+
+@api.route('/api/analytics/<dimension>', methods=['GET'])
+@cached_response('analytics')
+def get_analytics(dimension):
+    """Get precomputed summaries for classes, teachers or questions"""
+    try:
+        if dimension not in ANALYTICS_DIMENSIONS:
+            return jsonify({'error': 'Unknown analytics dimension'}), 404
+        
+        limit = request.args.get('limit', 100, type=int)
+        summaries = Analytics.get_summaries(ANALYTICS_DIMENSIONS[dimension], limit)
+        return jsonify({
+            'success': True,
+            dimension: serialize_doc(summaries),
+            'count': len(summaries)
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@api.route('/api/analytics/refresh', methods=['POST'])
+def refresh_analytics():
+    """Recompute analytics summaries now"""
+    try:
+        counts = Analytics.refresh()
+        return jsonify({
+            'success': True,
+            'summaries': counts
+        })
+    except Exception as e:
+        logger.error(f"Error refreshing analytics: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+# ==================== PROFILING ROUTES ====================
+
+@api.route('/api/profiles', methods=['GET'])
+def get_profiles():
+    """List recently stored request profiles"""
+    if not profiling.is_authorized(request):
+        return jsonify({'error': 'Profiling is disabled or token missing'}), 403
+    
+    profiles = profiling.list_profiles()
+    return jsonify({
+        'success': True,
+        'profiles': profiles,
+        'count': len(profiles)
+    })
+
+@api.route('/api/profiles/<profile_id>', methods=['GET'])
+def download_profile(profile_id):
+    """Download a stored profile as an HTML report"""
+    if not profiling.is_authorized(request):
+        return jsonify({'error': 'Profiling is disabled or token missing'}), 403
+    
+    path = profiling.profile_path(profile_id)
+    if not path:
+        return jsonify({'error': 'Profile not found'}), 404
+    return send_file(os.path.abspath(path), mimetype='text/html')
+
+@api.route('/api/ocr-only', methods=['POST'])
 def ocr_only():
     """Extract text from handwritten PDF without evaluation"""
     try:
@@ -465,7 +927,7 @@ def ocr_only():
             return jsonify({'error': 'Invalid file type'}), 400
         
         # Save and process file
-        file_path = pdf_processor.save_uploaded_file(file, app.config['UPLOAD_FOLDER'])
+        file_path = pdf_processor.save_uploaded_file(file, current_app.config['UPLOAD_FOLDER'])
         extracted_text = pdf_processor.extract_text_from_pdf(file_path)
         
         # Clean up
@@ -479,6 +941,56 @@ def ocr_only():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def create_app():
+    """Application factory used by both gunicorn and the development server"""
+    app = Flask(__name__)
+    
+    # Configure CORS for both development and production
+    cors_origins = [
+        'http://localhost:3000',  # Local development
+        'http://localhost:5000',
+        os.getenv('FRONTEND_URL', 'http://localhost:3000')  # Production Vercel URL
+    ]
+    CORS(app, origins=cors_origins)
+    
+    # Configuration
+    app.config['UPLOAD_FOLDER'] = Config.UPLOAD_FOLDER
+    app.config['MAX_CONTENT_LENGTH'] = Config.MAX_FILE_SIZE
+    
+    # Create uploads folder if it doesn't exist
+    if not os.path.exists(Config.UPLOAD_FOLDER):
+        os.makedirs(Config.UPLOAD_FOLDER)
+    
+    app.register_blueprint(api)
+    profiling.init_app(app)
+    
+    if Config.GEMINI_BACKEND == 'stub':
+        logger.warning("=" * 72)
+        logger.warning("GEMINI_BACKEND=stub: every evaluation gets a RANDOM grade from the offline")
+        logger.warning("load-test stub and no answer is actually read. Never run this in production.")
+        logger.warning("=" * 72)
+    
+    app.config['STARTUP_MS'] = round((time.perf_counter() - _startup_started) * 1000, 1)
+    if Config.DEBUG:
+        logger.info(f"Startup report: app ready in {app.config['STARTUP_MS']} ms "
+                    f"(PDF/vision stack, Gemini SDK and MongoDB load on first use)")
+    return app
+
+def start_background_jobs():
+    """Start the periodic background jobs (one worker runs each tick, see PeriodicJob).
+    
+    Called from gunicorn's post_worker_init and the __main__ block, never on
+    import, so tools and spawned OCR/PDF worker processes that import this
+    module do not start threads or connect to MongoDB.
+    """
+    analytics_job.start()
+    regrade_resume_job.start()
+    archive_job.start()
+    orphan_sweep_job.start()
+
+# WSGI entry point (gunicorn -c gunicorn.conf.py app:app)
+app = create_app()
+
 if __name__ == '__main__':
     # Validate required environment variables
     required_vars = ['GEMINI_API_KEY', 'MONGO_URI']
@@ -488,17 +1000,16 @@ if __name__ == '__main__':
         logger.error(f"Missing required environment variables: {', '.join(missing_vars)}")
         raise RuntimeError(f"Missing environment variables: {', '.join(missing_vars)}")
     
-    # Create uploads folder if it doesn't exist
-    if not os.path.exists(Config.UPLOAD_FOLDER):
-        os.makedirs(Config.UPLOAD_FOLDER)
-    
     try:
         # Test database connection on startup
         logger.info("Testing database connection...")
         db_connection.connect()
         logger.info("Database connection successful")
+        start_background_jobs()
         
-        app.run(debug=True, host='0.0.0.0', port=5000)
+        # Development server only; production runs under gunicorn
+        app.run(debug=Config.DEBUG, host='0.0.0.0', port=Config.PORT)
     finally:
-        # Close database connection on shutdown
+        # Flush buffered writes and close database connection on shutdown
+        evaluation_writer.close()
         db_connection.close()
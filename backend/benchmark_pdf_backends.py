@@ -0,0 +1,54 @@
+"""Compare PDF text backends on a corpus of model answers / typed scripts.
+
+Usage: python benchmark_pdf_backends.py <pdf or directory> [...] [--runs N]
+"""
+import argparse
+import os
+import statistics
+import time
+from utils.pdf_backends import BACKENDS, extract_pages, shutdown
+
+def collect_pdfs(paths):
+    pdfs = []
+    for path in paths:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                if name.lower().endswith('.pdf'):
+                    pdfs.append(os.path.join(path, name))
+        else:
+            pdfs.append(path)
+    return pdfs
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('paths', nargs='+')
+    parser.add_argument('--runs', type=int, default=3)
+    args = parser.parse_args()
+    
+    pdfs = collect_pdfs(args.paths)
+    print(f"Benchmarking {len(pdfs)} PDF(s), {args.runs} run(s) each\n")
+    print(f"{'backend':<10} {'mode':<9} {'median s':>9} {'pages':>7} {'chars':>10}")
+    
+    for name in BACKENDS:
+        for parallel in (False, True):
+            timings = []
+            pages = chars = 0
+            try:
+                for _ in range(args.runs):
+                    start = time.perf_counter()
+                    pages = chars = 0
+                    for pdf in pdfs:
+                        text_pages = extract_pages(pdf, name, parallel=parallel)
+                        pages += len(text_pages)
+                        chars += sum(len(page) for page in text_pages)
+                    timings.append(time.perf_counter() - start)
+            except Exception as e:
+                print(f"{name:<10} {'pool' if parallel else 'serial':<9} failed: {str(e)[:60]}")
+                continue
+            print(f"{name:<10} {'pool' if parallel else 'serial':<9} "
+                  f"{statistics.median(timings):>9.3f} {pages:>7} {chars:>10}")
+    
+    shutdown()
+
+if __name__ == '__main__':
+    main()
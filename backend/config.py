@@ -10,6 +10,94 @@ else:
     load_dotenv()
 
 class Config:
+    # Gemini models. GEMINI_BACKEND=stub swaps in an offline fake for load tests
+    GEMINI_BACKEND = os.getenv('GEMINI_BACKEND', 'gemini')
+    GEMINI_STUB_LATENCY = float(os.getenv('GEMINI_STUB_LATENCY', 2.0))
+    GEMINI_MODEL = os.getenv('GEMINI_MODEL', 'gemini-2.5-flash')
+    
+    # Cascade grading: fast model first, strong model for uncertain grades
+    CASCADE_GRADING = os.getenv('CASCADE_GRADING', 'true').lower() == 'true'
+    GRADING_FAST_MODEL = os.getenv('GRADING_FAST_MODEL', 'gemini-2.5-flash-lite')
+    GRADING_STRONG_MODEL = os.getenv('GRADING_STRONG_MODEL', 'gemini-2.5-flash')
+    CASCADE_MIN_CONFIDENCE = float(os.getenv('CASCADE_MIN_CONFIDENCE', 0.75))
+    CASCADE_BOUNDARY_MARGIN = float(os.getenv('CASCADE_BOUNDARY_MARGIN', 2))
+    GRADING_FAST_COST_PER_1K_TOKENS = float(os.getenv('GRADING_FAST_COST_PER_1K_TOKENS', 0))
+    GRADING_STRONG_COST_PER_1K_TOKENS = float(os.getenv('GRADING_STRONG_COST_PER_1K_TOKENS', 0))
+    
+    # Prompt token budget for grading
+    PROMPT_CHARS_PER_TOKEN = float(os.getenv('PROMPT_CHARS_PER_TOKEN', 4))
+    PROMPT_MAX_INPUT_TOKENS = int(os.getenv('PROMPT_MAX_INPUT_TOKENS', 12000))
+    PROMPT_MODEL_ANSWER_MAX_TOKENS = int(os.getenv('PROMPT_MODEL_ANSWER_MAX_TOKENS', 4000))
+    PROMPT_MAX_SECTIONS = int(os.getenv('PROMPT_MAX_SECTIONS', 8))
+    
+    # Grade-once dedup of identical short answers in a batch
+    DEDUP_MAX_TOKENS = int(os.getenv('DEDUP_MAX_TOKENS', 300))
+    DEDUP_NEAR_DUPLICATES = os.getenv('DEDUP_NEAR_DUPLICATES', 'false').lower() == 'true'
+    DEDUP_SIMILARITY_THRESHOLD = float(os.getenv('DEDUP_SIMILARITY_THRESHOLD', 0.9))
+    DEDUP_SHINGLE_SIZE = int(os.getenv('DEDUP_SHINGLE_SIZE', 3))
+    DEDUP_MINHASH_PERMUTATIONS = int(os.getenv('DEDUP_MINHASH_PERMUTATIONS', 64))
+    
+    # Admission control for heavy evaluation requests (per process)
+    ADMISSION_MAX_CONCURRENT = int(os.getenv('ADMISSION_MAX_CONCURRENT', 4))
+    ADMISSION_MEMORY_BUDGET_MB = float(os.getenv('ADMISSION_MEMORY_BUDGET_MB', 1024))
+    ADMISSION_BASE_COST_MB = float(os.getenv('ADMISSION_BASE_COST_MB', 100))
+    ADMISSION_MB_PER_UPLOAD_MB = float(os.getenv('ADMISSION_MB_PER_UPLOAD_MB', 20))
+    ADMISSION_QUEUE_SIZE = int(os.getenv('ADMISSION_QUEUE_SIZE', 16))
+    ADMISSION_QUEUE_TIMEOUT = float(os.getenv('ADMISSION_QUEUE_TIMEOUT', 30))
+    ADMISSION_MAX_PER_TEACHER = int(os.getenv('ADMISSION_MAX_PER_TEACHER', 2))
+    
+    # Materialised analytics refresh interval in seconds (0 disables the scheduler)
+    ANALYTICS_REFRESH_INTERVAL = int(os.getenv('ANALYTICS_REFRESH_INTERVAL', 600))
+    
+    # Write-behind batching of evaluation writes
+    WRITE_BEHIND_ENABLED = os.getenv('WRITE_BEHIND_ENABLED', 'true').lower() == 'true'
+    WRITE_BEHIND_REQUEST_PATH = os.getenv('WRITE_BEHIND_REQUEST_PATH', 'false').lower() == 'true'
+    WRITE_BEHIND_BATCH_SIZE = int(os.getenv('WRITE_BEHIND_BATCH_SIZE', 200))
+    WRITE_BEHIND_FLUSH_INTERVAL = float(os.getenv('WRITE_BEHIND_FLUSH_INTERVAL', 1.0))
+    WRITE_BEHIND_W = os.getenv('WRITE_BEHIND_W', '1')
+    WRITE_BEHIND_JOURNAL = os.getenv('WRITE_BEHIND_JOURNAL', 'true').lower() == 'true'
+    WRITE_BEHIND_SPILL_PATH = os.getenv('WRITE_BEHIND_SPILL_PATH', 'evaluation_writes.spill.jsonl')
+    WRITE_BEHIND_DEAD_LETTER_PATH = os.getenv('WRITE_BEHIND_DEAD_LETTER_PATH', 'evaluation_writes.dead.jsonl')
+    
+    # Bulk re-grade jobs
+    REGRADE_CONCURRENCY = int(os.getenv('REGRADE_CONCURRENCY', 8))
+    REGRADE_PAGE_SIZE = int(os.getenv('REGRADE_PAGE_SIZE', 50))
+    REGRADE_LEASE_SECONDS = int(os.getenv('REGRADE_LEASE_SECONDS', 600))
+    
+    # Tiered retention: evaluations older than ARCHIVE_AFTER_DAYS (0 = never) move out of
+    # the hot collection to the archive ('mongo' collection or gzipped 'file's), leaving
+    # per-student monthly rollups. 'file' needs ARCHIVE_DIR on a persistent volume
+    ARCHIVE_AFTER_DAYS = int(os.getenv('ARCHIVE_AFTER_DAYS', 0))
+    ARCHIVE_BACKEND = os.getenv('ARCHIVE_BACKEND', 'mongo')
+    ARCHIVE_DIR = os.getenv('ARCHIVE_DIR')
+    ARCHIVE_BATCH_SIZE = int(os.getenv('ARCHIVE_BATCH_SIZE', 500))
+    ARCHIVE_INTERVAL = int(os.getenv('ARCHIVE_INTERVAL', 3600))
+    
+    # Cascade deletes: a deleted teacher/student's evaluations are removed in the
+    # background ('delete') or moved to the archive ('archive'); the sweeper also
+    # cleans up orphaned evaluations every ORPHAN_SWEEP_INTERVAL seconds (0 = off)
+    CASCADE_DELETE_MODE = os.getenv('CASCADE_DELETE_MODE', 'archive')
+    CASCADE_BATCH_SIZE = int(os.getenv('CASCADE_BATCH_SIZE', 500))
+    CASCADE_LEASE_SECONDS = int(os.getenv('CASCADE_LEASE_SECONDS', 300))
+    ORPHAN_SWEEP_INTERVAL = int(os.getenv('ORPHAN_SWEEP_INTERVAL', 3600))
+    
+    # Server-sent events (/api/evaluate-answer/stream)
+    SSE_HEARTBEAT_SECONDS = int(os.getenv('SSE_HEARTBEAT_SECONDS', 15))
+    
+    # Request profiling (pyinstrument). On-demand profiling needs PROFILING_TOKEN
+    # in the PROFILING_HEADER header (never a query parameter, which gets logged)
+    PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', 'false').lower() == 'true'
+    PROFILING_TOKEN = os.getenv('PROFILING_TOKEN')
+    PROFILING_HEADER = os.getenv('PROFILING_HEADER', 'X-Profile')
+    PROFILING_SAMPLE_RATE = float(os.getenv('PROFILING_SAMPLE_RATE', 0))
+    PROFILING_INTERVAL = float(os.getenv('PROFILING_INTERVAL', 0.005))
+    PROFILING_DIR = os.getenv('PROFILING_DIR', 'profiles')
+    PROFILING_MAX_STORED = int(os.getenv('PROFILING_MAX_STORED', 50))
+    
+    # Server Configuration
+    DEBUG = os.getenv('FLASK_DEBUG', 'false').lower() == 'true'
+    PORT = int(os.getenv('PORT', 5000))
+    
     GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
     UPLOAD_FOLDER = os.getenv('UPLOAD_FOLDER', 'uploads')
     MAX_FILE_SIZE = int(os.getenv('MAX_FILE_SIZE', 16 * 1024 * 1024))
@@ -18,6 +106,39 @@ class Config:
     # MongoDB Configuration
     MONGO_URI = os.getenv('MONGO_URI')
     MONGO_DB_NAME = os.getenv('MONGO_DB_NAME', 'ai_examiner')  
+    # Reporting reads go to secondaries lagging at most this many seconds (MongoDB minimum 90; -1 = unbounded)
+    MONGO_REPORTING_MAX_STALENESS = int(os.getenv('MONGO_REPORTING_MAX_STALENESS', 90))
+    
+    # Text-layer PDF extraction: pypdf2, pdfium (pypdfium2) or pdfminer
+    PDF_TEXT_BACKEND = os.getenv('PDF_TEXT_BACKEND', 'pypdf2')
+    PDF_PARALLEL_PAGE_THRESHOLD = int(os.getenv('PDF_PARALLEL_PAGE_THRESHOLD', 20))
+    PDF_TEXT_WORKERS = int(os.getenv('PDF_TEXT_WORKERS', 4))
+    
+    # OCR strategy for scanned scripts: gemini, local, local-then-gemini-on-low-confidence
+    OCR_STRATEGY = os.getenv('OCR_STRATEGY', 'gemini')
+    LOCAL_OCR_LANGUAGES = os.getenv('LOCAL_OCR_LANGUAGES', 'en').split(',')
+    LOCAL_OCR_WORKERS = int(os.getenv('LOCAL_OCR_WORKERS', 2))
+    LOCAL_OCR_DPI = int(os.getenv('LOCAL_OCR_DPI', 150))
+    LOCAL_OCR_MIN_CONFIDENCE = float(os.getenv('LOCAL_OCR_MIN_CONFIDENCE', 0.5))
+    LOCAL_OCR_PAGE_TIMEOUT = int(os.getenv('LOCAL_OCR_PAGE_TIMEOUT', 120))
+    
+    # Page preprocessing before Gemini vision OCR
+    OCR_PREPROCESS = os.getenv('OCR_PREPROCESS', 'true').lower() == 'true'
+    OCR_BINARIZE = os.getenv('OCR_BINARIZE', 'false').lower() == 'true'
+    OCR_INK_CONTRAST = int(os.getenv('OCR_INK_CONTRAST', 40))
+    OCR_BLANK_INK_RATIO = float(os.getenv('OCR_BLANK_INK_RATIO', 0.002))
+    OCR_CROP_PADDING = int(os.getenv('OCR_CROP_PADDING', 8))
+    OCR_MAX_DIMENSION = int(os.getenv('OCR_MAX_DIMENSION', 1600))
+    OCR_TARGET_BYTES = int(os.getenv('OCR_TARGET_BYTES', 60 * 1024))
+    
+    # Async evaluation pipeline (/api/evaluate-batch)
+    ASYNC_MAX_CONCURRENCY = int(os.getenv('ASYNC_MAX_CONCURRENCY', 100))
+    ASYNC_MONGO_POOL_SIZE = int(os.getenv('ASYNC_MONGO_POOL_SIZE', 50))
+    
+    # Response cache for read endpoints polled by the dashboard
+    RESPONSE_CACHE_ENABLED = os.getenv('RESPONSE_CACHE_ENABLED', 'true').lower() == 'true'
+    RESPONSE_CACHE_TTL = int(os.getenv('RESPONSE_CACHE_TTL', 30))
+    RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv('RESPONSE_CACHE_MAX_ENTRIES', 512))
     
     @staticmethod
     def allowed_file(filename):
@@ -0,0 +1,60 @@
+"""Gunicorn configuration for production serving.
+
+Usage: gunicorn -c gunicorn.conf.py app:app
+
+Evaluation requests spend most of their time waiting on PDF rasterisation
+and Gemini, so workers use threads (gthread) and generous timeouts. Every
+value can be overridden from the environment.
+"""
+import os
+from config import Config
+
+# Binding
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+
+# Workers - a small fixed number, since each has its own OCR and PDF process
+# pools and cpu_count() reports the host's cores inside containers
+workers = int(os.getenv('WEB_CONCURRENCY', 4))
+# Every admitted or queued evaluation holds a thread, so there must be enough
+# for the admission queue to fill (and reject with 503 + Retry-After) while
+# GUNICORN_READ_THREADS stay free for dashboard and listing requests
+threads = int(os.getenv('GUNICORN_THREADS', Config.ADMISSION_MAX_CONCURRENT + Config.ADMISSION_QUEUE_SIZE
+                        + int(os.getenv('GUNICORN_READ_THREADS', 8))))
+worker_class = 'gthread'
+
+# Long evaluations (OCR + grading) can take minutes
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 300))
+
+# On SIGTERM, in-flight evaluations get this long to finish before workers are killed
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', 300))
+
+# Keep-alive for connections coming through the platform load balancer
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', 75))
+
+# Recycle workers periodically to bound memory growth from PDF/image processing
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 500))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', 50))
+
+# MongoClient is not fork-safe, so the app is loaded in each worker after fork
+preload_app = False
+
+accesslog = '-'
+errorlog = '-'
+loglevel = os.getenv('GUNICORN_LOG_LEVEL', 'info')
+
+def post_worker_init(worker):
+    """Start the app's periodic background jobs in each worker once it has loaded the app"""
+    from app import start_background_jobs
+    start_background_jobs()
+
+def worker_int(worker):
+    """Log when a worker is interrupted (SIGINT/SIGQUIT)"""
+    worker.log.info(f"Worker {worker.pid} interrupted")
+
+def worker_exit(server, worker):
+    """Flush buffered writes and close the database connection once a worker has drained"""
+    from utils.write_behind import evaluation_writer
+    from utils.db_connection import db_connection
+    evaluation_writer.close()
+    db_connection.close()
+    worker.log.info(f"Worker {worker.pid} exited, database connection closed")
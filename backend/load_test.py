@@ -0,0 +1,293 @@
+"""Replay an exam-day traffic mix against a running backend and report per-endpoint latency.
+
+Start the server against a local MongoDB with the offline model stub, e.g.
+
+    MONGO_URI=mongodb://localhost:27017 MONGO_DB_NAME=ai_examiner_loadtest \\
+    GEMINI_BACKEND=stub GEMINI_STUB_LATENCY=2 gunicorn -c gunicorn.conf.py app:app
+
+then run
+
+    python load_test.py --url http://localhost:5000 --users 50 --duration 300
+
+The harness creates synthetic teachers and students (emails tagged with a run
+id), generates typed and scanned-looking PDF scripts, and runs one thread per
+simulated user picking actions by weight: script uploads for evaluation,
+model-answer uploads, dashboard polling and history listing. Throughput,
+latency percentiles and error rates are printed per endpoint at the end.
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+import zlib
+from collections import defaultdict
+
+# (action, weight) - roughly one upload per four reads during an exam session
+DEFAULT_MIX = {
+    'evaluate': 15,
+    'model_answer': 3,
+    'dashboard': 50,
+    'history': 32
+}
+
+WORDS = (
+    "photosynthesis converts light energy into chemical energy stored in glucose "
+    "chlorophyll absorbs light in the thylakoid membranes while the calvin cycle "
+    "fixes carbon dioxide in the stroma oxygen is released as a by product the "
+    "rate depends on light intensity temperature and carbon dioxide concentration"
+).split()
+
+def make_pdf(lines, scanned=False):
+    """Build a one-page PDF. Scanned scripts carry ink strokes but no text layer,
+    so they take the OCR path on the server."""
+    if scanned:
+        strokes = []
+        for i in range(len(lines)):
+            y = 780 - i * 18
+            strokes.append(f"72 {y} {random.randint(200, 460)} 2 re f")
+        content = "\n".join(strokes)
+    else:
+        escaped = [line.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)') for line in lines]
+        content = "BT /F1 11 Tf 14 TL 72 780 Td\n" + "\n".join(f"({line}) '" for line in escaped) + "\nET"
+    stream = zlib.compress(content.encode('latin-1'))
+
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] "
+        b"/Resources << /Font << /F1 5 0 R >> >> /Contents 4 0 R >>",
+        b"<< /Length " + str(len(stream)).encode() + b" /Filter /FlateDecode >>\nstream\n"
+        + stream + b"\nendstream",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"
+    ]
+    pdf = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(pdf))
+        pdf += f"{number} 0 obj\n".encode() + body + b"\nendobj\n"
+    xref = len(pdf)
+    pdf += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    pdf += b"".join(f"{offset:010d} 00000 n \n".encode() for offset in offsets)
+    pdf += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return pdf
+
+def random_answer(lines=30):
+    return [" ".join(random.choices(WORDS, k=random.randint(8, 12))) for _ in range(lines)]
+
+def encode_multipart(fields, files):
+    """Encode form fields and (name, filename, bytes) files as multipart/form-data"""
+    boundary = uuid.uuid4().hex
+    body = b""
+    for name, value in fields.items():
+        body += (f"--{boundary}\r\nContent-Disposition: form-data; name=\"{name}\"\r\n\r\n"
+                 f"{value}\r\n").encode()
+    for name, filename, data in files:
+        body += (f"--{boundary}\r\nContent-Disposition: form-data; name=\"{name}\"; "
+                 f"filename=\"{filename}\"\r\nContent-Type: application/pdf\r\n\r\n").encode()
+        body += data + b"\r\n"
+    body += f"--{boundary}--\r\n".encode()
+    return body, f"multipart/form-data; boundary={boundary}"
+
+class Stats:
+    """Thread-safe latency and error samples keyed by endpoint label"""
+
+    def __init__(self):
+        self.samples = defaultdict(list)
+        self.errors = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def record(self, label, seconds, ok):
+        with self._lock:
+            self.samples[label].append(seconds)
+            if not ok:
+                self.errors[label] += 1
+
+    def report(self, elapsed):
+        print(f"\n{'endpoint':<44} {'reqs':>6} {'req/s':>7} {'err %':>6} "
+              f"{'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+        total = errors = 0
+        for label in sorted(self.samples):
+            timings = sorted(self.samples[label])
+            count = len(timings)
+            total += count
+            errors += self.errors[label]
+            pct = lambda p: timings[min(int(p * count), count - 1)] * 1000
+            print(f"{label:<44} {count:>6} {count / elapsed:>7.2f} "
+                  f"{100 * self.errors[label] / count:>6.1f} {pct(0.5):>8.0f} "
+                  f"{pct(0.9):>8.0f} {pct(0.99):>8.0f} {timings[-1] * 1000:>8.0f}")
+        if total:
+            print(f"\n{total} requests in {elapsed:.1f}s: {total / elapsed:.2f} req/s, "
+                  f"{100 * errors / total:.1f}% errors")
+
+class Client:
+    def __init__(self, base_url, stats, timeout):
+        self.base_url = base_url.rstrip('/')
+        self.stats = stats
+        self.timeout = timeout
+
+    def request(self, method, path, label, json_body=None, form=None, files=None):
+        """Send a request, record its latency under label and return the parsed JSON (or None)"""
+        headers = {}
+        data = None
+        if json_body is not None:
+            data = json.dumps(json_body).encode()
+            headers['Content-Type'] = 'application/json'
+        elif files is not None:
+            data, headers['Content-Type'] = encode_multipart(form or {}, files)
+        req = urllib.request.Request(self.base_url + path, data=data, headers=headers, method=method)
+
+        start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as response:
+                body = response.read()
+                ok = True
+        except urllib.error.HTTPError as e:
+            body = e.read()
+            ok = e.code < 500 and e.code != 429
+        except Exception:
+            body = b""
+            ok = False
+        self.stats.record(f"{method} {label}", time.perf_counter() - start, ok)
+        try:
+            return json.loads(body)
+        except ValueError:
+            return None
+
+def seed(client, run_id, teachers, students):
+    """Create the synthetic teachers and students this run will act as"""
+    teacher_ids, student_ids = [], []
+    for i in range(teachers):
+        result = client.request('POST', '/api/teachers', '/api/teachers', json_body={
+            'name': f"Load Teacher {i}",
+            'email': f"teacher{i}.{run_id}@loadtest.invalid",
+            'subject': 'Biology'
+        })
+        if result and result.get('teacher'):
+            teacher_ids.append(result['teacher']['_id'])
+    for i in range(students):
+        result = client.request('POST', '/api/students', '/api/students', json_body={
+            'name': f"Load Student {i}",
+            'email': f"student{i}.{run_id}@loadtest.invalid",
+            'roll_number': f"LT{i:05d}",
+            'class': f"Class {i % 6 + 7}"
+        })
+        if result and result.get('student'):
+            student_ids.append(result['student']['_id'])
+    return teacher_ids, student_ids
+
+class SimulatedUser(threading.Thread):
+    def __init__(self, client, mix, teacher_ids, student_ids, scripts, model_answer, deadline, think_time):
+        super().__init__(daemon=True)
+        self.client = client
+        self.actions = list(mix)
+        self.weights = [mix[action] for action in self.actions]
+        self.teacher_ids = teacher_ids
+        self.student_ids = student_ids
+        self.scripts = scripts
+        self.model_answer = model_answer
+        self.deadline = deadline
+        self.think_time = think_time
+
+    def evaluate(self):
+        self.client.request('POST', '/api/evaluate-answer', '/api/evaluate-answer', form={
+            'model_answer': self.model_answer,
+            'max_marks': 10,
+            'question': 'Explain photosynthesis.',
+            'teacher_id': random.choice(self.teacher_ids),
+            'student_id': random.choice(self.student_ids)
+        }, files=[('student_file', f'script-{uuid.uuid4().hex[:8]}.pdf', random.choice(self.scripts))])
+
+    def model_answer_upload(self):
+        self.client.request('POST', '/api/upload-model-answer', '/api/upload-model-answer',
+                            files=[('file', f'model-{uuid.uuid4().hex[:8]}.pdf', self.scripts[0])])
+
+    def dashboard(self):
+        self.client.request('GET', '/api/teachers', '/api/teachers')
+        self.client.request('GET', '/api/students', '/api/students')
+        self.client.request('GET', '/api/evaluations/recent?limit=20', '/api/evaluations/recent')
+
+    def history(self):
+        if random.random() < 0.5:
+            student_id = random.choice(self.student_ids)
+            self.client.request('GET', f'/api/evaluations/student/{student_id}',
+                                '/api/evaluations/student/<id>')
+            self.client.request('GET', f'/api/students/{student_id}/statistics',
+                                '/api/students/<id>/statistics')
+        else:
+            teacher_id = random.choice(self.teacher_ids)
+            self.client.request('GET', f'/api/evaluations/teacher/{teacher_id}?limit=50',
+                                '/api/evaluations/teacher/<id>')
+
+    def run(self):
+        handlers = {
+            'evaluate': self.evaluate,
+            'model_answer': self.model_answer_upload,
+            'dashboard': self.dashboard,
+            'history': self.history
+        }
+        while time.time() < self.deadline:
+            handlers[random.choices(self.actions, self.weights)[0]]()
+            time.sleep(random.expovariate(1 / self.think_time) if self.think_time else 0)
+
+def parse_mix(value):
+    """Parse 'evaluate=15,dashboard=50,...' into a weight dict"""
+    mix = dict(DEFAULT_MIX)
+    if value:
+        for item in value.split(','):
+            action, weight = item.split('=')
+            if action not in DEFAULT_MIX:
+                raise argparse.ArgumentTypeError(f"Unknown action '{action}'")
+            mix[action] = float(weight)
+    return {action: weight for action, weight in mix.items() if weight > 0}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://localhost:5000')
+    parser.add_argument('--users', type=int, default=20, help='Concurrent simulated users')
+    parser.add_argument('--duration', type=float, default=120, help='Seconds to replay traffic')
+    parser.add_argument('--teachers', type=int, default=5)
+    parser.add_argument('--students', type=int, default=200)
+    parser.add_argument('--scripts', type=int, default=20, help='Distinct synthetic PDF scripts')
+    parser.add_argument('--scanned-ratio', type=float, default=0.3, help='Share of scripts without a text layer')
+    parser.add_argument('--think-time', type=float, default=1.0, help='Mean pause between user actions (s)')
+    parser.add_argument('--timeout', type=float, default=300)
+    parser.add_argument('--mix', type=parse_mix, default=dict(DEFAULT_MIX),
+                        help='Action weights, e.g. evaluate=15,model_answer=3,dashboard=50,history=32')
+    args = parser.parse_args()
+
+    run_id = uuid.uuid4().hex[:8]
+    setup_stats = Stats()
+    teacher_ids, student_ids = seed(Client(args.url, setup_stats, args.timeout), run_id,
+                                    args.teachers, args.students)
+    if not teacher_ids or not student_ids:
+        print("Could not create teachers/students - is the server up?")
+        setup_stats.report(1)
+        return 1
+
+    scripts = [make_pdf(random_answer(), scanned=random.random() < args.scanned_ratio)
+               for _ in range(args.scripts)]
+    model_answer = " ".join(random_answer(10))
+
+    print(f"Run {run_id}: {len(teacher_ids)} teachers, {len(student_ids)} students, "
+          f"{args.users} users for {args.duration:.0f}s, mix {args.mix}")
+
+    stats = Stats()
+    client = Client(args.url, stats, args.timeout)
+    start = time.time()
+    users = [SimulatedUser(client, args.mix, teacher_ids, student_ids, scripts, model_answer,
+                           start + args.duration, args.think_time)
+             for _ in range(args.users)]
+    for user in users:
+        user.start()
+    for user in users:
+        user.join()
+
+    stats.report(time.time() - start)
+    return 0
+
+if __name__ == '__main__':
+    raise SystemExit(main())
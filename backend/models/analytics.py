@@ -0,0 +1,141 @@
+import uuid
+from datetime import datetime
+from utils.db_connection import db_connection
+from utils.response_cache import response_cache
+import logging
+
+logger = logging.getLogger(__name__)
+
+class Analytics:
+    """Materialised per-class, per-teacher and per-question summaries.
+    
+    refresh() runs one aggregation per metric and dimension over
+    `evaluations` and $merges the results into small summary collections,
+    which the dashboard reads instead of raw evaluation lists.
+    """
+    
+    # Dimension -> (summary collection, group key expression)
+    DIMENSIONS = {
+        'class': ('analytics_class', {'$ifNull': ['$student.class', 'Unassigned']}),
+        'teacher': ('analytics_teacher', {'$ifNull': ['$teacher_id', 'unknown']}),
+        'question': ('analytics_question', {'$ifNull': ['$question', '']})
+    }
+    
+    TOP_MISSING_POINTS = 10
+    
+    @staticmethod
+    def get_collection(dimension):
+        """Get the summary collection for a dimension"""
+        return db_connection.get_collection(Analytics.DIMENSIONS[dimension][0])
+    
+    @staticmethod
+    def _pipelines(dimension, run_id):
+        """One $group -> $merge pipeline per metric.
+        
+        The stats pipeline replaces each summary document (resetting the other
+        metrics to empty defaults); the grade and missing-point pipelines then
+        merge their fields in. Each stage emits one document per group key,
+        so no intermediate result approaches the 16 MB document limit.
+        """
+        collection, key = Analytics.DIMENSIONS[dimension]
+        prefix = []
+        
+        if dimension == 'class':
+            # Evaluations store student_id as a string; classes live on students
+            prefix += [
+                {'$addFields': {'student_oid': {'$convert': {
+                    'input': '$student_id', 'to': 'objectId', 'onError': None, 'onNull': None
+                }}}},
+                {'$lookup': {
+                    'from': 'students',
+                    'localField': 'student_oid',
+                    'foreignField': '_id',
+                    'pipeline': [{'$project': {'class': 1}}],
+                    'as': 'student'
+                }},
+                {'$unwind': {'path': '$student', 'preserveNullAndEmptyArrays': True}}
+            ]
+        prefix.append({'$addFields': {'group_key': key}})
+        
+        stats = {
+            '_id': '$group_key',
+            'count': {'$sum': 1},
+            'mean_percentage': {'$avg': '$percentage'},
+            'median_percentage': {'$median': {'input': '$percentage', 'method': 'approximate'}},
+            'mean_marks': {'$avg': '$marks'},
+            'last_evaluated_at': {'$max': '$created_at'}
+        }
+        if dimension == 'teacher':
+            stats['teacher_name'] = {'$last': '$teacher_name'}
+        
+        def merge(when_matched, when_not_matched):
+            return {'$merge': {'into': collection, 'on': '_id',
+                               'whenMatched': when_matched, 'whenNotMatched': when_not_matched}}
+        
+        stats_pipeline = prefix + [
+            {'$group': stats},
+            {'$addFields': {'grade_histogram': {}, 'common_missing_points': [],
+                            'dimension': dimension, 'run_id': run_id, 'computed_at': '$$NOW'}},
+            merge('replace', 'insert')
+        ]
+        grades_pipeline = prefix + [
+            {'$group': {'_id': {'key': '$group_key', 'grade': {'$ifNull': ['$grade', 'N/A']}},
+                        'count': {'$sum': 1}}},
+            {'$group': {'_id': '$_id.key',
+                        'grades': {'$push': {'k': '$_id.grade', 'v': '$count'}}}},
+            {'$project': {'grade_histogram': {'$arrayToObject': '$grades'}}},
+            merge('merge', 'discard')
+        ]
+        missing_pipeline = prefix + [
+            {'$unwind': '$missing_points'},
+            {'$group': {'_id': {'key': '$group_key', 'point': '$missing_points'},
+                        'count': {'$sum': 1}}},
+            {'$group': {'_id': '$_id.key',
+                        'common_missing_points': {'$topN': {
+                            'n': Analytics.TOP_MISSING_POINTS,
+                            'sortBy': {'count': -1},
+                            'output': {'point': '$_id.point', 'count': '$count'}
+                        }}}},
+            merge('merge', 'discard')
+        ]
+        return [stats_pipeline, grades_pipeline, missing_pipeline]
+    
+    @staticmethod
+    def refresh(dimensions=None):
+        """Recompute summaries; returns the number of summary documents per dimension"""
+        counts = {}
+        for dimension in dimensions or Analytics.DIMENSIONS:
+            run_id = uuid.uuid4().hex
+            started = datetime.utcnow()
+            evaluations = db_connection.get_collection('evaluations')
+            for pipeline in Analytics._pipelines(dimension, run_id):
+                list(evaluations.aggregate(pipeline, allowDiskUse=True))
+            
+            # Drop summaries for keys that no longer have any evaluations
+            collection = Analytics.get_collection(dimension)
+            collection.delete_many({'run_id': {'$ne': run_id}})
+            counts[dimension] = collection.count_documents({})
+            logger.info(f"Analytics {dimension}: {counts[dimension]} summaries in "
+                        f"{(datetime.utcnow() - started).total_seconds():.2f}s")
+        
+        response_cache.invalidate('analytics')
+        return counts
+    
+    @staticmethod
+    def get_summaries(dimension, limit=100):
+        """Get precomputed summaries for a dimension, largest groups first"""
+        return list(Analytics.get_collection(dimension).find()
+                   .sort('count', -1)
+                   .limit(limit))
+    
+    @staticmethod
+    def get_summary(dimension, key):
+        """Get the precomputed summary for one class, teacher or question"""
+        return Analytics.get_collection(dimension).find_one({'_id': key})
+    
+    @staticmethod
+    def remove_summary(dimension, key):
+        """Drop one summary ahead of the next refresh (e.g. for a deleted teacher)"""
+        result = Analytics.get_collection(dimension).delete_one({'_id': key})
+        response_cache.invalidate('analytics')
+        return result
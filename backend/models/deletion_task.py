@@ -0,0 +1,114 @@
+import os
+import socket
+from datetime import datetime, timedelta
+from bson import ObjectId
+from pymongo import ReturnDocument
+from utils.db_connection import db_connection
+
+class DeletionTask:
+    """Background cascade delete of a teacher's or student's evaluations, stored in `deletion_tasks`"""
+    
+    KINDS = {'teacher': 'teacher_id', 'student': 'student_id'}
+    
+    @staticmethod
+    def get_collection():
+        """Get deletion_tasks collection with lazy connection"""
+        return db_connection.get_collection('deletion_tasks')
+    
+    @staticmethod
+    def owner_id():
+        """Identity of this worker process, used for the task lease"""
+        return f"{socket.gethostname()}:{os.getpid()}"
+    
+    @staticmethod
+    def create(kind, target_id, mode, orphan=False):
+        """Create a pending task removing (mode='delete') or archiving (mode='archive')
+        the evaluations whose teacher_id/student_id is target_id.
+        
+        orphan marks tasks created by the sweeper for IDs with no person record.
+        """
+        task = {
+            'kind': kind,
+            'target_id': target_id,
+            'mode': mode,
+            'orphan': orphan,
+            'status': 'pending',
+            'removed': 0,
+            'owner': None,
+            'lease_until': None,
+            'error': None,
+            'created_at': datetime.utcnow(),
+            'updated_at': datetime.utcnow()
+        }
+        result = DeletionTask.get_collection().insert_one(task)
+        task['_id'] = result.inserted_id
+        return task
+    
+    @staticmethod
+    def find_by_id(task_id):
+        """Find task by ID"""
+        return DeletionTask.get_collection().find_one({'_id': ObjectId(task_id)})
+    
+    @staticmethod
+    def claim(task_id, lease_seconds):
+        """Take the task's lease if it is unclaimed or its previous owner stopped renewing it"""
+        now = datetime.utcnow()
+        return DeletionTask.get_collection().find_one_and_update(
+            {
+                '_id': ObjectId(task_id),
+                'status': {'$in': ['pending', 'running']},
+                '$or': [{'lease_until': None}, {'lease_until': {'$lt': now}}]
+            },
+            {'$set': {
+                'status': 'running',
+                'owner': DeletionTask.owner_id(),
+                'lease_until': now + timedelta(seconds=lease_seconds),
+                'updated_at': now
+            }},
+            return_document=ReturnDocument.AFTER
+        )
+    
+    @staticmethod
+    def find_resumable():
+        """Unfinished tasks whose lease expired (worker died) or that were never started"""
+        return list(DeletionTask.get_collection().find(
+            {
+                'status': {'$in': ['pending', 'running']},
+                '$or': [{'lease_until': None}, {'lease_until': {'$lt': datetime.utcnow()}}]
+            },
+            {'_id': 1}
+        ))
+    
+    @staticmethod
+    def has_open_task(kind, target_id):
+        """Whether an unfinished task already covers this target"""
+        return DeletionTask.get_collection().count_documents(
+            {'kind': kind, 'target_id': target_id, 'status': {'$in': ['pending', 'running']}},
+            limit=1
+        ) > 0
+    
+    @staticmethod
+    def progress(task_id, removed, lease_seconds):
+        """Record a finished batch and renew the lease"""
+        now = datetime.utcnow()
+        return DeletionTask.get_collection().update_one(
+            {'_id': task_id, 'owner': DeletionTask.owner_id()},
+            {
+                '$set': {'lease_until': now + timedelta(seconds=lease_seconds), 'updated_at': now},
+                '$inc': {'removed': removed}
+            }
+        )
+    
+    @staticmethod
+    def finish(task_id, status, error=None):
+        """Mark the task completed or failed and release its lease"""
+        return DeletionTask.get_collection().update_one(
+            {'_id': task_id},
+            {'$set': {
+                'status': status,
+                'error': error,
+                'lease_until': None,
+                'finished_at': datetime.utcnow(),
+                'updated_at': datetime.utcnow()
+            }}
+        )
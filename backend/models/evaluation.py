@@ -1,19 +1,52 @@
 from datetime import datetime
 from bson import ObjectId
+from pymongo import UpdateOne
 from utils.db_connection import db_connection
+from utils.response_cache import response_cache
+from utils.async_db import async_db_connection
+from utils.write_behind import evaluation_writer
+from models.evaluation_archive import EvaluationArchive
+from config import Config
 
 class Evaluation:
     @staticmethod
-    def get_collection():
-        """Get evaluations collection with lazy connection"""
-        return db_connection.get_collection('evaluations')
+    def get_collection(read_profile='primary'):
+        """Get evaluations collection with lazy connection.
+        
+        Reporting reads (listings, exports) pass read_profile='reporting' so they
+        can be served by secondaries instead of the primary taking inserts.
+        Reads behind cached_response stay on the primary: a lagging secondary
+        read right after an invalidation would cache pre-write data for a TTL.
+        """
+        return db_connection.get_collection('evaluations', read_profile)
+    
+    # Fields derived from a grading result; these change when an answer is re-graded
+    RESULT_FIELDS = ['marks', 'percentage', 'grade', 'strengths', 'missing_points', 'feedback',
+                     'grading_tier', 'confidence', 'escalation_failed', 'truncated_sections', 'prompt_tokens']
     
     @staticmethod
-    def create(teacher_id, student_id, question, model_answer, student_answer, 
-               extracted_text, max_marks, evaluation_result, teacher_name=None, 
-               student_name=None, student_rollno=None):
-        """Create a new evaluation record"""
-        evaluation = {
+    def result_fields(evaluation_result):
+        """Map a GeminiService evaluation result onto evaluation document fields"""
+        return {
+            'marks': evaluation_result.get('marks_awarded', 0),
+            'percentage': evaluation_result.get('percentage', 0),
+            'grade': evaluation_result.get('grade', 'N/A'),
+            'strengths': evaluation_result.get('strengths', []),
+            'missing_points': evaluation_result.get('missing_points', []),
+            'feedback': evaluation_result.get('feedback', ''),
+            'grading_tier': evaluation_result.get('grading_tier'),
+            'confidence': evaluation_result.get('confidence'),
+            'escalation_failed': evaluation_result.get('escalation_failed', False),
+            'truncated_sections': evaluation_result.get('truncated_sections', 0),
+            'prompt_tokens': evaluation_result.get('prompt_tokens')
+        }
+    
+    @staticmethod
+    def build_document(teacher_id, student_id, question, model_answer, student_answer, 
+                       extracted_text, max_marks, evaluation_result, teacher_name=None, 
+                       student_name=None, student_rollno=None):
+        """Build an evaluation document ready for insertion"""
+        return {
             'teacher_id': teacher_id,
             'teacher_name': teacher_name,
             'student_id': student_id,
@@ -24,60 +57,119 @@ class Evaluation:
             'student_answer': student_answer,
             'extracted_text': extracted_text,
             'max_marks': max_marks,
-            'marks': evaluation_result.get('marks_awarded', 0),
-            'percentage': evaluation_result.get('percentage', 0),
-            'grade': evaluation_result.get('grade', 'N/A'),
-            'strengths': evaluation_result.get('strengths', []),
-            'missing_points': evaluation_result.get('missing_points', []),
-            'feedback': evaluation_result.get('feedback', ''),
+            **Evaluation.result_fields(evaluation_result),
+            'dedup_group_size': evaluation_result.get('dedup_group_size', 1),
             'created_at': datetime.utcnow(),
             'updated_at': datetime.utcnow()
         }
+    
+    @staticmethod
+    def create(teacher_id, student_id, question, model_answer, student_answer, 
+               extracted_text, max_marks, evaluation_result, teacher_name=None, 
+               student_name=None, student_rollno=None, deferred=None):
+        """Create a new evaluation record.
+        
+        With deferred (default: WRITE_BEHIND_REQUEST_PATH) the insert is queued
+        on the write-behind buffer and the document returned with its _id
+        immediately.
+        """
+        evaluation = Evaluation.build_document(
+            teacher_id, student_id, question, model_answer, student_answer,
+            extracted_text, max_marks, evaluation_result, teacher_name,
+            student_name, student_rollno
+        )
+        
+        if deferred is None:
+            deferred = Config.WRITE_BEHIND_REQUEST_PATH
+        if deferred and Config.WRITE_BEHIND_ENABLED:
+            return Evaluation._defer_insert(evaluation)
         
         result = Evaluation.get_collection().insert_one(evaluation)
         evaluation['_id'] = result.inserted_id
+        response_cache.invalidate('evaluations')
+        return evaluation
+    
+    @staticmethod
+    def _defer_insert(evaluation):
+        evaluation['_id'] = ObjectId()
+        evaluation_writer.insert(evaluation)
+        return evaluation
+    
+    @staticmethod
+    async def create_async(deferred=False, **kwargs):
+        """Create a new evaluation record through the async (Motor) driver,
+        or through the write-behind buffer when deferred"""
+        evaluation = Evaluation.build_document(**kwargs)
+        if deferred and Config.WRITE_BEHIND_ENABLED:
+            return Evaluation._defer_insert(evaluation)
+        
+        result = await async_db_connection.get_collection('evaluations').insert_one(evaluation)
+        evaluation['_id'] = result.inserted_id
+        response_cache.invalidate('evaluations')
         return evaluation
     
     @staticmethod
     def find_by_id(evaluation_id):
-        """Find evaluation by ID"""
-        return Evaluation.get_collection().find_one({'_id': ObjectId(evaluation_id)})
+        """Find evaluation by ID (including inserts still queued for write-behind
+        and evaluations moved to the archive)"""
+        evaluation_id = ObjectId(evaluation_id)
+        evaluation = Evaluation.get_collection().find_one({'_id': evaluation_id})
+        if evaluation is None:
+            evaluation = evaluation_writer.get_pending(evaluation_id)
+        if evaluation is None:
+            evaluation = EvaluationArchive.find_by_id(evaluation_id)
+        return evaluation
     
     @staticmethod
     def find_by_student(student_id, limit=10):
-        """Find evaluations by student ID"""
-        return list(Evaluation.get_collection().find({'student_id': student_id})
-                   .sort('created_at', -1)
-                   .limit(limit))
+        """Find evaluations by student ID, continuing into the archive past the current term"""
+        evaluations = list(Evaluation.get_collection('reporting').find({'student_id': student_id})
+                           .sort('created_at', -1)
+                           .limit(limit))
+        return evaluations + EvaluationArchive.find_by_student(student_id, limit - len(evaluations))
     
     @staticmethod
     def find_by_teacher(teacher_id, limit=10):
         """Find evaluations by teacher ID"""
-        return list(Evaluation.get_collection().find({'teacher_id': teacher_id})
+        return list(Evaluation.get_collection('reporting').find({'teacher_id': teacher_id})
                    .sort('created_at', -1)
                    .limit(limit))
     
     @staticmethod
     def get_student_statistics(student_id):
-        """Get statistics for a student"""
+        """Get statistics for a student, including the rollups of archived evaluations"""
         pipeline = [
             {'$match': {'student_id': student_id}},
             {'$group': {
                 '_id': None,
-                'total_evaluations': {'$sum': 1},
-                'average_marks': {'$avg': '$marks_awarded'},
-                'average_percentage': {'$avg': '$percentage'},
-                'total_marks': {'$sum': '$marks_awarded'},
-                'max_possible_marks': {'$sum': '$max_marks'}
+                'evaluations': {'$sum': 1},
+                'total_marks': {'$sum': '$marks'},
+                'max_possible_marks': {'$sum': '$max_marks'},
+                'total_percentage': {'$sum': '$percentage'}
             }}
         ]
         
+        # Primary: the route is cached, see get_collection
         result = list(Evaluation.get_collection().aggregate(pipeline))
-        return result[0] if result else None
+        totals = EvaluationArchive.student_totals(student_id)
+        for field in totals:
+            totals[field] += result[0][field] if result else 0
+        
+        count = totals['evaluations']
+        if not count:
+            return None
+        return {
+            'total_evaluations': count,
+            'average_marks': totals['total_marks'] / count,
+            'average_percentage': totals['total_percentage'] / count,
+            'total_marks': totals['total_marks'],
+            'max_possible_marks': totals['max_possible_marks']
+        }
     
     @staticmethod
     def get_recent_evaluations(limit=20):
         """Get recent evaluations across all students"""
+        # Primary: the route is cached, see get_collection
         return list(Evaluation.get_collection().find()
                    .sort('created_at', -1)
                    .limit(limit))
@@ -85,9 +177,104 @@ class Evaluation:
     @staticmethod
     def delete(evaluation_id):
         """Delete an evaluation"""
-        return Evaluation.get_collection().delete_one({'_id': ObjectId(evaluation_id)})
+        result = Evaluation.get_collection().delete_one({'_id': ObjectId(evaluation_id)})
+        EvaluationArchive.get_collection().delete_one({'_id': ObjectId(evaluation_id)})
+        response_cache.invalidate('evaluations')
+        return result
     
     @staticmethod
     def get_all():
         """Get all evaluations"""
-        return list(Evaluation.get_collection().find().sort('created_at', -1))
+        return list(Evaluation.get_collection('reporting').find().sort('created_at', -1))
+    
+    @staticmethod
+    def build_filter_query(teacher_id=None, student_ids=None, date_from=None, date_to=None, question=None):
+        """Build a filter by teacher, students, question and created_at range"""
+        query = {}
+        if question:
+            query['question'] = question
+        if teacher_id:
+            query['teacher_id'] = teacher_id
+        if student_ids is not None:
+            query['student_id'] = {'$in': student_ids}
+        if date_from or date_to:
+            query['created_at'] = {}
+            if date_from:
+                query['created_at']['$gte'] = date_from
+            if date_to:
+                query['created_at']['$lt'] = date_to
+        return query
+    
+    @staticmethod
+    def export_cursor(query, fields, batch_size=1000):
+        """Cursor over evaluations for export, projected to the given fields"""
+        projection = {field: 1 for field in fields}
+        projection['_id'] = 0
+        return (Evaluation.get_collection('reporting').find(query, projection)
+                .sort('created_at', -1)
+                .batch_size(batch_size))
+    
+    @staticmethod
+    def find_for_regrade(query, job_id, after_id=None, limit=50):
+        """Next page of evaluations matching query not yet re-graded by job_id, in _id order"""
+        page_query = dict(query)
+        page_query['regrade_job_ids'] = {'$ne': job_id}
+        if after_id is not None:
+            page_query['_id'] = {'$gt': after_id}
+        projection = ['_id', 'question', 'model_answer', 'extracted_text', 'max_marks'] + Evaluation.RESULT_FIELDS
+        return list(Evaluation.get_collection().find(page_query, projection)
+                   .sort('_id', 1)
+                   .limit(limit))
+    
+    @staticmethod
+    def apply_regrades(regrades, job_id, model_answer=None):
+        """Write re-grade results in one bulk_write, keeping the prior result in `versions`.
+        
+        regrades is a list of (original document, evaluation_result) pairs.
+        """
+        if not regrades:
+            return 0
+        now = datetime.utcnow()
+        operations = []
+        for doc, evaluation_result in regrades:
+            previous = {field: doc.get(field) for field in Evaluation.RESULT_FIELDS}
+            previous['model_answer'] = doc.get('model_answer')
+            previous['superseded_at'] = now
+            
+            update = Evaluation.result_fields(evaluation_result)
+            update['updated_at'] = now
+            if model_answer:
+                update['model_answer'] = model_answer
+            
+            # The tag filter stops a second runner of the same job from pushing another version
+            operations.append(UpdateOne(
+                {'_id': doc['_id'], 'regrade_job_ids': {'$ne': job_id}},
+                {'$set': update, '$push': {'versions': previous}, '$addToSet': {'regrade_job_ids': job_id}}
+            ))
+        
+        result = Evaluation.get_collection().bulk_write(operations, ordered=False)
+        response_cache.invalidate('evaluations')
+        return result.modified_count
+    
+    @staticmethod
+    def remove_batch(field, value, batch_size=500, mode='delete'):
+        """Delete up to batch_size evaluations whose field ('teacher_id' or 'student_id')
+        equals value; returns how many were removed.
+        
+        With mode='archive' full documents are copied to the archive first.
+        Evaluations archived earlier are dropped by EvaluationArchive.remove().
+        """
+        docs = list(Evaluation.get_collection().find({field: value}).limit(batch_size))
+        if not docs:
+            return 0
+        ids = [doc['_id'] for doc in docs]
+        if mode == 'archive':
+            EvaluationArchive.store(docs)
+        result = Evaluation.get_collection().delete_many({'_id': {'$in': ids}})
+        response_cache.invalidate('evaluations')
+        return result.deleted_count
+    
+    @staticmethod
+    def distinct_ids(field):
+        """Distinct non-empty teacher_id/student_id values referenced by evaluations"""
+        return {value for value in Evaluation.get_collection().distinct(field) if value}
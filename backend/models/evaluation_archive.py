@@ -0,0 +1,209 @@
+import gzip
+import os
+import re
+from datetime import datetime, timedelta
+from bson import json_util
+from pymongo import ReplaceOne, UpdateOne
+from pymongo.errors import BulkWriteError
+from utils.db_connection import db_connection
+from utils.response_cache import response_cache
+from config import Config
+import logging
+
+logger = logging.getLogger(__name__)
+
+class EvaluationArchive:
+    """Cold storage for old evaluations.
+
+    Evaluations older than ARCHIVE_AFTER_DAYS are moved out of the hot
+    `evaluations` collection: the full document goes to the archive (the
+    `evaluations_archive` collection, or gzipped JSON-lines files per month
+    under ARCHIVE_DIR when ARCHIVE_BACKEND=file) and its marks are added to a
+    per-student, per-month rollup in `evaluation_rollups`. The hot collection
+    and its indexes only hold the current term; Evaluation falls back to the
+    archive for find_by_id and student history, and adds the rollups to
+    student statistics.
+
+    With ARCHIVE_BACKEND=file the files are the only copy of archived
+    evaluations, so ARCHIVE_DIR must be set and must be a persistent volume
+    (not the container's own disk, which a redeploy wipes).
+    """
+
+    _FILE_PATTERN = re.compile(r'^evaluations-\d{4}-\d{2}\.jsonl\.gz$')
+
+    # Batch IDs remembered per rollup, so a re-run batch is not counted twice
+    _ROLLUP_BATCH_HISTORY = 50
+
+    @staticmethod
+    def get_collection():
+        return db_connection.get_collection('evaluations_archive')
+
+    @staticmethod
+    def get_rollups():
+        return db_connection.get_collection('evaluation_rollups')
+
+    @staticmethod
+    def _file_name(created_at):
+        return f"evaluations-{created_at:%Y-%m}.jsonl.gz"
+
+    @staticmethod
+    def _read_file(file_name):
+        path = os.path.join(Config.ARCHIVE_DIR, file_name)
+        if not os.path.exists(path):
+            return
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    yield json_util.loads(line)
+
+    @staticmethod
+    def store(docs):
+        """Copy full documents to the archive"""
+        if not docs:
+            return
+        if Config.ARCHIVE_BACKEND == 'file':
+            os.makedirs(Config.ARCHIVE_DIR, exist_ok=True)
+            by_file = {}
+            for doc in docs:
+                by_file.setdefault(EvaluationArchive._file_name(doc['created_at']), []).append(doc)
+            for file_name, file_docs in by_file.items():
+                # Appending adds a new gzip member; gzip.open reads them back as one stream
+                with gzip.open(os.path.join(Config.ARCHIVE_DIR, file_name), 'at', encoding='utf-8') as f:
+                    for doc in file_docs:
+                        f.write(json_util.dumps(doc) + '\n')
+            return
+
+        # Upserts keep a re-run after a crash idempotent
+        EvaluationArchive.get_collection().bulk_write(
+            [ReplaceOne({'_id': doc['_id']}, doc, upsert=True) for doc in docs], ordered=False
+        )
+
+    @staticmethod
+    def _roll_up(docs, batch_id):
+        """Add a batch's marks to the per-student, per-month rollups, once per batch_id"""
+        totals = {}
+        for doc in docs:
+            if not doc.get('student_id'):
+                continue
+            key = (doc['student_id'], f"{doc['created_at']:%Y-%m}")
+            rollup = totals.setdefault(key, {'evaluations': 0, 'total_marks': 0, 'max_possible_marks': 0,
+                                             'total_percentage': 0})
+            rollup['evaluations'] += 1
+            rollup['total_marks'] += doc.get('marks') or 0
+            rollup['max_possible_marks'] += doc.get('max_marks') or 0
+            rollup['total_percentage'] += doc.get('percentage') or 0
+        if not totals:
+            return
+
+        operations = [
+            UpdateOne(
+                {'_id': {'student_id': student_id, 'period': period}, 'batch_ids': {'$ne': batch_id}},
+                {'$set': {'student_id': student_id, 'period': period},
+                 '$inc': counts,
+                 '$push': {'batch_ids': {'$each': [batch_id], '$slice': -EvaluationArchive._ROLLUP_BATCH_HISTORY}}},
+                upsert=True
+            )
+            for (student_id, period), counts in totals.items()
+        ]
+        try:
+            EvaluationArchive.get_rollups().bulk_write(operations, ordered=False)
+        except BulkWriteError as e:
+            # A duplicate key means the rollup already holds this batch (a re-run after a crash)
+            if any(err.get('code') != 11000 for err in e.details.get('writeErrors', [])):
+                raise
+
+    @staticmethod
+    def archive_expired(batch_size=None):
+        """Move evaluations older than ARCHIVE_AFTER_DAYS to the archive in batches.
+
+        Each batch is written to the archive and rolled up before it is removed
+        from the hot collection, so an interrupted run loses nothing and the
+        next run picks up where it stopped.
+        """
+        if Config.ARCHIVE_AFTER_DAYS <= 0:
+            return 0
+        if Config.ARCHIVE_BACKEND == 'file' and not Config.ARCHIVE_DIR:
+            logger.error("ARCHIVE_BACKEND=file needs ARCHIVE_DIR set to a persistent volume; not archiving")
+            return 0
+        batch_size = batch_size or Config.ARCHIVE_BATCH_SIZE
+        cutoff = datetime.utcnow() - timedelta(days=Config.ARCHIVE_AFTER_DAYS)
+        evaluations = db_connection.get_collection('evaluations')
+
+        archived = 0
+        while True:
+            docs = list(evaluations.find({'created_at': {'$lt': cutoff}}).sort('created_at', 1).limit(batch_size))
+            if not docs:
+                break
+            EvaluationArchive.store(docs)
+            # A re-run after a crash selects the same oldest documents, hence the same batch ID
+            EvaluationArchive._roll_up(docs, str(docs[0]['_id']))
+            evaluations.delete_many({'_id': {'$in': [doc['_id'] for doc in docs]}})
+            archived += len(docs)
+
+        if archived:
+            response_cache.invalidate('evaluations')
+            logger.info(f"Archived {archived} evaluation(s) older than {Config.ARCHIVE_AFTER_DAYS} days")
+        return archived
+
+    @staticmethod
+    def find_by_id(evaluation_id):
+        """Archived evaluation by ObjectId, or None"""
+        if Config.ARCHIVE_BACKEND != 'file':
+            return EvaluationArchive.get_collection().find_one({'_id': evaluation_id})
+
+        # _ids are generated when the evaluation is created, so their timestamp
+        # names its monthly file (give or take a day around month ends)
+        created = evaluation_id.generation_time.replace(tzinfo=None)
+        file_names = dict.fromkeys(EvaluationArchive._file_name(created + timedelta(days=offset))
+                                   for offset in (0, -1, 1))
+        for file_name in file_names:
+            for doc in EvaluationArchive._read_file(file_name):
+                if doc['_id'] == evaluation_id:
+                    return doc
+        return None
+
+    @staticmethod
+    def find_by_student(student_id, limit=10):
+        """A student's most recent archived evaluations, newest first"""
+        if limit <= 0:
+            return []
+        if Config.ARCHIVE_BACKEND != 'file':
+            return list(EvaluationArchive.get_collection().find({'student_id': student_id})
+                        .sort('created_at', -1)
+                        .limit(limit))
+
+        if not os.path.isdir(Config.ARCHIVE_DIR):
+            return []
+        found = {}
+        file_names = sorted((name for name in os.listdir(Config.ARCHIVE_DIR)
+                             if EvaluationArchive._FILE_PATTERN.match(name)), reverse=True)
+        # Monthly files, newest first; stop once a whole month has filled the page
+        for file_name in file_names:
+            for doc in EvaluationArchive._read_file(file_name):
+                if doc.get('student_id') == student_id:
+                    found.setdefault(doc['_id'], doc)
+            if len(found) >= limit:
+                break
+        return sorted(found.values(), key=lambda doc: doc['created_at'], reverse=True)[:limit]
+
+    @staticmethod
+    def student_totals(student_id):
+        """Summed rollups of a student's archived evaluations"""
+        totals = {'evaluations': 0, 'total_marks': 0, 'max_possible_marks': 0, 'total_percentage': 0}
+        for rollup in EvaluationArchive.get_rollups().find({'student_id': student_id}):
+            for field in totals:
+                totals[field] += rollup.get(field, 0)
+        return totals
+
+    @staticmethod
+    def remove(field, value, mode='delete'):
+        """Drop a deleted teacher's or student's archived data.
+
+        A student's rollups always go; with mode='delete' the archived
+        evaluations go too (only possible for the archive collection, the
+        gzipped files are append-only).
+        """
+        if field == 'student_id':
+            EvaluationArchive.get_rollups().delete_many({'student_id': value})
+        if mode == 'delete' and Config.ARCHIVE_BACKEND != 'file':
+            EvaluationArchive.get_collection().delete_many({field: value})
@@ -0,0 +1,128 @@
+import os
+import socket
+from datetime import datetime, timedelta
+from bson import ObjectId
+from pymongo import ReturnDocument
+from utils.db_connection import db_connection
+
+class RegradeJob:
+    """Checkpointed bulk re-grade job stored in `regrade_jobs`"""
+    
+    @staticmethod
+    def get_collection():
+        """Get regrade_jobs collection with lazy connection"""
+        return db_connection.get_collection('regrade_jobs')
+    
+    @staticmethod
+    def owner_id():
+        """Identity of this worker process, used for the job lease"""
+        return f"{socket.gethostname()}:{os.getpid()}"
+    
+    @staticmethod
+    def create(filters, model_answer=None):
+        """Create a pending re-grade job for the evaluations matching filters.
+        
+        filters holds Evaluation.build_filter_query() arguments (question,
+        teacher_id, date_from, date_to); the query is rebuilt on every run.
+        """
+        job = {
+            'status': 'pending',
+            'filters': filters,
+            'model_answer': model_answer,
+            'checkpoint_id': None,
+            'processed': 0,
+            'failed': 0,
+            'owner': None,
+            'lease_until': None,
+            'error': None,
+            'created_at': datetime.utcnow(),
+            'updated_at': datetime.utcnow()
+        }
+        result = RegradeJob.get_collection().insert_one(job)
+        job['_id'] = result.inserted_id
+        return job
+    
+    @staticmethod
+    def find_by_id(job_id):
+        """Find job by ID"""
+        return RegradeJob.get_collection().find_one({'_id': ObjectId(job_id)})
+    
+    @staticmethod
+    def get_all(limit=50):
+        """Get recent jobs"""
+        return list(RegradeJob.get_collection().find()
+                   .sort('created_at', -1)
+                   .limit(limit))
+    
+    @staticmethod
+    def claim(job_id, lease_seconds):
+        """Take the job's lease if it is unclaimed or its previous owner stopped renewing it"""
+        now = datetime.utcnow()
+        return RegradeJob.get_collection().find_one_and_update(
+            {
+                '_id': ObjectId(job_id),
+                'status': {'$in': ['pending', 'running', 'failed']},
+                '$or': [{'lease_until': None}, {'lease_until': {'$lt': now}}]
+            },
+            {'$set': {
+                'status': 'running',
+                'owner': RegradeJob.owner_id(),
+                'lease_until': now + timedelta(seconds=lease_seconds),
+                'updated_at': now
+            }},
+            return_document=ReturnDocument.AFTER
+        )
+    
+    @staticmethod
+    def find_resumable():
+        """Jobs left running by a crashed worker (lease expired)"""
+        return list(RegradeJob.get_collection().find(
+            {'status': 'running', 'lease_until': {'$lt': datetime.utcnow()}},
+            {'_id': 1}
+        ))
+    
+    @staticmethod
+    def checkpoint(job_id, checkpoint_id, processed, failed, lease_seconds):
+        """Record progress after a page and renew the lease"""
+        now = datetime.utcnow()
+        return RegradeJob.get_collection().update_one(
+            {'_id': job_id, 'owner': RegradeJob.owner_id()},
+            {
+                '$set': {
+                    'checkpoint_id': checkpoint_id,
+                    'lease_until': now + timedelta(seconds=lease_seconds),
+                    'updated_at': now
+                },
+                '$inc': {'processed': processed, 'failed': failed}
+            }
+        )
+    
+    @staticmethod
+    def renew_lease(job_id, lease_seconds):
+        """Extend this worker's lease; returns False if another worker has taken the job over"""
+        now = datetime.utcnow()
+        result = RegradeJob.get_collection().update_one(
+            {'_id': job_id, 'owner': RegradeJob.owner_id(), 'status': 'running'},
+            {'$set': {'lease_until': now + timedelta(seconds=lease_seconds), 'updated_at': now}}
+        )
+        return result.matched_count == 1
+    
+    @staticmethod
+    def finish(job_id, status, error=None):
+        """Mark the job completed or failed and release its lease, if this worker still owns it.
+        
+        A failed job's checkpoint is reset so a resume re-scans the whole
+        selection; documents it already re-graded are skipped by their tag.
+        """
+        update = {
+            'status': status,
+            'error': error,
+            'lease_until': None,
+            'finished_at': datetime.utcnow(),
+            'updated_at': datetime.utcnow()
+        }
+        if status == 'failed':
+            update['checkpoint_id'] = None
+        return RegradeJob.get_collection().update_one(
+            {'_id': job_id, 'owner': RegradeJob.owner_id()}, {'$set': update}
+        )
@@ -1,6 +1,7 @@
 from datetime import datetime
 from bson import ObjectId
 from utils.db_connection import db_connection
+from utils.response_cache import response_cache
 
 class Student:
     @staticmethod
@@ -20,40 +21,71 @@ class Student:
             'updated_at': datetime.utcnow()
         }
         
+        # A deleted student awaiting background cleanup still holds the unique email
+        Student.get_collection().delete_one({'email': email, 'deleted_at': {'$ne': None}})
         result = Student.get_collection().insert_one(student)
         student['_id'] = result.inserted_id
+        response_cache.invalidate('students')
         return student
     
     @staticmethod
     def find_by_email(email):
-        """Find student by email"""
-        return Student.get_collection().find_one({'email': email})
+        """Find student by email (deleted students are not returned)"""
+        return Student.get_collection().find_one({'email': email, 'deleted_at': None})
     
     @staticmethod
     def find_by_id(student_id):
-        """Find student by ID"""
-        return Student.get_collection().find_one({'_id': ObjectId(student_id)})
+        """Find student by ID (deleted students are not returned)"""
+        return Student.get_collection().find_one({'_id': ObjectId(student_id), 'deleted_at': None})
     
     @staticmethod
     def find_by_roll_number(roll_number):
         """Find student by roll number"""
         return Student.get_collection().find_one({'roll_number': roll_number})
     
+    @staticmethod
+    def find_ids_by_class(class_name):
+        """Get the IDs (as strings) of all students in a class"""
+        return [str(doc['_id']) for doc in Student.get_collection().find({'class': class_name, 'deleted_at': None}, {'_id': 1})]
+    
     @staticmethod
     def update(student_id, data):
         """Update student information"""
         data['updated_at'] = datetime.utcnow()
-        return Student.get_collection().update_one(
+        result = Student.get_collection().update_one(
             {'_id': ObjectId(student_id)},
             {'$set': data}
         )
+        response_cache.invalidate('students')
+        return result
     
     @staticmethod
     def get_all():
-        """Get all students"""
-        return list(Student.get_collection().find())
+        """Get all students not marked deleted"""
+        return list(Student.get_collection().find({'deleted_at': None}))
     
     @staticmethod
     def delete(student_id):
-        """Delete a student"""
-        return Student.get_collection().delete_one({'_id': ObjectId(student_id)})
+        """Mark a student deleted; their evaluations are removed by a background DeletionTask,
+        which calls purge() once done"""
+        result = Student.get_collection().update_one(
+            {'_id': ObjectId(student_id), 'deleted_at': None},
+            {'$set': {'deleted_at': datetime.utcnow(), 'updated_at': datetime.utcnow()}}
+        )
+        response_cache.invalidate('students')
+        return result
+    
+    @staticmethod
+    def purge(student_id):
+        """Remove a deleted student's record for good"""
+        return Student.get_collection().delete_one({'_id': ObjectId(student_id), 'deleted_at': {'$ne': None}})
+    
+    @staticmethod
+    def live_ids():
+        """IDs (as strings) of all students not marked deleted"""
+        return {str(doc['_id']) for doc in Student.get_collection().find({'deleted_at': None}, {'_id': 1})}
+    
+    @staticmethod
+    def deleted_ids():
+        """IDs (as strings) of students marked deleted but not yet purged"""
+        return {str(doc['_id']) for doc in Student.get_collection().find({'deleted_at': {'$ne': None}}, {'_id': 1})}
@@ -1,6 +1,7 @@
 from datetime import datetime
 from bson import ObjectId
 from utils.db_connection import db_connection
+from utils.response_cache import response_cache
 
 class Teacher:
     @staticmethod
@@ -19,35 +20,61 @@ class Teacher:
             'updated_at': datetime.utcnow()
         }
         
+        # A deleted teacher awaiting background cleanup still holds the unique email
+        Teacher.get_collection().delete_one({'email': email, 'deleted_at': {'$ne': None}})
         result = Teacher.get_collection().insert_one(teacher)
         teacher['_id'] = result.inserted_id
+        response_cache.invalidate('teachers')
         return teacher
     
     @staticmethod
     def find_by_email(email):
-        """Find teacher by email"""
-        return Teacher.get_collection().find_one({'email': email})
+        """Find teacher by email (deleted teachers are not returned)"""
+        return Teacher.get_collection().find_one({'email': email, 'deleted_at': None})
     
     @staticmethod
     def find_by_id(teacher_id):
-        """Find teacher by ID"""
-        return Teacher.get_collection().find_one({'_id': ObjectId(teacher_id)})
+        """Find teacher by ID (deleted teachers are not returned)"""
+        return Teacher.get_collection().find_one({'_id': ObjectId(teacher_id), 'deleted_at': None})
     
     @staticmethod
     def update(teacher_id, data):
         """Update teacher information"""
         data['updated_at'] = datetime.utcnow()
-        return Teacher.get_collection().update_one(
+        result = Teacher.get_collection().update_one(
             {'_id': ObjectId(teacher_id)},
             {'$set': data}
         )
+        response_cache.invalidate('teachers')
+        return result
     
     @staticmethod
     def get_all():
-        """Get all teachers"""
-        return list(Teacher.get_collection().find())
+        """Get all teachers not marked deleted"""
+        return list(Teacher.get_collection().find({'deleted_at': None}))
     
     @staticmethod
     def delete(teacher_id):
-        """Delete a teacher"""
-        return Teacher.get_collection().delete_one({'_id': ObjectId(teacher_id)})
+        """Mark a teacher deleted; their evaluations are removed by a background DeletionTask,
+        which calls purge() once done"""
+        result = Teacher.get_collection().update_one(
+            {'_id': ObjectId(teacher_id), 'deleted_at': None},
+            {'$set': {'deleted_at': datetime.utcnow(), 'updated_at': datetime.utcnow()}}
+        )
+        response_cache.invalidate('teachers')
+        return result
+    
+    @staticmethod
+    def purge(teacher_id):
+        """Remove a deleted teacher's record for good"""
+        return Teacher.get_collection().delete_one({'_id': ObjectId(teacher_id), 'deleted_at': {'$ne': None}})
+    
+    @staticmethod
+    def live_ids():
+        """IDs (as strings) of all teachers not marked deleted"""
+        return {str(doc['_id']) for doc in Teacher.get_collection().find({'deleted_at': None}, {'_id': 1})}
+    
+    @staticmethod
+    def deleted_ids():
+        """IDs (as strings) of teachers marked deleted but not yet purged"""
+        return {str(doc['_id']) for doc in Teacher.get_collection().find({'deleted_at': {'$ne': None}}, {'_id': 1})}
@@ -0,0 +1,61 @@
+import threading
+import time
+import pytest
+from utils.admission import AdmissionController, AdmissionRejected
+
+def make_controller(**overrides):
+    options = dict(max_concurrent=2, memory_budget_mb=1000, queue_size=4, queue_timeout=0.2, max_per_teacher=1)
+    options.update(overrides)
+    return AdmissionController(**options)
+
+def test_admits_until_concurrency_limit_then_times_out():
+    controller = make_controller()
+    tickets = [controller.acquire('t1', 10), controller.acquire('t2', 10)]
+    with pytest.raises(AdmissionRejected) as excinfo:
+        controller.acquire('t3', 10)
+    assert excinfo.value.retry_after >= 1
+    for ticket in tickets:
+        controller.release(ticket)
+    assert controller.stats()['running'] == 0
+
+def test_full_queue_rejects_immediately():
+    controller = make_controller(max_concurrent=1, queue_size=0)
+    ticket = controller.acquire('t1', 10)
+    with pytest.raises(AdmissionRejected, match='queue is full'):
+        controller.acquire('t2', 10)
+    controller.release(ticket)
+
+def test_per_teacher_cap():
+    controller = make_controller()
+    ticket = controller.acquire('t1', 10)
+    with pytest.raises(AdmissionRejected):
+        controller.acquire('t1', 10)
+    controller.release(ticket)
+
+def test_requests_without_teacher_skip_per_teacher_cap():
+    controller = make_controller(max_concurrent=3)
+    tickets = [controller.acquire(None, 10) for _ in range(3)]
+    assert controller.stats()['running'] == 3
+    for ticket in tickets:
+        controller.release(ticket)
+
+def test_memory_budget_but_oversized_request_may_run_alone():
+    controller = make_controller(memory_budget_mb=100)
+    big = controller.acquire('t1', 500)
+    with pytest.raises(AdmissionRejected):
+        controller.acquire('t2', 10)
+    controller.release(big)
+    assert controller.stats()['memory_mb'] == 0
+
+def test_waiter_is_admitted_when_capacity_frees():
+    controller = make_controller(max_concurrent=1, queue_timeout=5)
+    ticket = controller.acquire('t1', 10)
+    admitted = []
+    waiter = threading.Thread(target=lambda: admitted.append(controller.acquire('t2', 10)))
+    waiter.start()
+    time.sleep(0.05)
+    assert controller.stats()['waiting'] == 1
+    controller.release(ticket)
+    waiter.join(timeout=2)
+    assert admitted and admitted[0]['teacher'] == 't2'
+    controller.release(admitted[0])
@@ -0,0 +1,35 @@
+from config import Config
+from utils.answer_dedup import canonicalize, group_answers
+
+def test_canonicalize_ignores_case_punctuation_and_spacing():
+    assert canonicalize("  Photosynthesis,  uses LIGHT. ") == canonicalize("photosynthesis uses light")
+
+def test_canonicalize_keeps_decimal_points():
+    assert canonicalize("g = 9.8") != canonicalize("g = 98")
+
+def test_exact_duplicates_share_a_group():
+    texts = ["Mitochondria is the powerhouse.", "mitochondria is the powerhouse", "Ribosomes make proteins"]
+    assert group_answers(texts) == [[0, 1], [2]]
+
+def test_empty_and_long_answers_are_never_grouped(monkeypatch):
+    monkeypatch.setattr(Config, 'DEDUP_MAX_TOKENS', 5)
+    long_answer = "word " * 100
+    assert group_answers(["", "", long_answer, long_answer]) == [[0], [1], [2], [3]]
+
+def test_near_duplicates_only_when_enabled(monkeypatch):
+    base = "the light reaction splits water and releases oxygen into the atmosphere during the day"
+    texts = [base, base + " time"]
+    monkeypatch.setattr(Config, 'DEDUP_NEAR_DUPLICATES', False)
+    assert group_answers(texts) == [[0], [1]]
+    monkeypatch.setattr(Config, 'DEDUP_NEAR_DUPLICATES', True)
+    monkeypatch.setattr(Config, 'DEDUP_SIMILARITY_THRESHOLD', 0.7)
+    assert group_answers(texts) == [[0, 1]]
+
+def test_maths_symbols_keep_answers_apart():
+    texts = ['x > 5', 'x < 5', 'x^2', 'x*2', '2^3 = 8', '2*3 = 8', '√2', '2']
+    assert group_answers(texts) == [[i] for i in range(len(texts))]
+
+def test_symbol_spacing_does_not_matter():
+    assert canonicalize("x>5") == canonicalize("x > 5")
+    assert canonicalize("f(x)=x^2") == canonicalize("f( x ) = x ^ 2")
+    assert group_answers(["x ≠ 0", "X≠0", "x ≤ 0"]) == [[0, 1], [2]]
@@ -0,0 +1,69 @@
+from datetime import datetime
+import pytest
+from bson import ObjectId
+from pymongo.errors import BulkWriteError
+from config import Config
+from models.evaluation_archive import EvaluationArchive
+
+def make_doc(student_id, created_at, marks=5):
+    return {'_id': ObjectId.from_datetime(created_at), 'student_id': student_id, 'created_at': created_at,
+            'marks': marks, 'max_marks': 10, 'percentage': marks * 10, 'extracted_text': 'answer'}
+
+@pytest.fixture
+def file_archive(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, 'ARCHIVE_BACKEND', 'file')
+    monkeypatch.setattr(Config, 'ARCHIVE_DIR', str(tmp_path))
+
+def test_file_archive_serves_find_by_id(file_archive):
+    doc = make_doc('s1', datetime(2025, 3, 31, 23, 59))
+    EvaluationArchive.store([doc])
+    assert EvaluationArchive.find_by_id(doc['_id']) == doc
+    assert EvaluationArchive.find_by_id(ObjectId()) is None
+
+def test_file_archive_student_history_is_newest_first(file_archive):
+    docs = [make_doc('s1', datetime(2025, month, 10)) for month in (1, 2, 3)] + [make_doc('s2', datetime(2025, 3, 11))]
+    EvaluationArchive.store(docs)
+    # A re-run after a crash appends the same documents again
+    EvaluationArchive.store(docs[:1])
+    history = EvaluationArchive.find_by_student('s1', limit=2)
+    assert [doc['created_at'].month for doc in history] == [3, 2]
+    assert len(EvaluationArchive.find_by_student('s1', limit=10)) == 3
+
+def test_file_backend_needs_archive_dir(monkeypatch):
+    monkeypatch.setattr(Config, 'ARCHIVE_AFTER_DAYS', 30)
+    monkeypatch.setattr(Config, 'ARCHIVE_BACKEND', 'file')
+    monkeypatch.setattr(Config, 'ARCHIVE_DIR', None)
+    assert EvaluationArchive.archive_expired() == 0
+
+class FakeRollups:
+    """Applies $inc upserts keyed by _id, rejecting a batch a rollup already holds"""
+    
+    def __init__(self):
+        self.docs = {}
+    
+    def bulk_write(self, requests, ordered=True):
+        errors = []
+        for index, request in enumerate(requests):
+            key = (request._filter['_id']['student_id'], request._filter['_id']['period'])
+            batch_id = request._filter['batch_ids']['$ne']
+            doc = self.docs.setdefault(key, {'batch_ids': []})
+            if batch_id in doc['batch_ids']:
+                errors.append({'index': index, 'code': 11000})
+                continue
+            for field, amount in request._doc['$inc'].items():
+                doc[field] = doc.get(field, 0) + amount
+            doc['batch_ids'].append(batch_id)
+        if errors:
+            raise BulkWriteError({'writeErrors': errors})
+
+def test_rolling_up_a_batch_twice_counts_it_once(monkeypatch):
+    rollups = FakeRollups()
+    monkeypatch.setattr(EvaluationArchive, 'get_rollups', staticmethod(lambda: rollups))
+    docs = [make_doc('s1', datetime(2025, 1, 5), 4), make_doc('s1', datetime(2025, 1, 6), 6),
+            make_doc(None, datetime(2025, 1, 7))]
+    EvaluationArchive._roll_up(docs, 'batch-1')
+    EvaluationArchive._roll_up(docs, 'batch-1')
+    assert rollups.docs == {('s1', '2025-01'): {
+        'batch_ids': ['batch-1'], 'evaluations': 2, 'total_marks': 10, 'max_possible_marks': 20,
+        'total_percentage': 100
+    }}
@@ -0,0 +1,79 @@
+import asyncio
+import json
+from config import Config
+from utils.gemini_service import GeminiService
+
+FAST_REPLY = json.dumps({'marks_awarded': 7, 'percentage': 70, 'grade': 'B+', 'confidence': 0.6})
+STRONG_REPLY = json.dumps({'marks_awarded': 8, 'percentage': 80, 'grade': 'A', 'confidence': 0.95})
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+def make_service(monkeypatch, strong_reply):
+    """GeminiService whose fast tier answers FAST_REPLY and strong tier strong_reply (or raises it)"""
+    monkeypatch.setattr(Config, 'CASCADE_GRADING', True)
+    service = GeminiService('test-key')
+    
+    def reply(model_name):
+        if model_name == Config.GRADING_FAST_MODEL:
+            return FAST_REPLY
+        if isinstance(strong_reply, Exception):
+            raise strong_reply
+        return strong_reply
+    
+    def generate(model_name, prompt, on_event=None):
+        text = reply(model_name)
+        return text, FakeResponse(text)
+    
+    class AsyncModel:
+        def __init__(self, model_name):
+            self.model_name = model_name
+        
+        async def generate_content_async(self, prompt):
+            return FakeResponse(reply(self.model_name))
+    
+    monkeypatch.setattr(service, '_generate', generate)
+    monkeypatch.setattr(service, 'get_async_model', AsyncModel)
+    return service
+
+def test_uncertain_fast_grade_is_escalated(monkeypatch):
+    service = make_service(monkeypatch, STRONG_REPLY)
+    result = service._grade('prompt', 10)
+    assert result['marks_awarded'] == 8
+    assert result['grading_tier'] == 'strong'
+    assert 'escalation_failed' not in result
+
+def test_failed_escalation_keeps_fast_grade(monkeypatch):
+    service = make_service(monkeypatch, RuntimeError('429 Resource exhausted'))
+    result = service._grade('prompt', 10)
+    assert result['marks_awarded'] == 7
+    assert result['grading_tier'] == 'fast'
+    assert result['escalation_failed'] is True
+    assert not GeminiService.is_error_result(result)
+
+def test_failed_escalation_keeps_fast_grade_async(monkeypatch):
+    service = make_service(monkeypatch, 'not json')
+    result = asyncio.run(service._grade_async('prompt', 10))
+    assert result['marks_awarded'] == 7
+    assert result['escalation_failed'] is True
+
+def test_tokens_are_estimated_without_usage_metadata(monkeypatch):
+    from utils import gemini_service
+    metrics = gemini_service.GradingMetrics()
+    monkeypatch.setattr(gemini_service, 'grading_metrics', metrics)
+    monkeypatch.setattr(Config, 'CASCADE_BOUNDARY_MARGIN', 0)
+    monkeypatch.setattr(Config, 'CASCADE_MIN_CONFIDENCE', 0.5)
+    monkeypatch.setattr(Config, 'GRADING_FAST_COST_PER_1K_TOKENS', 0.1)
+    service = make_service(monkeypatch, STRONG_REPLY)
+    service._grade('x' * 400, 10)
+    fast = metrics.snapshot()['tiers']['fast']
+    assert fast['prompt_tokens'] == 100
+    assert fast['output_tokens'] > 0
+    assert fast['estimated_cost'] > 0
+
+def test_dropped_sections_are_flagged_on_the_result():
+    service = GeminiService('test-key')
+    result = service._finish([{'marks_awarded': 5, 'feedback': 'Good.'}], ['prompt'], 10, dropped=2)
+    assert result['truncated_sections'] == 2
+    assert 'not graded' in result['feedback']
@@ -0,0 +1,39 @@
+from config import Config
+from utils import prompt_builder
+from utils.prompt_builder import estimate_tokens, prepare_inputs, split_into_sections
+
+def _assert_lossless(text, sections, max_tokens):
+    assert all(estimate_tokens(section) <= max_tokens for section in sections)
+    assert ''.join(''.join(sections).split()) == ''.join(text.split())
+
+def test_short_text_is_one_section():
+    assert split_into_sections("A short answer.", 100) == ["A short answer."]
+
+def test_packs_whole_paragraphs_into_sections():
+    text = "\n\n".join(["x" * 300] * 4)
+    sections = split_into_sections(text, 200)
+    # 75-token paragraphs: two fit per section, none is split
+    assert sections == ["x" * 300 + "\n\n" + "x" * 300] * 2
+    _assert_lossless(text, sections, 200)
+
+def test_paragraph_without_sentence_ends_is_hard_wrapped_not_truncated():
+    text = "a" * 100000
+    sections = split_into_sections(text, 8000)
+    assert len(sections) == 4
+    _assert_lossless(text, sections, 8000)
+
+def test_long_paragraph_falls_back_to_lines_and_words():
+    for text in ["line of text\n" * 9000, "word " * 30000]:
+        _assert_lossless(text, split_into_sections(text, 1000), 1000)
+
+def test_normalize_strips_ocr_markers():
+    text = "--- Page 1 ---\nFirst   line\n[Blank page]\n\n\n\nSecond"
+    assert prompt_builder.normalize_text(text) == "First line\n\nSecond"
+
+def test_sections_past_the_cap_are_reported(monkeypatch):
+    monkeypatch.setattr(Config, 'PROMPT_MAX_INPUT_TOKENS', 100)
+    monkeypatch.setattr(Config, 'PROMPT_MAX_SECTIONS', 2)
+    text = "\n\n".join(f"Paragraph {i}. " + "word " * 60 for i in range(5))
+    sections, model_answer, dropped = prepare_inputs(text, "Model answer.")
+    assert len(sections) == 2
+    assert dropped == 3
@@ -0,0 +1,53 @@
+import pytest
+from flask import Flask, jsonify
+from config import Config
+from utils.response_cache import cached_response, response_cache
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(Config, 'RESPONSE_CACHE_ENABLED', True)
+    response_cache.clear()
+    calls = []
+    app = Flask(__name__)
+    
+    @app.route('/items')
+    @cached_response('items')
+    def items():
+        calls.append(1)
+        return jsonify({'items': len(calls)})
+    
+    client = app.test_client()
+    client.calls = calls
+    return client
+
+def test_second_request_is_served_from_cache(client):
+    first = client.get('/items')
+    second = client.get('/items')
+    assert first.get_json() == second.get_json()
+    assert len(client.calls) == 1
+
+def test_if_none_match_returns_304(client):
+    etag = client.get('/items').headers['ETag']
+    response = client.get('/items', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.headers['ETag'] == etag
+    assert response.data == b''
+
+def test_if_modified_since_returns_304(client):
+    last_modified = client.get('/items').headers['Last-Modified']
+    assert client.get('/items', headers={'If-Modified-Since': last_modified}).status_code == 304
+
+def test_stale_etag_gets_full_response(client):
+    client.get('/items')
+    response = client.get('/items', headers={'If-None-Match': '"stale"'})
+    assert response.status_code == 200
+
+def test_invalidate_rebuilds_response(client):
+    etag = client.get('/items').headers['ETag']
+    response_cache.invalidate('items')
+    response = client.get('/items', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.get_json() == {'items': 2}
+
+def test_browser_must_revalidate(client):
+    assert client.get('/items').headers['Cache-Control'] == 'private, no-cache'
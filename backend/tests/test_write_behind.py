@@ -0,0 +1,129 @@
+from unittest import mock
+import pytest
+from bson import json_util
+from pymongo import InsertOne
+from pymongo.errors import AutoReconnect, BulkWriteError
+from utils.write_behind import WriteBehindBuffer
+
+class FakeCollection:
+    """Records bulk_write calls; raises the queued errors first"""
+    
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.batches = []
+    
+    def bulk_write(self, requests, ordered=True):
+        assert ordered is False
+        if self.errors:
+            error = self.errors.pop(0)
+            if error is not None:
+                raise error
+        self.batches.append(requests)
+
+@pytest.fixture
+def buffer(tmp_path):
+    return WriteBehindBuffer('evaluations', batch_size=100, flush_interval=60,
+                             spill_path=str(tmp_path / 'spill.jsonl'),
+                             dead_letter_path=str(tmp_path / 'dead.jsonl'))
+
+def _use(buffer, collection):
+    buffer._collection = lambda: collection
+    buffer._ensure_started = lambda: None
+
+def _lines(path):
+    with open(path, encoding='utf-8') as f:
+        return [json_util.loads(line) for line in f if line.strip()]
+
+def test_pending_insert_is_readable_until_flushed(buffer):
+    collection = FakeCollection()
+    _use(buffer, collection)
+    buffer.insert({'_id': 1, 'marks': 5})
+    assert buffer.get_pending(1) == {'_id': 1, 'marks': 5}
+    assert buffer.flush() == 1
+    assert buffer.get_pending(1) is None
+    assert len(collection.batches) == 1
+
+def test_outage_spills_and_next_flush_replays(buffer):
+    collection = FakeCollection(AutoReconnect('down'))
+    _use(buffer, collection)
+    buffer.insert({'_id': 1})
+    buffer.insert({'_id': 2})
+    buffer.flush()
+    assert [op['doc']['_id'] for op in _lines(buffer.spill_path)] == [1, 2]
+    
+    buffer.insert({'_id': 3})
+    buffer.flush()
+    replayed, current = collection.batches
+    assert [r._doc['_id'] for r in replayed] == [1, 2]
+    assert [r._doc['_id'] for r in current] == [3]
+    assert _lines(buffer.spill_path) == []
+
+def test_replay_ignores_duplicates_and_dead_letters_rejected_ops(buffer):
+    buffer._spill([{'op': 'insert', 'doc': {'_id': i}} for i in range(3)])
+    error = BulkWriteError({'writeErrors': [
+        {'index': 0, 'code': 11000, 'errmsg': 'duplicate key'},
+        {'index': 2, 'code': 121, 'errmsg': 'document failed validation'}
+    ]})
+    collection = FakeCollection(error)
+    _use(buffer, collection)
+    buffer.flush()
+    
+    dead = _lines(buffer.dead_letter_path)
+    assert [entry['operation']['doc']['_id'] for entry in dead] == [2]
+    assert dead[0]['error'] == 'document failed validation'
+    assert _lines(buffer.spill_path) == []
+    
+    # The rejected op is not retried on later flushes
+    buffer.insert({'_id': 9})
+    buffer.flush()
+    assert [r._doc['_id'] for r in collection.batches[-1]] == [9]
+
+def test_insert_registers_pending_before_enqueue(buffer):
+    _use(buffer, FakeCollection())
+    seen = []
+    original = buffer._enqueue
+    
+    def enqueue(operation):
+        seen.append(buffer.get_pending(operation['doc']['_id']))
+        original(operation)
+    
+    with mock.patch.object(buffer, '_enqueue', side_effect=enqueue):
+        buffer.insert({'_id': 7})
+    assert seen == [{'_id': 7}]
+
+def test_truncated_spill_line_is_dead_lettered(buffer):
+    buffer._spill([{'op': 'insert', 'doc': {'_id': 1}}])
+    with open(buffer.spill_path, 'a', encoding='utf-8') as f:
+        f.write('{"op": "insert", "doc": {"_i')
+    collection = FakeCollection()
+    _use(buffer, collection)
+    buffer.insert({'_id': 2})
+    buffer.flush()
+    
+    assert [[r._doc['_id'] for r in batch] for batch in collection.batches] == [[1], [2]]
+    dead = _lines(buffer.dead_letter_path)
+    assert dead[0]['operation'].startswith('{"op": "insert"')
+    assert _lines(buffer.spill_path) == []
+
+def test_unexpected_error_spills_the_batch(buffer):
+    _use(buffer, FakeCollection(TypeError('not serialisable')))
+    buffer.insert({'_id': 1})
+    buffer.flush()
+    assert [op['doc']['_id'] for op in _lines(buffer.spill_path)] == [1]
+
+def test_dead_flush_thread_is_restarted(buffer):
+    buffer._collection = lambda: FakeCollection()
+    buffer._thread = mock.Mock(is_alive=lambda: False)
+    buffer.insert({'_id': 1})
+    assert buffer._thread.is_alive()
+    buffer.close()
+
+def test_spill_and_replay_without_fcntl(buffer, monkeypatch):
+    from utils import write_behind
+    monkeypatch.setattr(write_behind, 'fcntl', None)
+    collection = FakeCollection(AutoReconnect('down'))
+    _use(buffer, collection)
+    buffer.insert({'_id': 1})
+    buffer.flush()
+    buffer.flush()
+    assert [[r._doc['_id'] for r in batch] for batch in collection.batches] == [[1]]
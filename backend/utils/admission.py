@@ -0,0 +1,149 @@
+import itertools
+import threading
+import time
+import logging
+from contextlib import contextmanager
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+class AdmissionRejected(Exception):
+    """Raised when a heavy request cannot be admitted; carries a Retry-After hint"""
+    
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class AdmissionController:
+    """Per-process admission control for heavy evaluation requests.
+    
+    A request is admitted when a concurrency slot and its estimated memory
+    are both available. Otherwise it waits in a bounded queue; when capacity
+    frees up, the waiter whose teacher currently has the fewest running
+    requests goes first (arrival order breaks ties), so one teacher's bulk
+    upload cannot starve the others. Requests without a teacher_id are only
+    bound by the global limits. A full queue or a wait past the timeout
+    is rejected immediately with a Retry-After estimate.
+    """
+    
+    def __init__(self, max_concurrent, memory_budget_mb, queue_size, queue_timeout, max_per_teacher):
+        self.max_concurrent = max_concurrent
+        self.memory_budget_mb = memory_budget_mb
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.max_per_teacher = max_per_teacher
+        
+        self._cond = threading.Condition()
+        self._running = 0
+        self._memory_mb = 0.0
+        self._per_teacher = {}
+        self._waiting = []
+        self._sequence = itertools.count()
+        self._avg_duration = 30.0
+        self.rejected = 0
+    
+    def estimate_cost_mb(self, content_length):
+        """Estimated peak memory of one evaluation from its upload size"""
+        upload_mb = (content_length or 0) / (1024 * 1024)
+        return Config.ADMISSION_BASE_COST_MB + upload_mb * Config.ADMISSION_MB_PER_UPLOAD_MB
+    
+    def _retry_after(self):
+        backlog = len(self._waiting) + 1
+        return max(1, int(self._avg_duration * backlog / max(self.max_concurrent, 1)))
+    
+    def _fits(self, ticket):
+        teacher = ticket['teacher']
+        # A single request larger than the whole budget may still run alone
+        memory_ok = (self._memory_mb + ticket['cost'] <= self.memory_budget_mb) or self._running == 0
+        # Requests without a teacher are not one tenant, so the per-teacher cap does not apply
+        teacher_ok = teacher is None or self._per_teacher.get(teacher, 0) < self.max_per_teacher
+        return self._running < self.max_concurrent and memory_ok and teacher_ok
+    
+    def _next_waiter(self):
+        eligible = [t for t in self._waiting if self._fits(t)]
+        if not eligible:
+            return None
+        return min(eligible, key=lambda t: (self._per_teacher.get(t['teacher'], 0), t['seq']))
+    
+    def acquire(self, teacher_id, cost_mb):
+        """Admit a request or raise AdmissionRejected; returns a ticket for release()"""
+        ticket = {
+            'teacher': teacher_id or None,
+            'cost': cost_mb,
+            'seq': next(self._sequence),
+            'started': None
+        }
+        with self._cond:
+            if not self._waiting and self._fits(ticket):
+                return self._start(ticket)
+            
+            if len(self._waiting) >= self.queue_size:
+                self.rejected += 1
+                raise AdmissionRejected("Server busy: evaluation queue is full", self._retry_after())
+            
+            self._waiting.append(ticket)
+            deadline = time.monotonic() + self.queue_timeout
+            try:
+                while self._next_waiter() is not ticket:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.rejected += 1
+                        raise AdmissionRejected("Server busy: timed out waiting for capacity", self._retry_after())
+                    self._cond.wait(remaining)
+            finally:
+                self._waiting.remove(ticket)
+                # Someone else may be eligible now that the queue changed
+                self._cond.notify_all()
+            return self._start(ticket)
+    
+    def _start(self, ticket):
+        self._running += 1
+        self._memory_mb += ticket['cost']
+        if ticket['teacher'] is not None:
+            self._per_teacher[ticket['teacher']] = self._per_teacher.get(ticket['teacher'], 0) + 1
+        ticket['started'] = time.monotonic()
+        return ticket
+    
+    def release(self, ticket):
+        """Free a ticket's slot and memory and wake waiting requests"""
+        with self._cond:
+            self._running -= 1
+            self._memory_mb -= ticket['cost']
+            if ticket['teacher'] is not None:
+                remaining = self._per_teacher[ticket['teacher']] - 1
+                if remaining:
+                    self._per_teacher[ticket['teacher']] = remaining
+                else:
+                    del self._per_teacher[ticket['teacher']]
+            
+            duration = time.monotonic() - ticket['started']
+            self._avg_duration = 0.8 * self._avg_duration + 0.2 * duration
+            self._cond.notify_all()
+    
+    @contextmanager
+    def admit(self, teacher_id, cost_mb):
+        """Context manager around acquire()/release()"""
+        ticket = self.acquire(teacher_id, cost_mb)
+        try:
+            yield ticket
+        finally:
+            self.release(ticket)
+    
+    def stats(self):
+        """Current load, for the health endpoint"""
+        with self._cond:
+            return {
+                'running': self._running,
+                'waiting': len(self._waiting),
+                'memory_mb': round(self._memory_mb, 1),
+                'rejected': self.rejected
+            }
+
+# Global admission controller for evaluation requests
+admission_controller = AdmissionController(
+    max_concurrent=Config.ADMISSION_MAX_CONCURRENT,
+    memory_budget_mb=Config.ADMISSION_MEMORY_BUDGET_MB,
+    queue_size=Config.ADMISSION_QUEUE_SIZE,
+    queue_timeout=Config.ADMISSION_QUEUE_TIMEOUT,
+    max_per_teacher=Config.ADMISSION_MAX_PER_TEACHER
+)
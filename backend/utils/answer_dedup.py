@@ -0,0 +1,85 @@
+import hashlib
+import re
+import logging
+from config import Config
+from utils.prompt_builder import normalize_text, estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# Maths symbols change the meaning of a short answer (x > 5 vs x < 5), so
+# they are kept as tokens of their own rather than dropped with punctuation
+_SYMBOLS = '<>=^*()[]{}√∛∜≠≈≤≥±∓×÷·°∞∑∫∂∆∠⊥∥!|'
+_SYMBOL = re.compile('([' + re.escape(_SYMBOLS) + '])')
+_NON_WORD = re.compile(r'[^\w.%/+\-' + re.escape(_SYMBOLS) + r']+')
+_NON_DECIMAL_POINT = re.compile(r'(?<!\d)\.|\.(?!\d)')
+
+def canonicalize(text):
+    """Normalise an extracted answer for comparison (case, spacing, punctuation)"""
+    text = _NON_WORD.sub(' ', normalize_text(text).lower())
+    text = _SYMBOL.sub(r' \1 ', _NON_DECIMAL_POINT.sub(' ', text))
+    return ' '.join(text.split())
+
+def _shingles(text, k):
+    words = text.split()
+    if len(words) <= k:
+        return {' '.join(words)}
+    return {' '.join(words[i:i + k]) for i in range(len(words) - k + 1)}
+
+def minhash_signature(text, num_hashes=None, shingle_size=None):
+    """MinHash signature of a canonical answer's word shingles"""
+    num_hashes = num_hashes or Config.DEDUP_MINHASH_PERMUTATIONS
+    shingle_size = shingle_size or Config.DEDUP_SHINGLE_SIZE
+    hashes = [
+        int.from_bytes(hashlib.blake2b(shingle.encode(), digest_size=8).digest(), 'big')
+        for shingle in _shingles(text, shingle_size)
+    ]
+    # Universal hashing (a*x + b mod p) simulates independent permutations
+    prime = (1 << 61) - 1
+    return [
+        min(((seed * 2 + 1) * h + seed) % prime for h in hashes)
+        for seed in range(1, num_hashes + 1)
+    ]
+
+def estimated_similarity(sig_a, sig_b):
+    """Estimated Jaccard similarity of two MinHash signatures"""
+    return sum(1 for a, b in zip(sig_a, sig_b) if a == b) / len(sig_a)
+
+def group_answers(texts):
+    """Group answers that can share one grade.
+    
+    Returns a list of groups, each a list of indexes into texts; the first
+    index of each group is its representative. Only short answers (up to
+    DEDUP_MAX_TOKENS) are grouped; longer ones always get their own group.
+    Exact matches after canonicalisation are grouped, and near-duplicates
+    too when DEDUP_NEAR_DUPLICATES is on.
+    """
+    groups = []
+    exact = {}
+    representatives = []  # (group index, signature) for near-duplicate matching
+    
+    for idx, text in enumerate(texts):
+        canonical = canonicalize(text)
+        if not canonical or estimate_tokens(canonical) > Config.DEDUP_MAX_TOKENS:
+            groups.append([idx])
+            continue
+        
+        if canonical in exact:
+            groups[exact[canonical]].append(idx)
+            continue
+        
+        if Config.DEDUP_NEAR_DUPLICATES:
+            signature = minhash_signature(canonical)
+            match = next((g for g, sig in representatives
+                          if estimated_similarity(signature, sig) >= Config.DEDUP_SIMILARITY_THRESHOLD), None)
+            if match is not None:
+                groups[match].append(idx)
+                exact[canonical] = match
+                continue
+            representatives.append((len(groups), signature))
+        
+        exact[canonical] = len(groups)
+        groups.append([idx])
+    
+    if len(groups) < len(texts):
+        logger.info(f"Answer dedup: {len(texts)} answers -> {len(groups)} grading call(s)")
+    return groups
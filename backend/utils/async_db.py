@@ -0,0 +1,66 @@
+import asyncio
+import threading
+from config import Config
+import logging
+from utils.lazy_import import lazy_import
+
+logger = logging.getLogger(__name__)
+
+class AsyncDatabaseConnection:
+    """Motor (asyncio) counterpart of DatabaseConnection for the async pipeline.
+
+    Motor clients are bound to the event loop they were created on, and Flask
+    runs each async view on its own loop in its own thread, so every loop gets
+    its own client. The client refers back to its loop, so neither is ever
+    garbage-collected: callers must call close_loop() before their loop ends.
+    """
+    
+    def __init__(self):
+        self._clients = {}
+        self._lock = threading.Lock()
+    
+    def get_db(self):
+        """Get async database instance for the running loop, connecting if necessary"""
+        loop = asyncio.get_running_loop()
+        
+        with self._lock:
+            client = self._clients.get(loop)
+            if client is None:
+                if not Config.MONGO_URI:
+                    raise ValueError("MONGO_URI not found in environment variables")
+                AsyncIOMotorClient = lazy_import('motor.motor_asyncio').AsyncIOMotorClient
+                client = AsyncIOMotorClient(
+                    Config.MONGO_URI,
+                    serverSelectionTimeoutMS=5000,
+                    connectTimeoutMS=10000,
+                    maxPoolSize=Config.ASYNC_MONGO_POOL_SIZE
+                )
+                self._clients[loop] = client
+                logger.info("Async MongoDB client created")
+        
+        db_name = getattr(Config, 'MONGO_DB_NAME', None) or 'ai_examiner'
+        return client[db_name]
+    
+    def get_collection(self, collection_name):
+        """Get specific collection"""
+        return self.get_db()[collection_name]
+    
+    def close_loop(self):
+        """Close the running loop's client, if it has one"""
+        with self._lock:
+            client = self._clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            client.close()
+    
+    def close(self):
+        """Close every async database connection"""
+        with self._lock:
+            clients = list(self._clients.values())
+            self._clients.clear()
+        for client in clients:
+            client.close()
+        if clients:
+            logger.info("Async database connections closed")
+
+# Global async database instance (lazy initialization)
+async_db_connection = AsyncDatabaseConnection()
@@ -0,0 +1,125 @@
+import asyncio
+import os
+import logging
+from config import Config
+from utils.pdf_processor import PDFProcessor
+from utils import answer_dedup
+from models.evaluation import Evaluation
+from utils.async_db import async_db_connection
+
+logger = logging.getLogger(__name__)
+
+class AsyncEvaluationPipeline:
+    """asyncio-native evaluation pipeline for many scripts in one process.
+
+    Gemini calls and Mongo writes are awaited, while the CPU/blocking parts
+    (PyPDF2, pdf2image) run in the default thread pool, so a single request
+    can keep many model calls in flight.
+    """
+    
+    def __init__(self, gemini_service, max_concurrency=None):
+        self.gemini_service = gemini_service
+        self.max_concurrency = max_concurrency or Config.ASYNC_MAX_CONCURRENCY
+    
+    async def extract_text(self, file_path):
+        """Text-layer extraction with Gemini vision fallback, without blocking the loop"""
+        try:
+            text = await asyncio.to_thread(PDFProcessor.extract_text_from_pdf, file_path)
+            if len(text.strip()) >= 100:
+                return text
+            logger.info(f"Insufficient text from extraction, using {Config.OCR_STRATEGY} OCR...")
+        except Exception as extract_error:
+            logger.warning(f"Text extraction failed: {str(extract_error)}, using {Config.OCR_STRATEGY} OCR...")
+        
+        if Config.OCR_STRATEGY == 'gemini':
+            images = await asyncio.to_thread(PDFProcessor.convert_pdf_to_images, file_path, 5)
+            return await PDFProcessor.extract_text_from_images_via_gemini_async(images, self.gemini_service)
+        
+        # Local OCR runs in the process pool; wait for it off the event loop
+        return await asyncio.to_thread(PDFProcessor.extract_text_from_scanned_pdf, file_path, self.gemini_service)
+    
+    async def evaluate_batch(self, scripts, model_answer, max_marks, question='', teacher=None):
+        """Extract all scripts, grade one representative per duplicate group, store all.
+        
+        Stages run concurrently within each stage, bounded by max_concurrency.
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        teacher = teacher or {}
+        
+        async def bounded(coro):
+            async with semaphore:
+                return await coro
+        
+        async def extract(script):
+            try:
+                script['extracted_text'] = await self.extract_text(script['file_path'])
+            except Exception as e:
+                logger.error(f"Async extraction error for {script['filename']}: {str(e)}")
+                script['error'] = str(e)
+            finally:
+                if os.path.exists(script['file_path']):
+                    os.remove(script['file_path'])
+        
+        logger.info(f"Evaluating {len(scripts)} scripts (max {self.max_concurrency} in flight)...")
+        await asyncio.gather(*(bounded(extract(script)) for script in scripts))
+        
+        extracted = [script for script in scripts if 'error' not in script]
+        groups = answer_dedup.group_answers([script['extracted_text'] for script in extracted])
+        
+        async def grade(group):
+            representative = extracted[group[0]]
+            result = await self.gemini_service.evaluate_answer_async(
+                representative['extracted_text'],
+                model_answer,
+                max_marks,
+                question
+            )
+            for idx in group:
+                extracted[idx]['evaluation'] = dict(result)
+                if len(group) > 1:
+                    extracted[idx]['evaluation']['dedup_group_size'] = len(group)
+        
+        await asyncio.gather(*(bounded(grade(group)) for group in groups))
+        
+        async def store(script):
+            try:
+                # Batch results go through the write-behind buffer: one bulk write per flush
+                evaluation_doc = await Evaluation.create_async(
+                    deferred=True,
+                    teacher_id=teacher.get('teacher_id'),
+                    student_id=script.get('student_id'),
+                    question=question,
+                    model_answer=model_answer,
+                    student_answer=script['filename'],
+                    extracted_text=script['extracted_text'],
+                    max_marks=max_marks,
+                    evaluation_result=script['evaluation'],
+                    teacher_name=teacher.get('teacher_name'),
+                    student_name=script.get('student_name'),
+                    student_rollno=script.get('student_rollno')
+                )
+                script['evaluation']['extracted_text'] = script['extracted_text']
+                script['evaluation']['evaluation_id'] = str(evaluation_doc['_id'])
+            except Exception as e:
+                logger.error(f"Async store error for {script['filename']}: {str(e)}")
+                script['error'] = str(e)
+        
+        await asyncio.gather(*(bounded(store(script)) for script in extracted))
+        
+        return [
+            {'success': False, 'filename': script['filename'], 'error': script['error']}
+            if 'error' in script else
+            {'success': True, 'filename': script['filename'], 'evaluation': script['evaluation']}
+            for script in scripts
+        ]
+    
+    async def close_loop_clients(self):
+        """Release the Motor client and Gemini channels bound to the running loop.
+        
+        Flask runs every async view on a fresh loop, so each request must call
+        this before returning or the clients (and their threads) are leaked.
+        """
+        try:
+            await self.gemini_service.close_async_models()
+        finally:
+            async_db_connection.close_loop()
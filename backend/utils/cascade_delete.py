@@ -0,0 +1,82 @@
+import threading
+import logging
+from bson import ObjectId
+from config import Config
+from models.teacher import Teacher
+from models.student import Student
+from models.evaluation import Evaluation
+from models.evaluation_archive import EvaluationArchive
+from models.analytics import Analytics
+from models.deletion_task import DeletionTask
+
+logger = logging.getLogger(__name__)
+
+class CascadeDeleter:
+    """Removes a deleted teacher's or student's evaluations in the background.
+    
+    The delete route only marks the person record deleted and creates a
+    DeletionTask. The task deletes (or archives, CASCADE_DELETE_MODE=archive)
+    matching evaluations in batches of CASCADE_BATCH_SIZE, recording progress
+    and renewing its lease after each batch, then drops their archived data
+    and analytics summary and purges the record. sweep() restarts abandoned tasks and opens
+    tasks for orphans: evaluations pointing at a teacher or student that no
+    longer exists.
+    """
+    
+    PEOPLE = {'teacher': Teacher, 'student': Student}
+    
+    def start(self, task_id):
+        """Claim and run a task in a daemon thread; returns False if already owned"""
+        task = DeletionTask.claim(task_id, Config.CASCADE_LEASE_SECONDS)
+        if not task:
+            return False
+        threading.Thread(target=self._run, args=(task,), name=f"cascade-{task_id}", daemon=True).start()
+        return True
+    
+    def _run(self, task):
+        task_id = task['_id']
+        kind = task['kind']
+        target_id = task['target_id']
+        field = DeletionTask.KINDS[kind]
+        logger.info(f"Cascade delete {task_id} started for {kind} {target_id}")
+        
+        try:
+            while True:
+                removed = Evaluation.remove_batch(field, target_id, Config.CASCADE_BATCH_SIZE, task['mode'])
+                if not removed:
+                    break
+                DeletionTask.progress(task_id, removed, Config.CASCADE_LEASE_SECONDS)
+            EvaluationArchive.remove(field, target_id, task['mode'])
+            
+            if kind == 'teacher':
+                Analytics.remove_summary('teacher', target_id)
+            if ObjectId.is_valid(target_id):
+                self.PEOPLE[kind].purge(target_id)
+            
+            DeletionTask.finish(task_id, 'completed')
+            logger.info(f"Cascade delete {task_id} completed")
+        except Exception as e:
+            logger.error(f"Cascade delete {task_id} failed: {str(e)}")
+            DeletionTask.finish(task_id, 'failed', str(e))
+    
+    def sweep(self):
+        """Resume abandoned tasks, then open tasks for deleted people and orphaned evaluations"""
+        for task in DeletionTask.find_resumable():
+            task = DeletionTask.claim(task['_id'], Config.CASCADE_LEASE_SECONDS)
+            if task:
+                self._run(task)
+        
+        opened = 0
+        for kind, model in self.PEOPLE.items():
+            orphans = Evaluation.distinct_ids(DeletionTask.KINDS[kind]) - model.live_ids()
+            for target_id in orphans | model.deleted_ids():
+                if DeletionTask.has_open_task(kind, target_id):
+                    continue
+                task = DeletionTask.create(kind, target_id, Config.CASCADE_DELETE_MODE, orphan=True)
+                task = DeletionTask.claim(task['_id'], Config.CASCADE_LEASE_SECONDS)
+                if task:
+                    self._run(task)
+                    opened += 1
+        if opened:
+            logger.info(f"Orphan sweep cleaned up {opened} teacher/student reference(s)")
+        return opened
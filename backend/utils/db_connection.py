@@ -1,5 +1,6 @@
 from pymongo import MongoClient
 from pymongo.errors import ConnectionFailure, OperationFailure
+from pymongo.read_preferences import Primary, SecondaryPreferred
 from config import Config
 import logging
 
@@ -91,6 +92,10 @@ class DatabaseConnection:
             self._db.evaluations.create_index("created_at")
             self._db.evaluations.create_index([("created_at", -1)])
             
+            # Archive indexes (student history and statistics past the current term)
+            self._db.evaluations_archive.create_index([("student_id", 1), ("created_at", -1)])
+            self._db.evaluation_rollups.create_index("student_id")
+            
             logger.info("Database indexes created successfully")
         except Exception as e:
             logger.warning(f"Error creating indexes: {e}")
@@ -101,15 +106,34 @@ class DatabaseConnection:
             return self.connect()
         return self._db
     
-    def get_collection(self, collection_name):
-        """Get specific collection"""
+    def read_preference(self, read_profile):
+        """Read preference for a named read profile.
+        
+        'primary' serves writes and read-after-write paths. 'reporting' serves
+        dashboards, statistics and exports from secondaries when the deployment
+        is a replica set, skipping any secondary lagging more than
+        MONGO_REPORTING_MAX_STALENESS seconds (-1 = no bound).
+        """
+        if read_profile == 'primary':
+            return Primary()
+        if read_profile == 'reporting':
+            return SecondaryPreferred(max_staleness=Config.MONGO_REPORTING_MAX_STALENESS)
+        raise ValueError(f"Unknown read profile: {read_profile}")
+    
+    def get_collection(self, collection_name, read_profile='primary'):
+        """Get specific collection, reading according to the named read profile"""
         db = self.get_db()
-        return db[collection_name]
+        if read_profile == 'primary':
+            return db[collection_name]
+        return db.get_collection(collection_name, read_preference=self.read_preference(read_profile))
     
     def close(self):
         """Close database connection"""
         if self._client:
             self._client.close()
+            self._client = None
+            self._db = None
+            self._connected = False
             logger.info("Database connection closed")
 
 # Global database instance (lazy initialization)
@@ -120,11 +144,6 @@ def get_database():
     """Get database instance with lazy connection"""
     return db_connection.get_db()
 
-# For backward compatibility
+# For backward compatibility - the connection is opened on first use
+# (first request or db_connection.connect()), not at import time
 db = None
-
-try:
-    db = db_connection.connect()
-except Exception as e:
-    logger.warning(f"Database not connected at startup: {e}")
-    logger.warning("Database will be connected on first use")
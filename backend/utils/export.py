@@ -0,0 +1,88 @@
+import csv
+import io
+import os
+import tempfile
+import zlib
+import logging
+from utils.lazy_import import lazy_import
+
+logger = logging.getLogger(__name__)
+
+# Columns written to exports, in order: (evaluation field, header)
+EXPORT_COLUMNS = [
+    ('created_at', 'Date'),
+    ('student_name', 'Student'),
+    ('student_rollno', 'Roll Number'),
+    ('teacher_name', 'Teacher'),
+    ('question', 'Question'),
+    ('max_marks', 'Max Marks'),
+    ('marks', 'Marks'),
+    ('percentage', 'Percentage'),
+    ('grade', 'Grade'),
+    ('strengths', 'Strengths'),
+    ('missing_points', 'Missing Points'),
+    ('feedback', 'Feedback')
+]
+
+EXPORT_FIELDS = [field for field, _ in EXPORT_COLUMNS]
+
+def _row(doc):
+    row = []
+    for field in EXPORT_FIELDS:
+        value = doc.get(field)
+        if isinstance(value, list):
+            value = '; '.join(str(item) for item in value)
+        elif hasattr(value, 'isoformat'):
+            value = value.isoformat(sep=' ', timespec='seconds')
+        row.append('' if value is None else value)
+    return row
+
+def stream_csv(cursor, flush_rows=500):
+    """Yield CSV text chunks from a cursor without holding all rows"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([header for _, header in EXPORT_COLUMNS])
+    
+    for count, doc in enumerate(cursor, 1):
+        writer.writerow(_row(doc))
+        if count % flush_rows == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+def stream_xlsx(cursor, chunk_size=64 * 1024):
+    """Write rows to a temporary XLSX file in constant memory, then stream it.
+    
+    An XLSX file is a zip archive that is only valid once complete, so the
+    download starts after the workbook is closed; rows are still never held
+    in memory (xlsxwriter constant_memory mode flushes each row to disk).
+    """
+    xlsxwriter = lazy_import('xlsxwriter')
+    fd, path = tempfile.mkstemp(suffix='.xlsx')
+    os.close(fd)
+    try:
+        workbook = xlsxwriter.Workbook(path, {'constant_memory': True})
+        sheet = workbook.add_worksheet('Evaluations')
+        sheet.write_row(0, 0, [header for _, header in EXPORT_COLUMNS])
+        for row_idx, doc in enumerate(cursor, 1):
+            sheet.write_row(row_idx, 0, _row(doc))
+        workbook.close()
+        
+        with open(path, 'rb') as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+    finally:
+        os.remove(path)
+
+def gzip_stream(chunks):
+    """Gzip-compress a stream of str/bytes chunks incrementally"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8') if isinstance(chunk, str) else chunk)
+        if data:
+            yield data
+    yield compressor.flush()
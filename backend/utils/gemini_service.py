@@ -1,23 +1,138 @@
-import google.generativeai as genai
+import asyncio
 import json
 import re
+import threading
+import time
 import logging
+from config import Config
+from utils.lazy_import import lazy_import
+from utils import prompt_builder
 
 logger = logging.getLogger(__name__)
 
+# Lower percentage cut-offs for A+, A, B+, B, C and D
+GRADE_BOUNDARIES = [90, 80, 70, 60, 50, 40]
+
+class GradingMetrics:
+    """Per-tier call counts, latency and token usage for cascade grading"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tiers = {}
+        self.escalations = 0
+        self.evaluations = 0
+    
+    def record_call(self, tier, latency, prompt_tokens, output_tokens):
+        with self._lock:
+            stats = self._tiers.setdefault(tier, {
+                'calls': 0, 'total_latency': 0.0, 'prompt_tokens': 0, 'output_tokens': 0
+            })
+            stats['calls'] += 1
+            stats['total_latency'] += latency
+            stats['prompt_tokens'] += prompt_tokens
+            stats['output_tokens'] += output_tokens
+    
+    def record_evaluation(self, escalated):
+        with self._lock:
+            self.evaluations += 1
+            if escalated:
+                self.escalations += 1
+    
+    def snapshot(self):
+        """Return metrics with averages and estimated cost per tier"""
+        prices = {
+            'fast': Config.GRADING_FAST_COST_PER_1K_TOKENS,
+            'strong': Config.GRADING_STRONG_COST_PER_1K_TOKENS
+        }
+        with self._lock:
+            tiers = {}
+            for tier, stats in self._tiers.items():
+                tokens = stats['prompt_tokens'] + stats['output_tokens']
+                tiers[tier] = {
+                    **stats,
+                    'avg_latency': stats['total_latency'] / stats['calls'] if stats['calls'] else 0,
+                    'estimated_cost': tokens / 1000 * prices.get(tier, 0)
+                }
+            return {
+                'evaluations': self.evaluations,
+                'escalations': self.escalations,
+                'escalation_rate': self.escalations / self.evaluations if self.evaluations else 0,
+                'tiers': tiers
+            }
+
+# Global grading metrics instance
+grading_metrics = GradingMetrics()
+
 class GeminiService:
     def __init__(self, api_key):
-        genai.configure(api_key=api_key)
-        # Using gemini-2.5-flash: newer model with better quotas
-        self.model = genai.GenerativeModel('gemini-2.5-flash')
+        self.api_key = api_key
+        self._models = {}
+        # event loop -> {model name: model}; released by close_async_models()
+        self._async_models = {}
+        self._async_lock = threading.Lock()
     
-    def evaluate_answer(self, student_answer, model_answer, max_marks, question=None):
-        """Evaluate student answer against model answer"""
-        question_context = f"\n\nQuestion: {question}" if question else ""
+    def get_model(self, model_name):
+        """Configure the SDK and build a model on first use"""
+        if model_name not in self._models and Config.GEMINI_BACKEND == 'stub':
+            from utils.gemini_stub import StubModel
+            self._models[model_name] = StubModel(model_name)
+        if model_name not in self._models:
+            genai = lazy_import('google.generativeai')
+            genai.configure(api_key=self.api_key)
+            self._models[model_name] = genai.GenerativeModel(model_name)
+        return self._models[model_name]
+    
+    def get_async_model(self, model_name):
+        """Model for generate_content_async on the running event loop.
         
-        logger.info("Starting answer evaluation...")
+        The SDK's async gRPC client is bound to the loop that created it and is
+        shared process-wide, while Flask runs each async view on a new loop in
+        its own thread. Async models therefore get their own client per loop,
+        which must be released with close_async_models() before the loop ends.
+        """
+        loop = asyncio.get_running_loop()
+        with self._async_lock:
+            models = self._async_models.setdefault(loop, {})
+            if model_name not in models:
+                if Config.GEMINI_BACKEND == 'stub':
+                    from utils.gemini_stub import StubModel
+                    models[model_name] = StubModel(model_name)
+                else:
+                    genai = lazy_import('google.generativeai')
+                    genai.configure(api_key=self.api_key)
+                    model = genai.GenerativeModel(model_name)
+                    # google-generativeai 0.3.x creates _async_client lazily from a global cache
+                    model._async_client = lazy_import('google.generativeai.client')._client_manager.make_client(
+                        'generative_async'
+                    )
+                    models[model_name] = model
+            return models[model_name]
+    
+    async def close_async_models(self):
+        """Close the gRPC channels of the running loop's async models"""
+        with self._async_lock:
+            models = self._async_models.pop(asyncio.get_running_loop(), {})
+        for model in models.values():
+            client = getattr(model, '_async_client', None)
+            if client is not None:
+                await client.transport.close()
+    
+    @property
+    def model(self):
+        """Default model, used for vision OCR and single-tier grading"""
+        return self.get_model(Config.GEMINI_MODEL)
+    
+    def _build_evaluation_prompt(self, student_answer, model_answer, max_marks, question=None, part=None):
+        """Build the grading prompt shared by the sync and async paths"""
+        question_context = f"\n\nQuestion: {question}" if question else ""
+        if part:
+            question_context += (
+                f"\n\nNOTE: The student's answer is long and is graded in {part[1]} parts. "
+                f"This is part {part[0]} of {part[1]}. Award marks only for points made in this part; "
+                f"the marks of all parts are added together."
+            )
         
-        prompt = f"""
+        return f"""
 You are an expert AI examiner. Evaluate the student's answer against the model answer.
 
 {question_context}
@@ -43,7 +158,8 @@ Provide a comprehensive evaluation in the following JSON format:
         "Include at least 2-3 points if applicable"
     ],
     "feedback": "Provide detailed constructive feedback (2-3 sentences) explaining the evaluation, what was done well, and areas for improvement",
-    "grade": "<A+/A/B+/B/C/D/F based on percentage>"
+    "grade": "<A+/A/B+/B/C/D/F based on percentage>",
+    "confidence": <number between 0 and 1: how certain you are that the marks awarded are correct>
 }}
 
 Be fair, constructive, and specific in your evaluation. Consider:
@@ -54,13 +170,11 @@ Be fair, constructive, and specific in your evaluation. Consider:
 
 Return ONLY valid JSON, no additional text.
 """
-        
+    
+    @staticmethod
+    def _parse_evaluation_response(result_text):
+        """Parse the model's JSON reply into an evaluation dict"""
         try:
-            logger.info("Calling Gemini API for evaluation...")
-            response = self.model.generate_content(prompt)
-            logger.info("Received response from Gemini API")
-            result_text = response.text.strip()
-            
             # Extract JSON from markdown code blocks if present
             json_match = re.search(r'```(?:json)?\s*(\{.*?\})\s*```', result_text, re.DOTALL)
             if json_match:
@@ -87,14 +201,234 @@ Return ONLY valid JSON, no additional text.
                 "strengths": ["Unable to parse evaluation results"],
                 "missing_points": ["Error in evaluation process"],
                 "feedback": f"Evaluation error: {str(e)}. Raw response: {result_text[:200]}",
-                "grade": "N/A"
-            }
-        except Exception as e:
-            return {
-                "marks_awarded": 0,
-                "percentage": 0,
-                "strengths": [],
-                "missing_points": [],
-                "feedback": f"Error during evaluation: {str(e)}",
-                "grade": "N/A"
+                "grade": "N/A",
+                "grading_error": f"Unparseable response: {str(e)}"
             }
+    
+    @staticmethod
+    def _error_result(error):
+        """Evaluation returned when the model call itself fails"""
+        return {
+            "marks_awarded": 0,
+            "percentage": 0,
+            "strengths": [],
+            "missing_points": [],
+            "feedback": f"Error during evaluation: {str(error)}",
+            "grade": "N/A",
+            "grading_error": str(error)
+        }
+    
+    @staticmethod
+    def is_error_result(evaluation):
+        """True if the evaluation is a placeholder for a failed or unparseable model call"""
+        return bool(evaluation.get('grading_error'))
+    
+    @classmethod
+    def _cascade_result(cls, previous, result):
+        """Outcome of a tier given the previous tier's grade.
+        
+        A failed escalation keeps the earlier valid grade, flagged with
+        escalation_failed, rather than replacing it with an error result.
+        """
+        if previous is None or not cls.is_error_result(result) or cls.is_error_result(previous):
+            return result
+        logger.warning(f"{result['grading_tier']} tier failed ({result['grading_error']}), "
+                       f"keeping the {previous['grading_tier']} tier grade")
+        return {**previous, 'escalation_failed': True}
+    
+    @staticmethod
+    def _should_escalate(evaluation, max_marks):
+        """Escalate low-confidence grades and grades close to a boundary"""
+        try:
+            confidence = float(evaluation.get('confidence', 0))
+            percentage = float(evaluation.get('percentage') or
+                               float(evaluation.get('marks_awarded', 0)) / max_marks * 100)
+        except (TypeError, ValueError, ZeroDivisionError):
+            return True
+        
+        if confidence < Config.CASCADE_MIN_CONFIDENCE:
+            return True
+        return any(abs(percentage - boundary) <= Config.CASCADE_BOUNDARY_MARGIN
+                   for boundary in GRADE_BOUNDARIES)
+    
+    @staticmethod
+    def _record_call(tier, started, response, prompt, text):
+        """Record a tier call; token counts are estimated when the SDK doesn't report usage"""
+        # google-generativeai 0.3.x responses carry no usage_metadata
+        usage = getattr(response, 'usage_metadata', None)
+        grading_metrics.record_call(
+            tier,
+            time.perf_counter() - started,
+            getattr(usage, 'prompt_token_count', 0) or prompt_builder.estimate_tokens(prompt),
+            getattr(usage, 'candidates_token_count', 0) or prompt_builder.estimate_tokens(text)
+        )
+    
+    def _grading_tiers(self):
+        """(tier, model name) pairs to try in order"""
+        if Config.CASCADE_GRADING:
+            return [('fast', Config.GRADING_FAST_MODEL), ('strong', Config.GRADING_STRONG_MODEL)]
+        return [('single', Config.GEMINI_MODEL)]
+    
+    @staticmethod
+    def grade_for_percentage(percentage):
+        """Letter grade for a percentage, using GRADE_BOUNDARIES"""
+        for boundary, grade in zip(GRADE_BOUNDARIES, ['A+', 'A', 'B+', 'B', 'C', 'D']):
+            if percentage >= boundary:
+                return grade
+        return 'F'
+    
+    @classmethod
+    def _merge_section_results(cls, results, max_marks):
+        """Combine per-section grades of a long answer into one evaluation"""
+        def unique(items):
+            return list(dict.fromkeys(item for item in items if item))
+        
+        marks = 0
+        for result in results:
+            try:
+                marks += float(result.get('marks_awarded', 0))
+            except (TypeError, ValueError):
+                pass
+        marks = min(marks, max_marks)
+        percentage = round(marks / max_marks * 100, 1) if max_marks else 0
+        confidences = [r['confidence'] for r in results if isinstance(r.get('confidence'), (int, float))]
+        errors = [r['grading_error'] for r in results if r.get('grading_error')]
+        
+        merged = {
+            'marks_awarded': marks,
+            'percentage': percentage,
+            'strengths': unique(point for r in results for point in r.get('strengths', [])),
+            'missing_points': unique(point for r in results for point in r.get('missing_points', [])),
+            'feedback': ' '.join(f"Part {idx + 1}: {r.get('feedback', '')}" for idx, r in enumerate(results)),
+            'grade': cls.grade_for_percentage(percentage),
+            'confidence': min(confidences) if confidences else None,
+            'grading_tier': 'strong' if any(r.get('grading_tier') == 'strong' for r in results)
+                            else results[0].get('grading_tier'),
+            'sections': len(results),
+            'escalation_failed': any(r.get('escalation_failed') for r in results)
+        }
+        if errors:
+            # One failed section makes the whole grade unreliable
+            merged['grading_error'] = errors[0]
+        return merged
+    
+    def _prepare_prompts(self, student_answer, model_answer, max_marks, question):
+        """Normalise inputs and build one prompt per section within the token budget.
+        
+        Returns (prompts, number of sections dropped past PROMPT_MAX_SECTIONS).
+        """
+        sections, model_answer, dropped = prompt_builder.prepare_inputs(student_answer, model_answer)
+        if len(sections) == 1:
+            prompts = [self._build_evaluation_prompt(sections[0], model_answer, max_marks, question)]
+        else:
+            logger.info(f"Answer exceeds token budget, grading in {len(sections)} sections")
+            prompts = [
+                self._build_evaluation_prompt(section, model_answer, max_marks, question,
+                                              part=(idx + 1, len(sections)))
+                for idx, section in enumerate(sections)
+            ]
+        return prompts, dropped
+    
+    def _finish(self, results, prompts, max_marks, dropped=0):
+        """Merge section results and attach the prompt token estimate.
+        
+        If sections were dropped, the grade misses part of the answer, so the
+        result says so in truncated_sections and in its feedback.
+        """
+        evaluation = results[0] if len(results) == 1 else self._merge_section_results(results, max_marks)
+        evaluation['prompt_tokens'] = sum(prompt_builder.estimate_tokens(p) for p in prompts)
+        if dropped:
+            evaluation['truncated_sections'] = dropped
+            evaluation['feedback'] = (
+                f"{evaluation.get('feedback', '')} NOTE: this answer was too long to grade in full; "
+                f"the last {dropped} part(s) were not graded and need a manual review."
+            ).strip()
+        return evaluation
+    
+    def evaluate_answer(self, student_answer, model_answer, max_marks, question=None, on_event=None):
+        """Evaluate student answer against model answer.
+        
+        When on_event is given, responses are streamed and on_event(event, data)
+        receives grading_started, token and escalated events.
+        """
+        logger.info("Starting answer evaluation...")
+        prompts, dropped = self._prepare_prompts(student_answer, model_answer, max_marks, question)
+        results = []
+        for idx, prompt in enumerate(prompts):
+            if on_event and len(prompts) > 1:
+                on_event('section_started', {'section': idx + 1, 'total': len(prompts)})
+            results.append(self._grade(prompt, max_marks, on_event))
+        return self._finish(results, prompts, max_marks, dropped)
+    
+    async def evaluate_answer_async(self, student_answer, model_answer, max_marks, question=None):
+        """Evaluate student answer without blocking the event loop"""
+        prompts, dropped = self._prepare_prompts(student_answer, model_answer, max_marks, question)
+        results = await asyncio.gather(*(self._grade_async(prompt, max_marks) for prompt in prompts))
+        return self._finish(list(results), prompts, max_marks, dropped)
+    
+    def _generate(self, model_name, prompt, on_event=None):
+        """Call the model, streaming chunks to on_event when given; returns (text, response)"""
+        model = self.get_model(model_name)
+        if not on_event:
+            response = model.generate_content(prompt)
+            return response.text, response
+        
+        response = model.generate_content(prompt, stream=True)
+        parts = []
+        for chunk in response:
+            if chunk.text:
+                parts.append(chunk.text)
+                on_event('token', {'text': chunk.text})
+        return "".join(parts), response
+    
+    def _grade(self, prompt, max_marks, on_event=None):
+        """Grade one prompt, cascading fast -> strong model"""
+        tiers = self._grading_tiers()
+        evaluation = None
+        
+        for idx, (tier, model_name) in enumerate(tiers):
+            try:
+                logger.info(f"Calling Gemini API for evaluation ({tier} tier: {model_name})...")
+                if on_event:
+                    on_event('grading_started', {'tier': tier, 'model': model_name})
+                started = time.perf_counter()
+                text, response = self._generate(model_name, prompt, on_event)
+                self._record_call(tier, started, response, prompt, text)
+                result = self._parse_evaluation_response(text.strip())
+            except Exception as e:
+                result = self._error_result(e)
+            
+            result['grading_tier'] = tier
+            evaluation = self._cascade_result(evaluation, result)
+            if (idx == len(tiers) - 1 or evaluation.get('escalation_failed')
+                    or not self._should_escalate(evaluation, max_marks)):
+                break
+            logger.info("Fast-tier grade uncertain, escalating to strong model")
+            if on_event:
+                on_event('escalated', {'from': tier, 'confidence': evaluation.get('confidence')})
+        
+        grading_metrics.record_evaluation(escalated=idx > 0)
+        return evaluation
+    
+    async def _grade_async(self, prompt, max_marks):
+        """Async counterpart of _grade"""
+        tiers = self._grading_tiers()
+        evaluation = None
+        
+        for idx, (tier, model_name) in enumerate(tiers):
+            try:
+                started = time.perf_counter()
+                response = await self.get_async_model(model_name).generate_content_async(prompt)
+                self._record_call(tier, started, response, prompt, response.text)
+                result = self._parse_evaluation_response(response.text.strip())
+            except Exception as e:
+                result = self._error_result(e)
+            
+            result['grading_tier'] = tier
+            evaluation = self._cascade_result(evaluation, result)
+            if (idx == len(tiers) - 1 or evaluation.get('escalation_failed')
+                    or not self._should_escalate(evaluation, max_marks)):
+                break
+        
+        grading_metrics.record_evaluation(escalated=idx > 0)
+        return evaluation
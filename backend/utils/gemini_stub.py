@@ -0,0 +1,62 @@
+import asyncio
+import json
+import random
+import re
+import time
+from types import SimpleNamespace
+from config import Config
+
+class StubResponse:
+    """Minimal stand-in for a google.generativeai response"""
+    
+    def __init__(self, text):
+        self.text = text
+        self.usage_metadata = SimpleNamespace(
+            prompt_token_count=0,
+            candidates_token_count=len(text) // 4
+        )
+    
+    def __iter__(self):
+        # Streaming: yield the reply in a few chunks
+        step = max(len(self.text) // 4, 1)
+        for i in range(0, len(self.text), step):
+            yield SimpleNamespace(text=self.text[i:i + step])
+
+class StubModel:
+    """Offline Gemini replacement for load tests (GEMINI_BACKEND=stub).
+    
+    Sleeps for GEMINI_STUB_LATENCY seconds (+/- 50% jitter) and returns a
+    canned grade for text prompts or canned OCR text for image prompts.
+    """
+    
+    def __init__(self, model_name):
+        self.model_name = model_name
+    
+    @staticmethod
+    def _latency():
+        return Config.GEMINI_STUB_LATENCY * random.uniform(0.5, 1.5)
+    
+    @staticmethod
+    def _reply(contents):
+        if isinstance(contents, list):
+            return "Stub OCR text: the student explains the concept with a worked example."
+        match = re.search(r'MAXIMUM MARKS: ([\d.]+)', contents)
+        max_marks = float(match.group(1)) if match else 10
+        percentage = random.randint(35, 95)
+        return json.dumps({
+            "marks_awarded": round(max_marks * percentage / 100, 1),
+            "percentage": percentage,
+            "strengths": ["Covers the main definition"],
+            "missing_points": ["Does not give an example"],
+            "feedback": "Stub evaluation for load testing.",
+            "grade": "B",
+            "confidence": random.uniform(0.5, 1.0)
+        })
+    
+    def generate_content(self, contents, stream=False):
+        time.sleep(self._latency())
+        return StubResponse(self._reply(contents))
+    
+    async def generate_content_async(self, contents):
+        await asyncio.sleep(self._latency())
+        return StubResponse(self._reply(contents))
@@ -0,0 +1,31 @@
+import importlib
+import sys
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Seconds spent importing each lazily loaded module, for the debug startup report
+_import_timings = {}
+_lock = threading.Lock()
+
+def lazy_import(module_name):
+    """Import a heavy dependency on first use and record how long it took"""
+    module = sys.modules.get(module_name)
+    if module is not None:
+        return module
+    
+    with _lock:
+        module = sys.modules.get(module_name)
+        if module is None:
+            start = time.perf_counter()
+            module = importlib.import_module(module_name)
+            elapsed = time.perf_counter() - start
+            _import_timings[module_name] = elapsed
+            logger.info(f"Lazily imported {module_name} in {elapsed * 1000:.1f} ms")
+    return module
+
+def import_timings():
+    """Return recorded lazy import timings in milliseconds"""
+    return {name: round(seconds * 1000, 1) for name, seconds in _import_timings.items()}
@@ -0,0 +1,76 @@
+import atexit
+import multiprocessing
+import threading
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from config import Config
+from utils.lazy_import import lazy_import
+
+logger = logging.getLogger(__name__)
+
+# One EasyOCR reader per process - loading the detection/recognition models
+# takes several seconds, so it is built once and reused for every page
+_reader = None
+_reader_lock = threading.Lock()
+
+# Process pool shared by all requests in this worker
+_executor = None
+_executor_lock = threading.Lock()
+
+def get_reader():
+    """Return this process's EasyOCR reader, loading it on first use (CPU only)"""
+    global _reader
+    if _reader is None:
+        with _reader_lock:
+            if _reader is None:
+                easyocr = lazy_import('easyocr')
+                logger.info("Loading EasyOCR reader (CPU)...")
+                _reader = easyocr.Reader(Config.LOCAL_OCR_LANGUAGES, gpu=False, verbose=False)
+    return _reader
+
+def _init_worker():
+    """Pool initializer: load the reader once per OCR process"""
+    get_reader()
+
+def ocr_page(img_array):
+    """OCR one grayscale page array, returning (text, mean confidence)"""
+    results = get_reader().readtext(img_array, detail=1, paragraph=False)
+    if not results:
+        return "", 0.0
+    text = "\n".join(result[1] for result in results)
+    confidence = sum(result[2] for result in results) / len(results)
+    return text, confidence
+
+def get_executor():
+    """Return the OCR process pool, creating it on first use"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                logger.info(f"Starting local OCR pool with {Config.LOCAL_OCR_WORKERS} process(es)")
+                # spawn, not fork: the parent is multi-threaded and torch is not fork-safe
+                _executor = ProcessPoolExecutor(
+                    max_workers=Config.LOCAL_OCR_WORKERS,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_init_worker
+                )
+    return _executor
+
+def reset_executor(broken):
+    """Replace a pool left broken by a dead worker (e.g. OOM-killed); a no-op if
+    another thread has already replaced it"""
+    global _executor
+    with _executor_lock:
+        if _executor is broken:
+            logger.warning("Local OCR pool broken by a dead worker, starting a new one")
+            broken.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+def shutdown():
+    """Stop the OCR process pool"""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+atexit.register(shutdown)
@@ -0,0 +1,155 @@
+import atexit
+import multiprocessing
+import threading
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from config import Config
+from utils.lazy_import import lazy_import
+
+logger = logging.getLogger(__name__)
+
+class PDFTextBackend:
+    """Interface for text-layer PDF parsers.
+    
+    Backends are stateless and addressed by name so that page ranges can be
+    shipped to worker processes. open() parses a file once; the document it
+    returns is passed to page_count() and extract_pages(), then to close().
+    """
+    name = None
+    
+    def open(self, pdf_path):
+        return pdf_path
+    
+    def close(self, document):
+        pass
+    
+    def page_count(self, document):
+        raise NotImplementedError
+    
+    def extract_pages(self, document, start, end):
+        """Return the text of pages [start, end) as a list of strings"""
+        raise NotImplementedError
+
+class PyPDF2Backend(PDFTextBackend):
+    name = 'pypdf2'
+    
+    def open(self, pdf_path):
+        return lazy_import('PyPDF2').PdfReader(pdf_path)
+    
+    def page_count(self, document):
+        return len(document.pages)
+    
+    def extract_pages(self, document, start, end):
+        return [document.pages[i].extract_text() or "" for i in range(start, end)]
+
+class PdfiumBackend(PDFTextBackend):
+    name = 'pdfium'
+    
+    def open(self, pdf_path):
+        return lazy_import('pypdfium2').PdfDocument(pdf_path)
+    
+    def close(self, document):
+        document.close()
+    
+    def page_count(self, document):
+        return len(document)
+    
+    def extract_pages(self, document, start, end):
+        pages = []
+        for i in range(start, end):
+            page = document[i]
+            textpage = page.get_textpage()
+            pages.append(textpage.get_text_range())
+            textpage.close()
+            page.close()
+        return pages
+
+class PdfMinerBackend(PDFTextBackend):
+    """pdfminer.six parses per call, so its document is just the path"""
+    name = 'pdfminer'
+    
+    def page_count(self, document):
+        PDFPage = lazy_import('pdfminer.pdfpage').PDFPage
+        with open(document, 'rb') as f:
+            return sum(1 for _ in PDFPage.get_pages(f))
+    
+    def extract_pages(self, document, start, end):
+        extract_text = lazy_import('pdfminer.high_level').extract_text
+        return [extract_text(document, page_numbers=[i]) for i in range(start, end)]
+
+BACKENDS = {
+    backend.name: backend
+    for backend in (PyPDF2Backend(), PdfiumBackend(), PdfMinerBackend())
+}
+
+def get_backend(name=None):
+    """Look up a text backend by name (defaults to Config.PDF_TEXT_BACKEND)"""
+    name = name or Config.PDF_TEXT_BACKEND
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown PDF text backend: {name}")
+    return BACKENDS[name]
+
+def _extract_range(backend_name, pdf_path, start, end):
+    """Worker entry point: extract one page range in a pool process"""
+    backend = BACKENDS[backend_name]
+    document = backend.open(pdf_path)
+    try:
+        return backend.extract_pages(document, start, end)
+    finally:
+        backend.close(document)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def get_executor():
+    """Return the text-extraction process pool, creating it on first use"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ProcessPoolExecutor(
+                    max_workers=Config.PDF_TEXT_WORKERS,
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+    return _executor
+
+def shutdown():
+    """Stop the text-extraction process pool"""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+atexit.register(shutdown)
+
+def extract_pages(pdf_path, backend_name=None, parallel=None):
+    """Extract every page's text, splitting large documents across the pool.
+    
+    Documents with more than PDF_PARALLEL_PAGE_THRESHOLD pages are divided
+    into contiguous page ranges, one per worker; smaller ones are parsed
+    in-process, where pool overhead would dominate, from the same parsed
+    document used to count the pages.
+    """
+    backend = get_backend(backend_name)
+    document = backend.open(pdf_path)
+    try:
+        total = backend.page_count(document)
+        if parallel is None:
+            parallel = total > Config.PDF_PARALLEL_PAGE_THRESHOLD
+        if not parallel or total == 0:
+            return backend.extract_pages(document, 0, total)
+    finally:
+        backend.close(document)
+    
+    workers = Config.PDF_TEXT_WORKERS
+    chunk = -(-total // workers)
+    futures = [
+        get_executor().submit(_extract_range, backend.name, pdf_path, start, min(start + chunk, total))
+        for start in range(0, total, chunk)
+    ]
+    
+    pages = []
+    for future in futures:
+        pages.extend(future.result())
+    logger.info(f"Extracted {total} pages with {backend.name} across {len(futures)} process(es)")
+    return pages
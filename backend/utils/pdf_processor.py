@@ -1,14 +1,16 @@
 import os
-from pdf2image import convert_from_path
-from PyPDF2 import PdfReader
-from PIL import Image
-import tempfile
-import numpy as np
+import asyncio
 import logging
 import platform
 import gc
 import base64
+import uuid
 from io import BytesIO
+from concurrent.futures.process import BrokenProcessPool
+from werkzeug.utils import secure_filename
+from utils.lazy_import import lazy_import
+from config import Config
+from utils import local_ocr, pdf_backends
 
 logger = logging.getLogger(__name__)
 
@@ -18,29 +20,30 @@ if platform.system() == 'Windows':
     # Local development path
     POPPLER_PATH = r"C:\Users\Jayesh\poppler\poppler-23.08.0\Library\bin"
 
+OCR_PROMPT = "Extract all text from this image. Include handwritten and typed text. Return ONLY the extracted text, nothing else."
+
 class PDFProcessor:
     @staticmethod
-    def extract_text_from_pdf(pdf_path):
+    def extract_text_from_pdf(pdf_path, backend=None):
         """Extract plain text from PDF (for model answers)"""
         try:
-            reader = PdfReader(pdf_path)
-            text = ""
-            for page in reader.pages:
-                text += page.extract_text() + "\n"
-            return text.strip()
+            pages = pdf_backends.extract_pages(pdf_path, backend)
+            return "\n".join(pages).strip()
         except Exception as e:
             raise Exception(f"Error extracting text from PDF: {str(e)}")
     
     @staticmethod
-    def convert_pdf_to_images(pdf_path, max_pages=5):
-        """Convert PDF to images for Gemini vision API (limited to first 5 pages)"""
+    def convert_pdf_to_images(pdf_path, max_pages=5, dpi=50):
+        """Convert PDF to images for OCR (limited to first 5 pages)"""
         try:
             logger.info(f"Converting PDF to images: {pdf_path}")
-            # Very low DPI for speed - Gemini can read low-res images fine
+            convert_from_path = lazy_import('pdf2image').convert_from_path
+            
+            # Very low DPI by default for speed - Gemini can read low-res images fine
             if POPPLER_PATH:
-                images = convert_from_path(pdf_path, dpi=50, poppler_path=POPPLER_PATH, last_page=max_pages)
+                images = convert_from_path(pdf_path, dpi=dpi, poppler_path=POPPLER_PATH, last_page=max_pages)
             else:
-                images = convert_from_path(pdf_path, dpi=50, last_page=max_pages)
+                images = convert_from_path(pdf_path, dpi=dpi, last_page=max_pages)
             
             logger.info(f"Converted {len(images)} pages to images")
             return images
@@ -48,37 +51,128 @@ class PDFProcessor:
             raise Exception(f"Error converting PDF to images: {str(e)}")
     
     @staticmethod
-    def extract_text_from_images_via_gemini(images, gemini_service):
-        """Use Gemini vision API to extract text from images (much faster than EasyOCR)"""
+    def _jpeg_bytes(image, quality):
+        """Encode a PIL image as JPEG bytes"""
+        img_byte_arr = BytesIO()
+        image.save(img_byte_arr, format='JPEG', quality=quality, optimize=True)
+        return img_byte_arr.getvalue()
+    
+    @staticmethod
+    def preprocess_image(image):
+        """Grayscale, blank-detect, crop and optionally binarise a page image.
+        
+        Returns the processed PIL image, or None if the page is blank.
+        """
+        Image = lazy_import('PIL.Image')
+        np = lazy_import('numpy')
+        
+        gray = np.asarray(image.convert('L'), dtype=np.uint8)
+        
+        # Ink is anything clearly darker than the paper background
+        background = np.percentile(gray, 90)
+        ink = gray < (background - Config.OCR_INK_CONTRAST)
+        
+        if ink.mean() < Config.OCR_BLANK_INK_RATIO:
+            return None
+        
+        # Crop to the content bounding box (plus a small margin)
+        rows = np.flatnonzero(ink.any(axis=1))
+        cols = np.flatnonzero(ink.any(axis=0))
+        pad = Config.OCR_CROP_PADDING
+        top, bottom = max(rows[0] - pad, 0), min(rows[-1] + pad + 1, gray.shape[0])
+        left, right = max(cols[0] - pad, 0), min(cols[-1] + pad + 1, gray.shape[1])
+        
+        if Config.OCR_BINARIZE:
+            cropped = np.where(ink[top:bottom, left:right], 0, 255).astype(np.uint8)
+        else:
+            cropped = gray[top:bottom, left:right]
+        
+        return Image.fromarray(cropped, mode='L')
+    
+    @staticmethod
+    def encode_image_for_gemini(image, stats=None):
+        """Preprocess and encode a PIL image as an inline JPEG part for Gemini vision.
+        
+        Returns None for blank pages. When a stats dict is passed, blank pages
+        and bytes sent are counted. The unprocessed JPEG size needs a second
+        full-size encode, so it is only measured when debug logging is on.
+        """
+        measure = stats is not None and Config.OCR_PREPROCESS and logger.isEnabledFor(logging.DEBUG)
+        original_size = len(PDFProcessor._jpeg_bytes(image, 70)) if measure else 0
+        
+        if Config.OCR_PREPROCESS:
+            processed = PDFProcessor.preprocess_image(image)
+            if processed is None:
+                if stats is not None:
+                    stats['blank_pages'] += 1
+                    stats['original_bytes'] += original_size
+                return None
+            
+            # Downscale oversized pages, then lower quality until under budget
+            if max(processed.size) > Config.OCR_MAX_DIMENSION:
+                processed.thumbnail((Config.OCR_MAX_DIMENSION, Config.OCR_MAX_DIMENSION))
+            for quality in (70, 60, 50, 40):
+                data = PDFProcessor._jpeg_bytes(processed, quality)
+                if len(data) <= Config.OCR_TARGET_BYTES:
+                    break
+        else:
+            data = PDFProcessor._jpeg_bytes(image, 70)
+            original_size = len(data)
+        
+        if stats is not None:
+            stats['original_bytes'] += original_size
+            stats['sent_bytes'] += len(data)
+        
+        return {
+            "mime_type": "image/jpeg",
+            "data": base64.standard_b64encode(data).decode()
+        }
+    
+    @staticmethod
+    def new_preprocess_stats():
+        """Counters for encode_image_for_gemini"""
+        return {'blank_pages': 0, 'original_bytes': 0, 'sent_bytes': 0}
+    
+    @staticmethod
+    def log_preprocess_stats(stats):
+        """Report what preprocessing sent for one script (and saved, under debug logging)"""
+        logger.info(f"Image preprocessing: {stats['blank_pages']} blank page(s) skipped, "
+                    f"{stats['sent_bytes']} bytes sent")
+        if stats['original_bytes']:
+            saved = stats['original_bytes'] - stats['sent_bytes']
+            logger.debug(f"Image preprocessing saved {saved} bytes "
+                         f"({saved / stats['original_bytes'] * 100:.0f}%)")
+    
+    @staticmethod
+    def extract_text_from_images_via_gemini(images, gemini_service, progress=None):
+        """Use Gemini vision API to extract text from images (much faster than EasyOCR).
+        
+        progress(page, total) is called after each page when given.
+        """
         try:
             logger.info(f"Extracting text from {len(images)} images using Gemini vision...")
             extracted_text = ""
+            stats = PDFProcessor.new_preprocess_stats()
             
             for idx, image in enumerate(images):
                 try:
                     logger.info(f"Processing page {idx + 1}/{len(images)} with Gemini vision...")
                     
-                    # Convert PIL image to bytes for Gemini
-                    img_byte_arr = BytesIO()
-                    image.save(img_byte_arr, format='JPEG', quality=70, optimize=True)
-                    img_byte_arr.seek(0)
-                    img_base64 = base64.standard_b64encode(img_byte_arr.getvalue()).decode()
+                    payload = PDFProcessor.encode_image_for_gemini(image, stats)
+                    if payload is None:
+                        extracted_text += f"\n--- Page {idx + 1} ---\n[Blank page]\n"
+                        continue
                     
                     # Use Gemini vision to extract text
-                    response = gemini_service.model.generate_content([
-                        "Extract all text from this image. Include handwritten and typed text. Return ONLY the extracted text, nothing else.",
-                        {
-                            "mime_type": "image/jpeg",
-                            "data": img_base64
-                        }
-                    ])
+                    response = gemini_service.model.generate_content([OCR_PROMPT, payload])
                     
                     page_text = response.text.strip() if response.text else "[No text detected]"
                     extracted_text += f"\n--- Page {idx + 1} ---\n{page_text}\n"
+                    if progress:
+                        progress(idx + 1, len(images))
                     
                     # Cleanup
                     del image
-                    del img_byte_arr
                     gc.collect()
                     
                 except Exception as page_error:
@@ -87,6 +181,7 @@ class PDFProcessor:
                     gc.collect()
                     continue
             
+            PDFProcessor.log_preprocess_stats(stats)
             logger.info("Gemini vision extraction completed")
             return extracted_text.strip()
             
@@ -94,57 +189,150 @@ class PDFProcessor:
             logger.error(f"Error extracting text via Gemini: {str(e)}")
             raise Exception(f"Error extracting text from images: {str(e)}")
     
-    @classmethod
-    def extract_text_from_images(cls, images):
-        """Extract text from images using EasyOCR with memory optimization"""
-        try:
-            logger.info(f"Extracting text from {len(images)} images...")
-            reader = cls.get_ocr_reader()
-            extracted_text = ""
-            
-            for idx, image in enumerate(images):
+    @staticmethod
+    async def extract_text_from_images_via_gemini_async(images, gemini_service, concurrency=5):
+        """Async Gemini vision OCR - all pages of a script are in flight at once"""
+        semaphore = asyncio.Semaphore(concurrency)
+        stats = PDFProcessor.new_preprocess_stats()
+        
+        async def ocr_page(idx, image):
+            async with semaphore:
                 try:
-                    logger.info(f"Processing page {idx + 1}/{len(images)}...")
-                    
-                    # Resize image to 40% to save memory
-                    new_width = max(int(image.width * 0.4), 400)
-                    new_height = int(image.height * 0.4)
-                    resized_image = image.resize((new_width, new_height), Image.Resampling.LANCZOS)
-                    
-                    # Convert PIL Image to numpy array for EasyOCR
-                    img_array = np.array(resized_image)
-                    
-                    # Perform OCR
-                    results = reader.readtext(img_array, detail=0, paragraph=False)
-                    
-                    # Combine results
-                    page_text = "\n".join(results) if results else "[No text detected]"
-                    extracted_text += f"\n--- Page {idx + 1} ---\n{page_text}\n"
-                    
-                    # Explicit memory cleanup
-                    del resized_image
-                    del img_array
-                    del image
-                    gc.collect()
-                    
+                    payload = await asyncio.to_thread(PDFProcessor.encode_image_for_gemini, image, stats)
+                    if payload is None:
+                        return f"\n--- Page {idx + 1} ---\n[Blank page]\n"
+                    response = await gemini_service.get_async_model(Config.GEMINI_MODEL).generate_content_async(
+                        [OCR_PROMPT, payload]
+                    )
+                    page_text = response.text.strip() if response.text else "[No text detected]"
                 except Exception as page_error:
                     logger.warning(f"Error processing page {idx + 1}: {str(page_error)}")
-                    extracted_text += f"\n--- Page {idx + 1} ---\n[Error processing page]\n"
-                    gc.collect()
-                    continue
+                    page_text = f"[Error: {str(page_error)}]"
+                return f"\n--- Page {idx + 1} ---\n{page_text}\n"
+        
+        pages = await asyncio.gather(*(ocr_page(idx, image) for idx, image in enumerate(images)))
+        PDFProcessor.log_preprocess_stats(stats)
+        return "".join(pages).strip()
+    
+    @staticmethod
+    def get_ocr_reader():
+        """Get the process-wide EasyOCR reader"""
+        return local_ocr.get_reader()
+    
+    @staticmethod
+    def ocr_pages_locally(images):
+        """OCR page images with EasyOCR across the process pool.
+        
+        Returns a list of (text, confidence) tuples in page order; pages that
+        could not be read at all have a confidence of None.
+        """
+        np = lazy_import('numpy')
+        logger.info(f"Running local OCR on {len(images)} page(s)...")
+        
+        arrays = [np.asarray(image.convert('L')) for image in images]
+        executor = local_ocr.get_executor()
+        try:
+            futures = [executor.submit(local_ocr.ocr_page, arr) for arr in arrays]
+        except BrokenProcessPool:
+            local_ocr.reset_executor(executor)
+            executor = local_ocr.get_executor()
+            futures = [executor.submit(local_ocr.ocr_page, arr) for arr in arrays]
+        
+        pages = []
+        broken = False
+        for idx, future in enumerate(futures):
+            try:
+                pages.append(future.result(timeout=Config.LOCAL_OCR_PAGE_TIMEOUT))
+            except Exception as page_error:
+                broken = broken or isinstance(page_error, BrokenProcessPool)
+                logger.warning(f"Local OCR failed on page {idx + 1}: {str(page_error)}")
+                pages.append(("", None))
+        if broken:
+            # The pool stays unusable after a worker dies; the next request gets a fresh one
+            local_ocr.reset_executor(executor)
+        return pages
+    
+    @classmethod
+    def extract_text_from_images(cls, images, progress=None):
+        """Extract text from images using local EasyOCR (no API calls)"""
+        try:
+            pages = cls.ocr_pages_locally(images)
+            if pages and all(confidence is None for _, confidence in pages):
+                # Grading empty text would silently store a 0-mark evaluation
+                raise Exception("local OCR failed on every page")
+            
+            extracted_text = ""
+            for idx, (page_text, _) in enumerate(pages):
+                extracted_text += f"\n--- Page {idx + 1} ---\n{page_text or '[No text detected]'}\n"
+                if progress:
+                    progress(idx + 1, len(images))
             
-            logger.info("Text extraction completed")
+            logger.info("Local OCR completed")
             return extracted_text.strip()
         except Exception as e:
             logger.error(f"Error extracting text: {str(e)}")
             raise Exception(f"Error extracting text from images: {str(e)}")
     
+    @classmethod
+    def extract_text_from_scanned_pdf(cls, pdf_path, gemini_service, max_pages=5, progress=None):
+        """OCR a scanned PDF using the strategy selected by Config.OCR_STRATEGY.
+        
+        - gemini: Gemini vision for every page
+        - local: EasyOCR only
+        - local-then-gemini-on-low-confidence: EasyOCR first, Gemini vision only
+          for pages whose mean confidence is below LOCAL_OCR_MIN_CONFIDENCE
+        """
+        strategy = Config.OCR_STRATEGY
+        
+        if strategy == 'gemini':
+            images = cls.convert_pdf_to_images(pdf_path, max_pages=max_pages)
+            return cls.extract_text_from_images_via_gemini(images, gemini_service, progress)
+        
+        images = cls.convert_pdf_to_images(pdf_path, max_pages=max_pages, dpi=Config.LOCAL_OCR_DPI)
+        
+        if strategy == 'local':
+            return cls.extract_text_from_images(images, progress)
+        
+        if strategy != 'local-then-gemini-on-low-confidence':
+            raise ValueError(f"Unknown OCR_STRATEGY: {strategy}")
+        
+        extracted_text = ""
+        escalated = 0
+        unread = 0
+        for idx, (page_text, confidence) in enumerate(cls.ocr_pages_locally(images)):
+            if confidence is None or confidence < Config.LOCAL_OCR_MIN_CONFIDENCE:
+                try:
+                    payload = cls.encode_image_for_gemini(images[idx])
+                    if payload is not None:
+                        response = gemini_service.model.generate_content([OCR_PROMPT, payload])
+                        page_text = response.text.strip() if response.text else page_text
+                        escalated += 1
+                        confidence = confidence or 0.0
+                except Exception as page_error:
+                    # Gemini throttled or down - keep the local result
+                    logger.warning(f"Gemini fallback failed on page {idx + 1}: {str(page_error)}")
+            if confidence is None:
+                unread += 1
+            extracted_text += f"\n--- Page {idx + 1} ---\n{page_text or '[No text detected]'}\n"
+            if progress:
+                progress(idx + 1, len(images))
+        
+        if images and unread == len(images):
+            raise Exception("Local OCR and the Gemini fallback failed on every page")
+        logger.info(f"Local OCR completed, {escalated}/{len(images)} page(s) escalated to Gemini")
+        return extracted_text.strip()
+    
     @staticmethod
     def save_uploaded_file(file, upload_folder):
-        """Save uploaded file and return path"""
+        """Save uploaded file under a unique name and return path.
+        
+        Concurrent uploads often share a filename (script.pdf), so each copy
+        gets a random prefix and cannot be overwritten or removed by another request.
+        """
         if not os.path.exists(upload_folder):
             os.makedirs(upload_folder)
         
-        file_path = os.path.join(upload_folder, file.filename)
+        filename = f"{uuid.uuid4().hex}_{secure_filename(file.filename) or 'upload.pdf'}"
+        file_path = os.path.join(upload_folder, filename)
         file.save(file_path)
         return file_path
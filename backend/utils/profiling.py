@@ -0,0 +1,159 @@
+import json
+import os
+import random
+import re
+import time
+import uuid
+import logging
+from contextlib import contextmanager
+from datetime import datetime
+from flask import g, request
+from config import Config
+from utils.lazy_import import lazy_import
+
+logger = logging.getLogger(__name__)
+
+_PROFILE_ID = re.compile(r'^[0-9a-f]{32}$')
+
+def is_authorized(req):
+    """True when the request carries the configured profiling token"""
+    token = Config.PROFILING_TOKEN
+    if not Config.PROFILING_ENABLED or not token:
+        return False
+    # Header only: query strings end up in the access log
+    return req.headers.get(Config.PROFILING_HEADER) == token
+
+# Views whose work runs off the request thread (the SSE worker thread, the
+# async batch route's event loop); they profile that work with profile_work()
+_OFF_THREAD_VIEWS = set()
+
+def profiles_own_work(view):
+    """Mark a view that profiles its own work with profile_work()"""
+    _OFF_THREAD_VIEWS.add(view.__name__)
+    return view
+
+def _start_profiler():
+    g.profile_trigger = None
+    # The profile listing/download endpoints use the same token; don't profile them
+    if not Config.PROFILING_ENABLED or request.path.startswith('/api/profiles'):
+        return
+    
+    if is_authorized(request):
+        g.profile_trigger = 'on-demand'
+    elif Config.PROFILING_SAMPLE_RATE > 0 and random.random() < Config.PROFILING_SAMPLE_RATE:
+        g.profile_trigger = 'sampled'
+    else:
+        return
+    
+    # The request thread of an off-thread view only waits; profiling it shows nothing
+    if (request.endpoint or '').rsplit('.', 1)[-1] in _OFF_THREAD_VIEWS:
+        return
+    profiler = _new_profiler()
+    if profiler is not None:
+        g.profiler = profiler
+        g.profile_started = time.perf_counter()
+
+def _stop_profiler(response):
+    profiler = g.pop('profiler', None)
+    if profiler is None:
+        return response
+    
+    profile_id = _store(profiler, {
+        'method': request.method,
+        'path': request.path,
+        'status': response.status_code,
+        'trigger': g.profile_trigger,
+        'duration_ms': round((time.perf_counter() - g.profile_started) * 1000, 1)
+    })
+    if profile_id:
+        response.headers['X-Profile-Id'] = profile_id
+    return response
+
+def _new_profiler():
+    """A started pyinstrument profiler for the current thread (or coroutine), or None"""
+    try:
+        profiler = lazy_import('pyinstrument').Profiler(interval=Config.PROFILING_INTERVAL)
+        profiler.start()
+        return profiler
+    except Exception as e:
+        logger.warning(f"Could not start profiler: {str(e)}")
+        return None
+
+def _store(profiler, metadata):
+    """Stop the profiler and store its report; returns the profile ID or None"""
+    try:
+        profiler.stop()
+        profile_id = uuid.uuid4().hex
+        os.makedirs(Config.PROFILING_DIR, exist_ok=True)
+        with open(os.path.join(Config.PROFILING_DIR, f"{profile_id}.html"), 'w', encoding='utf-8') as f:
+            f.write(profiler.output_html())
+        with open(os.path.join(Config.PROFILING_DIR, f"{profile_id}.json"), 'w', encoding='utf-8') as f:
+            json.dump({'id': profile_id, **metadata, 'created_at': datetime.utcnow().isoformat()}, f)
+        _prune()
+        return profile_id
+    except Exception as e:
+        logger.warning(f"Could not store profile: {str(e)}")
+        return None
+
+def request_profile():
+    """The current request's profiling decision, to hand to profile_work() in
+    another thread: (trigger or None, method, path)"""
+    return g.get('profile_trigger'), request.method, request.path
+
+@contextmanager
+def profile_work(profile):
+    """Profile the enclosed block in the current thread or coroutine.
+    
+    profile is request_profile() from a view marked with profiles_own_work.
+    Yields a dict that gets the stored profile's 'id' when the block ends.
+    """
+    trigger, method, path = profile
+    stored = {}
+    profiler = _new_profiler() if trigger else None
+    started = time.perf_counter()
+    try:
+        yield stored
+    finally:
+        if profiler is not None:
+            stored['id'] = _store(profiler, {
+                'method': method,
+                'path': path,
+                'status': None,
+                'trigger': trigger,
+                'duration_ms': round((time.perf_counter() - started) * 1000, 1)
+            })
+
+def _prune():
+    """Keep only the newest PROFILING_MAX_STORED profiles"""
+    profiles = list_profiles()
+    for profile in profiles[Config.PROFILING_MAX_STORED:]:
+        for ext in ('html', 'json'):
+            path = os.path.join(Config.PROFILING_DIR, f"{profile['id']}.{ext}")
+            if os.path.exists(path):
+                os.remove(path)
+
+def list_profiles():
+    """Stored profile metadata, newest first"""
+    if not os.path.isdir(Config.PROFILING_DIR):
+        return []
+    profiles = []
+    for name in os.listdir(Config.PROFILING_DIR):
+        if name.endswith('.json'):
+            try:
+                with open(os.path.join(Config.PROFILING_DIR, name), encoding='utf-8') as f:
+                    profiles.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+    return sorted(profiles, key=lambda p: p['created_at'], reverse=True)
+
+def profile_path(profile_id):
+    """Path of a stored HTML profile, or None if the ID is unknown"""
+    if not _PROFILE_ID.match(profile_id):
+        return None
+    path = os.path.join(Config.PROFILING_DIR, f"{profile_id}.html")
+    return path if os.path.exists(path) else None
+
+def init_app(app):
+    """Register the profiling hooks (no-op unless PROFILING_ENABLED)"""
+    app.before_request(_start_profiler)
+    app.after_request(_stop_profiler)
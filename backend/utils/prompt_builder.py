@@ -0,0 +1,125 @@
+import math
+import re
+import logging
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# OCR output markers that carry no answer content
+_PAGE_MARKER = re.compile(r'^\s*---\s*Page\s+\d+\s*---\s*$', re.MULTILINE)
+_PLACEHOLDER = re.compile(r'\[(?:No text detected|Blank page|Error(?:: [^\]]*)?|Error processing page)\]')
+_SPACES = re.compile(r'[ \t\f\v]+')
+_BLANK_LINES = re.compile(r'\n\s*\n+')
+
+# Progressively finer split points for a paragraph over budget: (pattern, joiner)
+_SPLIT_LEVELS = [
+    (re.compile(r'(?<=[.!?])\s+'), ' '),
+    (re.compile(r'\n'), '\n'),
+    (re.compile(r'\s+'), ' ')
+]
+
+def normalize_text(text):
+    """Strip OCR artefacts and collapse whitespace to save prompt tokens"""
+    if not text:
+        return ""
+    text = _PAGE_MARKER.sub('', text)
+    text = _PLACEHOLDER.sub('', text)
+    text = _SPACES.sub(' ', text)
+    text = '\n'.join(line.strip() for line in text.split('\n'))
+    text = _BLANK_LINES.sub('\n\n', text)
+    return text.strip()
+
+def estimate_tokens(text):
+    """Approximate Gemini token count (about four characters per token)"""
+    return math.ceil(len(text) / Config.PROMPT_CHARS_PER_TOKEN) if text else 0
+
+def truncate_to_tokens(text, max_tokens):
+    """Cut text to roughly max_tokens, preferring a paragraph boundary"""
+    limit = int(max_tokens * Config.PROMPT_CHARS_PER_TOKEN)
+    if len(text) <= limit:
+        return text
+    cut = text.rfind('\n\n', 0, limit)
+    return text[:cut if cut > limit // 2 else limit].rstrip()
+
+def _split_oversized(text, max_tokens, level=0):
+    """Split text into chunks of at most max_tokens without dropping any of it.
+    
+    Tries sentence ends, then line breaks, then words; a single run of
+    characters longer than the budget is hard-wrapped.
+    """
+    if estimate_tokens(text) <= max_tokens:
+        return [text]
+    if level == len(_SPLIT_LEVELS):
+        limit = max(int(max_tokens * Config.PROMPT_CHARS_PER_TOKEN), 1)
+        return [text[i:i + limit] for i in range(0, len(text), limit)]
+    
+    pattern, joiner = _SPLIT_LEVELS[level]
+    chunks = []
+    current = ''
+    for part in pattern.split(text):
+        if not part:
+            continue
+        for sub in _split_oversized(part, max_tokens, level + 1):
+            candidate = current + joiner + sub if current else sub
+            if current and estimate_tokens(candidate) > max_tokens:
+                chunks.append(current)
+                current = sub
+            else:
+                current = candidate
+    if current:
+        chunks.append(current)
+    return chunks
+
+def split_into_sections(text, max_tokens):
+    """Split text into sections of at most max_tokens, on paragraph boundaries.
+    
+    Paragraphs that are themselves too long are split on sentence ends, then
+    lines, then words, so the whole answer is graded.
+    """
+    if estimate_tokens(text) <= max_tokens:
+        return [text]
+    
+    pieces = []
+    for paragraph in text.split('\n\n'):
+        if estimate_tokens(paragraph) <= max_tokens:
+            pieces.append(paragraph)
+        else:
+            pieces.extend(_split_oversized(paragraph, max_tokens))
+    
+    sections = []
+    current = []
+    current_tokens = 0
+    for piece in pieces:
+        piece_tokens = estimate_tokens(piece)
+        if current and current_tokens + piece_tokens > max_tokens:
+            sections.append('\n\n'.join(current))
+            current, current_tokens = [], 0
+        current.append(piece)
+        current_tokens += piece_tokens
+    if current:
+        sections.append('\n\n'.join(current))
+    return sections
+
+def prepare_inputs(student_answer, model_answer):
+    """Normalise both answers and fit them into the prompt token budget.
+    
+    Returns (student sections, model answer, dropped sections). The model
+    answer is capped at PROMPT_MODEL_ANSWER_MAX_TOKENS; the student answer gets
+    the rest of PROMPT_MAX_INPUT_TOKENS and is split into sections if it does
+    not fit. Sections past PROMPT_MAX_SECTIONS are not graded and are counted
+    in dropped sections so the caller can flag the result.
+    """
+    student_answer = normalize_text(student_answer)
+    model_answer = normalize_text(model_answer)
+    
+    if estimate_tokens(model_answer) > Config.PROMPT_MODEL_ANSWER_MAX_TOKENS:
+        logger.warning("Model answer exceeds its token budget, truncating")
+        model_answer = truncate_to_tokens(model_answer, Config.PROMPT_MODEL_ANSWER_MAX_TOKENS)
+    
+    student_budget = Config.PROMPT_MAX_INPUT_TOKENS - estimate_tokens(model_answer)
+    sections = split_into_sections(student_answer, student_budget)
+    dropped = max(len(sections) - Config.PROMPT_MAX_SECTIONS, 0)
+    if dropped:
+        logger.warning(f"Answer needs {len(sections)} sections, grading the first {Config.PROMPT_MAX_SECTIONS}")
+        sections = sections[:Config.PROMPT_MAX_SECTIONS]
+    return sections, model_answer, dropped
@@ -0,0 +1,124 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import logging
+from config import Config
+from models.evaluation import Evaluation
+from models.regrade_job import RegradeJob
+from utils.gemini_service import GeminiService
+
+logger = logging.getLogger(__name__)
+
+class RegradeRunner:
+    """Runs bulk re-grade jobs in background threads.
+    
+    Each job walks its matching evaluations in _id order, one page at a time.
+    A page is re-graded from the stored extracted_text (no OCR) with bounded
+    concurrency, written back with a single bulk_write, and then the job's
+    checkpoint is saved. A heartbeat thread renews the job's lease while it
+    runs; a crashed job's lease expires and the job is picked up again from
+    its checkpoint. Evaluations already tagged with the job ID are skipped,
+    so a half-finished page is not graded twice, and a runner that finds its
+    lease taken over stops without writing. Failed grades
+    (including Gemini error placeholders) leave the stored result and the
+    document untagged; the job then ends as failed and a resume re-scans
+    from the start to retry just those.
+    """
+    
+    def __init__(self, gemini_service):
+        self.gemini_service = gemini_service
+    
+    def start(self, job_id):
+        """Claim and run a job in a daemon thread; returns False if already owned"""
+        job = RegradeJob.claim(job_id, Config.REGRADE_LEASE_SECONDS)
+        if not job:
+            return False
+        threading.Thread(target=self._run, args=(job,), name=f"regrade-{job_id}", daemon=True).start()
+        return True
+    
+    def resume_abandoned(self):
+        """Restart jobs whose worker died mid-run"""
+        for job in RegradeJob.find_resumable():
+            if self.start(job['_id']):
+                logger.info(f"Resuming re-grade job {job['_id']}")
+    
+    def _regrade(self, doc, model_answer):
+        evaluation_result = self.gemini_service.evaluate_answer(
+            doc.get('extracted_text', ''),
+            model_answer or doc.get('model_answer', ''),
+            doc.get('max_marks') or 0,
+            doc.get('question')
+        )
+        return doc, evaluation_result
+    
+    def _heartbeat(self, job_id, stop, lost):
+        """Renew the job's lease until stop is set; sets lost if another worker took the job"""
+        while not stop.wait(max(Config.REGRADE_LEASE_SECONDS / 3, 1)):
+            try:
+                if not RegradeJob.renew_lease(job_id, Config.REGRADE_LEASE_SECONDS):
+                    logger.warning(f"Re-grade job {job_id} lease lost, stopping this runner")
+                    lost.set()
+                    return
+            except Exception as e:
+                logger.warning(f"Could not renew lease of re-grade job {job_id}: {str(e)}")
+    
+    def _run(self, job):
+        job_id = job['_id']
+        model_answer = job.get('model_answer')
+        checkpoint_id = job.get('checkpoint_id')
+        query = Evaluation.build_filter_query(**job['filters'])
+        logger.info(f"Re-grade job {job_id} started (checkpoint: {checkpoint_id})")
+        run_failed = 0
+        stop, lost = threading.Event(), threading.Event()
+        threading.Thread(target=self._heartbeat, args=(job_id, stop, lost),
+                         name=f"regrade-lease-{job_id}", daemon=True).start()
+        
+        try:
+            with ThreadPoolExecutor(max_workers=Config.REGRADE_CONCURRENCY) as pool:
+                while not lost.is_set():
+                    page = Evaluation.find_for_regrade(
+                        query, str(job_id), checkpoint_id, Config.REGRADE_PAGE_SIZE
+                    )
+                    if not page:
+                        break
+                    
+                    regrades = []
+                    failed = 0
+                    futures = [pool.submit(self._regrade, doc, model_answer) for doc in page]
+                    for future in futures:
+                        try:
+                            doc, evaluation_result = future.result()
+                        except Exception as e:
+                            failed += 1
+                            logger.warning(f"Re-grade failed in job {job_id}: {str(e)}")
+                            continue
+                        if GeminiService.is_error_result(evaluation_result):
+                            # Keep the stored grade and leave the document untagged for a retry
+                            failed += 1
+                            logger.warning(f"Re-grade failed in job {job_id}: {evaluation_result['grading_error']}")
+                            continue
+                        regrades.append((doc, evaluation_result))
+                    
+                    if lost.is_set():
+                        break
+                    Evaluation.apply_regrades(regrades, str(job_id), model_answer)
+                    checkpoint_id = page[-1]['_id']
+                    if not RegradeJob.checkpoint(job_id, checkpoint_id, len(regrades), failed,
+                                                 Config.REGRADE_LEASE_SECONDS).matched_count:
+                        lost.set()
+                    run_failed += failed
+            
+            if lost.is_set():
+                # The new owner carries on from the last checkpoint
+                return
+            if run_failed:
+                RegradeJob.finish(job_id, 'failed',
+                                  f"{run_failed} evaluation(s) could not be re-graded; resume the job to retry them")
+                logger.warning(f"Re-grade job {job_id} finished with {run_failed} failure(s)")
+                return
+            RegradeJob.finish(job_id, 'completed')
+            logger.info(f"Re-grade job {job_id} completed")
+        except Exception as e:
+            logger.error(f"Re-grade job {job_id} failed: {str(e)}")
+            RegradeJob.finish(job_id, 'failed', str(e))
+        finally:
+            stop.set()
@@ -0,0 +1,156 @@
+import hashlib
+import threading
+import time
+from email.utils import formatdate, parsedate_to_datetime
+from functools import wraps
+
+from flask import request, make_response
+from config import Config
+import logging
+
+logger = logging.getLogger(__name__)
+
+class ResponseCache:
+    """In-process cache of serialized JSON responses for read endpoints.
+
+    Entries are grouped by namespace ('teachers', 'students', 'evaluations').
+    Model write methods call invalidate() for their namespace, which bumps a
+    version counter so every cached response built from older data is dropped
+    on the next lookup.
+    """
+
+    def __init__(self, default_ttl=30, max_entries=512):
+        self.default_ttl = default_ttl
+        self.max_entries = max_entries
+        self._entries = {}
+        self._versions = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _version(self, namespaces):
+        return tuple(self._versions.get(ns, 0) for ns in namespaces)
+
+    def current_version(self, namespaces):
+        """Snapshot the namespace versions before building a response"""
+        with self._lock:
+            return self._version(namespaces)
+
+    def get(self, key, namespaces):
+        """Return a live cache entry for key, or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry['expires_at'] < time.time() or entry['version'] != self._version(namespaces):
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry
+
+    def set(self, key, version, body, status, ttl=None):
+        """Store a serialized response body and return the new entry.
+
+        version must be taken with current_version() before the data was read,
+        so a write racing with the read leaves the entry already stale.
+        """
+        now = time.time()
+        entry = {
+            'body': body,
+            'status': status,
+            'etag': '"' + hashlib.sha1(body).hexdigest() + '"',
+            'last_modified': now,
+            'expires_at': now + (ttl if ttl is not None else self.default_ttl),
+            'version': version
+        }
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                # Drop the entry closest to expiry to make room
+                oldest = min(self._entries, key=lambda k: self._entries[k]['expires_at'])
+                del self._entries[oldest]
+            self._entries[key] = entry
+        return entry
+
+    def invalidate(self, *namespaces):
+        """Invalidate all cached responses depending on the given namespaces"""
+        with self._lock:
+            for ns in namespaces:
+                self._versions[ns] = self._versions.get(ns, 0) + 1
+
+    def clear(self):
+        """Drop every cached response"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Return hit/miss counters for monitoring"""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses
+            }
+
+# Global response cache instance
+response_cache = ResponseCache(
+    default_ttl=Config.RESPONSE_CACHE_TTL,
+    max_entries=Config.RESPONSE_CACHE_MAX_ENTRIES
+)
+
+def _not_modified(entry):
+    """Check the request's conditional headers against a cache entry"""
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match:
+        tags = [tag.strip() for tag in if_none_match.split(',')]
+        return entry['etag'] in tags or '*' in tags
+
+    if_modified_since = request.headers.get('If-Modified-Since')
+    if if_modified_since:
+        try:
+            since = parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+        return int(entry['last_modified']) <= since
+    return False
+
+def _build_response(entry):
+    """Build a Flask response (200 or 304) from a cache entry"""
+    if _not_modified(entry):
+        response = make_response('', 304)
+    else:
+        response = make_response(entry['body'], entry['status'])
+        response.mimetype = 'application/json'
+    response.headers['ETag'] = entry['etag']
+    response.headers['Last-Modified'] = formatdate(entry['last_modified'], usegmt=True)
+    # The browser must revalidate every time (a 304 is cheap) so it never shows a
+    # list the server has already invalidated
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+def cached_response(*namespaces, ttl=None):
+    """Decorator caching a GET route's JSON response with ETag/Last-Modified support.
+
+    Only 200 responses are cached; errors always go through to the view.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if not Config.RESPONSE_CACHE_ENABLED:
+                return view(*args, **kwargs)
+
+            entry_ttl = ttl if ttl is not None else response_cache.default_ttl
+            key = request.full_path
+
+            entry = response_cache.get(key, namespaces)
+            if entry is None:
+                version = response_cache.current_version(namespaces)
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+                entry = response_cache.set(key, version, response.get_data(), 200, entry_ttl)
+
+            return _build_response(entry)
+        return wrapper
+    return decorator
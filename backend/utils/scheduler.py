@@ -0,0 +1,68 @@
+import os
+import socket
+import threading
+from datetime import datetime, timedelta
+import logging
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from utils.db_connection import db_connection
+
+logger = logging.getLogger(__name__)
+
+class PeriodicJob:
+    """Run a function every `interval` seconds in a daemon thread.
+    
+    Every gunicorn worker starts the same jobs, so each run first takes a
+    lease in the `job_locks` collection; only the worker holding the lease
+    runs the job, the others skip that tick.
+    """
+    
+    def __init__(self, name, interval, func, lease_seconds=None):
+        self.name = name
+        self.interval = interval
+        self.func = func
+        self.lease_seconds = lease_seconds or interval
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self._stop = threading.Event()
+        self._thread = None
+    
+    def _acquire_lease(self):
+        now = datetime.utcnow()
+        collection = db_connection.get_collection('job_locks')
+        try:
+            result = collection.find_one_and_update(
+                {'_id': self.name, '$or': [{'locked_until': {'$lt': now}}, {'owner': self.owner}]},
+                {'$set': {'owner': self.owner, 'locked_until': now + timedelta(seconds=self.lease_seconds)}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+            return result is not None
+        except DuplicateKeyError:
+            # Another worker holds an unexpired lease
+            return False
+    
+    def run_once(self):
+        """Run the job now if this worker can take the lease"""
+        try:
+            if not self._acquire_lease():
+                return False
+            logger.info(f"Running scheduled job: {self.name}")
+            self.func()
+            return True
+        except Exception as e:
+            logger.error(f"Scheduled job {self.name} failed: {str(e)}")
+            return False
+    
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            self.run_once()
+    
+    def start(self):
+        """Start the background thread (idempotent)"""
+        if self._thread is None and self.interval > 0:
+            self._thread = threading.Thread(target=self._loop, name=f"job-{self.name}", daemon=True)
+            self._thread.start()
+            logger.info(f"Scheduled job {self.name} every {self.interval}s")
+    
+    def stop(self):
+        self._stop.set()
@@ -0,0 +1,204 @@
+import atexit
+import os
+import threading
+import logging
+from contextlib import contextmanager
+from bson import json_util
+from pymongo import InsertOne
+from pymongo.errors import BulkWriteError
+from pymongo.write_concern import WriteConcern
+from config import Config
+from utils.db_connection import db_connection
+from utils.response_cache import response_cache
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: gunicorn doesn't run there, so a single process owns the files
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+_process_file_lock = threading.RLock()
+
+@contextmanager
+def _locked(f):
+    """Hold an exclusive lock on an open file, across processes where the OS supports it"""
+    if fcntl is None:
+        with _process_file_lock:
+            yield
+        return
+    fcntl.flock(f, fcntl.LOCK_EX)
+    try:
+        yield
+    finally:
+        fcntl.flock(f, fcntl.LOCK_UN)
+
+class WriteBehindBuffer:
+    """Buffered writer that coalesces inserts into unordered bulk_write batches.
+    
+    Operations are flushed when WRITE_BEHIND_BATCH_SIZE are queued or every
+    WRITE_BEHIND_FLUSH_INTERVAL seconds, whichever comes first, and on
+    shutdown. If MongoDB is unreachable, the batch is appended to a local
+    spill file (Extended JSON lines) and replayed before the next flush.
+    The spill file is shared by all workers, so every access holds an
+    exclusive lock and replay truncates it rather than removing it.
+    Operations MongoDB rejects outright (e.g. validation errors) and spill
+    lines that can't be parsed (e.g. cut short by a killed process) go to a
+    dead-letter file instead of being retried forever.
+    """
+    
+    def __init__(self, collection_name, batch_size, flush_interval, spill_path, dead_letter_path):
+        self.collection_name = collection_name
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.spill_path = spill_path
+        self.dead_letter_path = dead_letter_path
+        
+        self._pending = []
+        self._pending_by_id = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+        self.flushed = 0
+        self.spilled = 0
+        self.dead_lettered = 0
+    
+    def _collection(self):
+        w = Config.WRITE_BEHIND_W
+        write_concern = WriteConcern(w=int(w) if w.isdigit() else w, j=Config.WRITE_BEHIND_JOURNAL)
+        return db_connection.get_collection(self.collection_name).with_options(write_concern=write_concern)
+    
+    def _ensure_started(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._loop, name=f"write-behind-{self.collection_name}",
+                                            daemon=True)
+            self._thread.start()
+    
+    def insert(self, document):
+        """Queue an insert; the document must already carry its _id"""
+        # Registered first so a flush can never pop it before it is added
+        with self._lock:
+            self._pending_by_id[document['_id']] = document
+        self._enqueue({'op': 'insert', 'doc': document})
+    
+    def _enqueue(self, operation):
+        with self._lock:
+            self._pending.append(operation)
+            full = len(self._pending) >= self.batch_size
+        self._ensure_started()
+        if full:
+            self._wakeup.set()
+    
+    def get_pending(self, document_id):
+        """Return a queued (not yet written) document, for read-after-write"""
+        with self._lock:
+            return self._pending_by_id.get(document_id)
+    
+    def _write(self, operations):
+        """Bulk-write operations unordered, so one failure does not drop the rest.
+        
+        Connection errors propagate (the caller spills the batch). Duplicate
+        _ids mean a replayed spill was already written and are ignored; other
+        per-operation errors are permanent and go to the dead-letter file.
+        """
+        try:
+            self._collection().bulk_write([InsertOne(op['doc']) for op in operations], ordered=False)
+        except BulkWriteError as e:
+            rejected = [err for err in e.details.get('writeErrors', []) if err.get('code') != 11000]
+            if rejected:
+                self._dead_letter([(operations[err['index']], err.get('errmsg')) for err in rejected])
+    
+    @staticmethod
+    def _append(path, lines):
+        with open(path, 'a', encoding='utf-8') as f, _locked(f):
+            f.writelines(line + '\n' for line in lines)
+    
+    def _spill(self, operations):
+        self._append(self.spill_path, [json_util.dumps(operation) for operation in operations])
+        self.spilled += len(operations)
+        logger.warning(f"MongoDB unavailable, spilled {len(operations)} write(s) to {self.spill_path}")
+    
+    def _dead_letter(self, failures):
+        self._append(self.dead_letter_path,
+                     [json_util.dumps({'operation': operation, 'error': error}) for operation, error in failures])
+        self.dead_lettered += len(failures)
+        logger.error(f"{len(failures)} write(s) rejected by MongoDB, moved to {self.dead_letter_path}")
+    
+    def _replay_spill(self):
+        if not os.path.exists(self.spill_path):
+            return
+        # Locked for the whole replay so no worker appends to lines we are about to truncate
+        with open(self.spill_path, 'r+', encoding='utf-8') as f, _locked(f):
+            operations, unreadable = [], []
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    operations.append(json_util.loads(line))
+                except ValueError as e:
+                    unreadable.append((line.rstrip('\n'), f"Unreadable spill line: {str(e)}"))
+            if unreadable:
+                self._dead_letter(unreadable)
+            if operations:
+                self._write(operations)
+                logger.info(f"Replayed {len(operations)} spilled write(s)")
+            f.truncate(0)
+    
+    def flush(self):
+        """Write everything queued so far; returns the number of operations written"""
+        with self._flush_lock:
+            with self._lock:
+                operations, self._pending = self._pending, []
+            
+            try:
+                self._replay_spill()
+                if operations:
+                    self._write(operations)
+                    self.flushed += len(operations)
+            except Exception as e:
+                # Anything that stops the write spills the batch; it is already out of _pending
+                logger.error(f"Write-behind flush failed: {str(e)}")
+                if operations:
+                    self._spill(operations)
+            finally:
+                with self._lock:
+                    for operation in operations:
+                        self._pending_by_id.pop(operation['doc']['_id'], None)
+            
+            if operations:
+                response_cache.invalidate(self.collection_name)
+            return len(operations)
+    
+    def _loop(self):
+        while not self._stopped.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Write-behind flush loop error: {str(e)}")
+    
+    def close(self):
+        """Flush remaining writes and stop the background thread"""
+        self._stopped.set()
+        self._wakeup.set()
+        self.flush()
+    
+    def stats(self):
+        with self._lock:
+            return {'pending': len(self._pending), 'flushed': self.flushed, 'spilled': self.spilled,
+                    'dead_lettered': self.dead_lettered}
+
+# Global write-behind buffer for evaluations
+evaluation_writer = WriteBehindBuffer(
+    'evaluations',
+    batch_size=Config.WRITE_BEHIND_BATCH_SIZE,
+    flush_interval=Config.WRITE_BEHIND_FLUSH_INTERVAL,
+    spill_path=Config.WRITE_BEHIND_SPILL_PATH,
+    dead_letter_path=Config.WRITE_BEHIND_DEAD_LETTER_PATH
+)
+
+atexit.register(evaluation_writer.close)
@@ -1,9 +1,19 @@
 import React, { useState, useEffect } from 'react';
 import { useNavigate } from 'react-router-dom';
 import { FiUploadCloud, FiCheckCircle } from 'react-icons/fi';
-import { uploadModelAnswer, evaluateAnswer, getAllTeachers, getAllStudents, createTeacher, createStudent } from '../services/api';
+import { uploadModelAnswer, evaluateAnswerStream, getAllTeachers, getAllStudents, createTeacher, createStudent } from '../services/api';
 import './Evaluate.css';
 
+// Loading messages for evaluation stream events
+const STREAM_PROGRESS = {
+  uploaded: () => 'Uploaded, reading answer script...',
+  page_ocr: (data) => `Reading handwriting: page ${data.page} of ${data.total}...`,
+  text_extracted: () => 'Text extracted, grading answer...',
+  grading_started: () => 'Grading answer... This may take a moment',
+  escalated: () => 'Double-checking the grade with a stronger model...',
+  stored: () => 'Saving evaluation...'
+};
+
 const Evaluate = ({ setLoading }) => {
   const navigate = useNavigate();
   const [step, setStep] = useState(1);
@@ -124,7 +134,11 @@ const Evaluate = ({ setLoading }) => {
       formData.append('teacher_id', selectedTeacher);
       formData.append('student_id', selectedStudent);
 
-      const response = await evaluateAnswer(formData);
+      // Streamed so long OCR + grading runs report progress instead of timing out
+      const response = await evaluateAnswerStream(formData, (event, data) => {
+        const message = STREAM_PROGRESS[event]?.(data);
+        if (message) setLoading(true, message);
+      });
       // Extract evaluation from response
       const evaluationData = response.evaluation || response;
       // Add max_marks to evaluation data for display
@@ -96,6 +96,51 @@ export const evaluateAnswer = async (formDataOrFile, modelAnswer, maxMarks, ques
   return response.data;
 };
 
+// Streams evaluation progress as server-sent events; onEvent(event, data) is
+// called for each stage and the final 'result' event's data is returned.
+export const evaluateAnswerStream = async (formData, onEvent = () => {}) => {
+  const response = await fetch(`${API_BASE_URL}/evaluate-answer/stream`, {
+    method: 'POST',
+    body: formData
+  });
+  if (!response.ok) {
+    const error = await response.json().catch(() => ({}));
+    throw new Error(error.error || `Request failed with status ${response.status}`);
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  let result = null;
+
+  while (true) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+
+    const messages = buffer.split('\n\n');
+    buffer = messages.pop();
+    for (const message of messages) {
+      let event = 'message';
+      let data = '';
+      for (const line of message.split('\n')) {
+        if (line.startsWith('event: ')) event = line.slice(7);
+        else if (line.startsWith('data: ')) data += line.slice(6);
+      }
+      if (!data) continue;
+      const payload = JSON.parse(data);
+      onEvent(event, payload);
+      if (event === 'result') result = payload;
+      if (event === 'error') throw new Error(payload.error);
+    }
+  }
+  if (!result) {
+    // The connection closed (proxy timeout, worker restart) before the result arrived
+    throw new Error('The evaluation stream ended before a result was received. Please try again.');
+  }
+  return result;
+};
+
 export const getEvaluation = async (evaluationId) => {
   const response = await api.get(`/evaluations/${evaluationId}`);
   return response.data;